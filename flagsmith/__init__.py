@@ -1,6 +1,25 @@
 from flagsmith import webhooks
-from flagsmith.analytics import EventProcessorConfig
+from flagsmith.analytics import (
+    AnalyticsProcessorConfig,
+    AnalyticsTransportConfig,
+    EventProcessorConfig,
+)
+from flagsmith.cache import (
+    EnvironmentFlagsCacheConfig,
+    IdentityFlagsCacheConfig,
+    LRUCache,
+)
 from flagsmith.flagsmith import Flagsmith
 from flagsmith.version import __version__
 
-__all__ = ("Flagsmith", "EventProcessorConfig", "webhooks", "__version__")
+__all__ = (
+    "Flagsmith",
+    "AnalyticsProcessorConfig",
+    "AnalyticsTransportConfig",
+    "EventProcessorConfig",
+    "EnvironmentFlagsCacheConfig",
+    "IdentityFlagsCacheConfig",
+    "LRUCache",
+    "webhooks",
+    "__version__",
+)
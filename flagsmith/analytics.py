@@ -1,13 +1,24 @@
 import atexit
-import json
+import gzip
 import logging
+import random
+import sys
 import threading
+import time
 import typing
-from dataclasses import dataclass
-from datetime import datetime
+import zlib
+from concurrent import futures
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import cached_property
 
+from requests.adapters import HTTPAdapter
 from requests_futures.sessions import FuturesSession  # type: ignore
+from urllib3 import Retry
 
+from flagsmith.cache import LRUCache
+from flagsmith.json_codecs import JsonCodec, get_default_json_codec
+from flagsmith.spill_queue import DiskSpillQueue
 from flagsmith.version import __version__
 
 logger = logging.getLogger(__name__)
@@ -21,7 +32,162 @@ FLAG_EXPOSURE_EVENT: typing.Final[str] = "$flag_exposure"
 
 DEFAULT_EVENT_API_URL: typing.Final[str] = "https://events.api.flagsmith.com/"
 
-session = FuturesSession(max_workers=4)
+# Request body compressors, by `Content-Encoding`.
+PAYLOAD_COMPRESSORS: typing.Dict[str, typing.Callable[[bytes], bytes]] = {
+    "gzip": gzip.compress,
+    "deflate": zlib.compress,
+}
+if sys.version_info >= (3, 14):
+    from compression import zstd
+
+    PAYLOAD_COMPRESSORS["zstd"] = zstd.compress
+
+
+@dataclass
+class AnalyticsTransportConfig:
+    """
+    Configuration for the HTTP transport flag analytics and events are sent with.
+
+    :param max_workers: number of threads sending requests.
+    :param pool_maxsize: maximum number of connections kept open per host.
+    :param keep_alive: whether to reuse connections between requests.
+    :param retries: retry policy for requests. By default, requests that fail
+        to connect are retried.
+    :param compression: ``Content-Encoding`` to compress request bodies with,
+        one of :data:`PAYLOAD_COMPRESSORS`, or None to send them uncompressed.
+        The Flagsmith API must accept the encoding.
+    :param compression_threshold_bytes: request bodies smaller than this are
+        sent uncompressed.
+    """
+
+    max_workers: int = 4
+    pool_maxsize: int = 4
+    keep_alive: bool = True
+    retries: Retry = field(
+        default_factory=lambda: Retry(total=3, backoff_factor=0.1),
+    )
+    compression: typing.Optional[str] = None
+    compression_threshold_bytes: int = 1024
+
+
+class AnalyticsTransport:
+    """
+    Sends requests from a pool of worker threads, which is only created once
+    the first request is sent.
+    """
+
+    def __init__(self, config: typing.Optional[AnalyticsTransportConfig] = None):
+        self.config = config or AnalyticsTransportConfig()
+        if (
+            self.config.compression is not None
+            and self.config.compression not in PAYLOAD_COMPRESSORS
+        ):
+            raise ValueError(
+                f"Unsupported compression: {self.config.compression!r}. "
+                f"Supported: {', '.join(PAYLOAD_COMPRESSORS)}."
+            )
+        self._in_flight: typing.Set["Future[typing.Any]"] = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def post(
+        self,
+        url: str,
+        data: bytes,
+        headers: typing.Dict[str, str],
+        **kwargs: typing.Any,
+    ) -> "Future[typing.Any]":
+        """
+        :raises RuntimeError: if the transport has been closed.
+        """
+        body, headers = self._encode(data, headers)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot post after the transport is closed.")
+            future: "Future[typing.Any]" = self.session.post(
+                url, data=body, headers=headers, **kwargs
+            )
+            self._in_flight.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def close(self, timeout: typing.Optional[float] = None) -> None:
+        """
+        Wait for requests in flight to complete, then release the threads
+        and connections.
+
+        :param timeout: maximum number of seconds to wait for requests in
+            flight, after which they are abandoned.
+        """
+        with self._lock:
+            self._closed = True
+            in_flight = set(self._in_flight)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in in_flight:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                future.exception(timeout=remaining)
+            except (futures.TimeoutError, futures.CancelledError):
+                pass
+        if "session" in self.__dict__:
+            self.session.close()
+
+    def _encode(
+        self,
+        data: bytes,
+        headers: typing.Dict[str, str],
+    ) -> typing.Tuple[bytes, typing.Dict[str, str]]:
+        compression = self.config.compression
+        if compression is None or len(data) < self.config.compression_threshold_bytes:
+            return data, headers
+        return PAYLOAD_COMPRESSORS[compression](data), {
+            **headers,
+            "Content-Encoding": compression,
+        }
+
+    @cached_property
+    def session(self) -> FuturesSession:
+        session = FuturesSession(max_workers=self.config.max_workers)
+        adapter = HTTPAdapter(
+            pool_maxsize=self.config.pool_maxsize,
+            max_retries=self.config.retries,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        if not self.config.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _discard(self, future: "Future[typing.Any]") -> None:
+        with self._lock:
+            self._in_flight.discard(future)
+
+
+@dataclass
+class AnalyticsProcessorConfig:
+    """
+    :param flush_interval_seconds: number of seconds between flushes of flag
+        analytics from the background thread.
+    :param max_keys: flush early once roughly this many feature counts are
+        waiting to be flushed, counting each thread that evaluated a feature
+        separately.
+    """
+
+    flush_interval_seconds: float = ANALYTICS_TIMER
+    max_keys: int = 1000
+
+
+class _FeatureCounts:
+    """
+    Flag evaluation counts recorded by a single thread.
+    """
+
+    def __init__(self) -> None:
+        self.thread = threading.current_thread()
+        # Only ever written by `thread`, so incrementing needs no lock.
+        self.totals: typing.Dict[str, int] = {}
+        # Copy of `totals` as of the last flush.
+        self.flushed: typing.Dict[str, int] = {}
 
 
 class AnalyticsProcessor:
@@ -36,11 +202,17 @@ class AnalyticsProcessor:
         base_api_url: str,
         timeout: typing.Optional[int] = 3,
         analytics_url: typing.Optional[str] = None,
+        config: typing.Optional[AnalyticsProcessorConfig] = None,
+        transport: typing.Optional[AnalyticsTransport] = None,
+        json_codec: typing.Optional[JsonCodec] = None,
     ):
         """
         Initialise the AnalyticsProcessor to handle sending analytics on flag usage to
         the Flagsmith API.
 
+        Until :meth:`start` is called, analytics are flushed from within
+        :meth:`track_feature` once the flush interval has passed.
+
         :param environment_key: environment key obtained from the Flagsmith UI
         :param base_api_url: base api url to override when using self hosted version
         :param timeout: used to tell requests to stop waiting for a response after a
@@ -50,44 +222,239 @@ class AnalyticsProcessor:
             where flag evaluation traffic and analytics traffic must go to different
             hosts (for example, evaluating through the Edge Proxy while sending
             analytics to the core API).
+        :param config: flush interval and threshold to flush at.
+        :param transport: transport to send analytics with, e.g. one shared
+            with the client's event processor. Defaults to a transport owned,
+            and closed on :meth:`stop`, by this processor.
+        :param json_codec: codec to serialise analytics with. Defaults to the
+            fastest installed JSON library.
         """
+        self.config = config or AnalyticsProcessorConfig()
+        self._json_codec = json_codec or get_default_json_codec()
+        self._owns_transport = transport is None
+        self.transport = transport or AnalyticsTransport()
         self.analytics_endpoint = analytics_url or (base_api_url + ANALYTICS_ENDPOINT)
         self.environment_key = environment_key
-        self._last_flushed = datetime.now()
-        self.analytics_data: typing.MutableMapping[str, typing.Any] = {}
+        self._last_flushed = time.monotonic()
         self.timeout = timeout or 3
+        # Each thread counts evaluations in its own `_FeatureCounts`, so that
+        # tracking never contends on a lock. Flushing sums what each thread
+        # counted since the previous flush.
+        self._local = threading.local()
+        self._feature_counts: typing.List[_FeatureCounts] = []
+        self._feature_counts_lock = threading.Lock()
+        # Approximate number of feature counts awaiting a flush, see
+        # `AnalyticsProcessorConfig.max_keys`.
+        self._pending_keys = 0
+        self._flush_requested = threading.Event()
+        self._flush_thread: typing.Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def analytics_data(self) -> typing.Dict[str, int]:
+        """
+        Number of evaluations of each feature not yet flushed.
+        """
+        with self._feature_counts_lock:
+            return self._collect_feature_counts(mark_flushed=False)
 
     def flush(self) -> None:
         """
         Sends all the collected data to the api asynchronously and resets the timer
         """
+        with self._feature_counts_lock:
+            analytics_data = self._collect_feature_counts(mark_flushed=True)
+            self._pending_keys = 0
+            if not analytics_data:
+                return
+            self._last_flushed = time.monotonic()
 
-        if not self.analytics_data:
-            return
-        session.post(
+        self._post(self._json_codec.dumps(analytics_data))
+
+    def start(self) -> None:
+        """
+        Flush analytics from a background thread, and when the interpreter exits.
+        """
+        self._flush_thread = threading.Thread(
+            target=self._flush_periodically, daemon=True
+        )
+        self._flush_thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        atexit.unregister(self.stop)
+        self._stopped = True
+        self._flush_requested.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
+        self.flush()
+        if self._owns_transport:
+            self.transport.close()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            self._flush_requested.wait(self.config.flush_interval_seconds)
+            self._flush_requested.clear()
+            if self._stopped:
+                return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error flushing flag analytics")
+
+    def _request_flush(self) -> None:
+        if self._flush_thread is None:
+            self.flush()
+        else:
+            self._flush_requested.set()
+
+    def _post(self, data: bytes) -> "Future[typing.Any]":
+        return self.transport.post(
             self.analytics_endpoint,
-            data=json.dumps(self.analytics_data),
+            data=data,
             timeout=self.timeout,
-            headers={
-                "X-Environment-Key": self.environment_key,
-                "Content-Type": "application/json",
-            },
+            headers=self._headers,
         )
 
-        self.analytics_data.clear()
-        self._last_flushed = datetime.now()
+    @property
+    def _headers(self) -> typing.Dict[str, str]:
+        return {
+            "X-Environment-Key": self.environment_key,
+            "Content-Type": "application/json",
+        }
 
     def track_feature(self, feature_name: str) -> None:
-        self.analytics_data[feature_name] = self.analytics_data.get(feature_name, 0) + 1
-        if (datetime.now() - self._last_flushed).seconds > ANALYTICS_TIMER:
+        self._count_feature(feature_name)
+        if self._flush_thread is None and (
+            time.monotonic() - self._last_flushed > self.config.flush_interval_seconds
+        ):
             self.flush()
 
+    def _count_feature(self, feature_name: str) -> None:
+        try:
+            feature_counts: _FeatureCounts = self._local.feature_counts
+        except AttributeError:
+            feature_counts = self._register_thread()
+        total = feature_counts.totals.get(feature_name, 0)
+        if total == feature_counts.flushed.get(feature_name, 0):
+            # First evaluation of this feature by this thread since the last
+            # flush. The increment is not atomic, but only has to be roughly
+            # right to bound the size of a flush.
+            self._pending_keys += 1
+            if self._pending_keys >= self.config.max_keys:
+                self._request_flush()
+        feature_counts.totals[feature_name] = total + 1
+
+    def _register_thread(self) -> _FeatureCounts:
+        feature_counts = _FeatureCounts()
+        with self._feature_counts_lock:
+            self._feature_counts.append(feature_counts)
+        self._local.feature_counts = feature_counts
+        return feature_counts
+
+    def _collect_feature_counts(self, mark_flushed: bool) -> typing.Dict[str, int]:
+        """
+        Sum the evaluations counted by each thread since the last flush.
+
+        Must be called holding `_feature_counts_lock`.
+        """
+        analytics_data: typing.Dict[str, int] = {}
+        for feature_counts in list(self._feature_counts):
+            is_alive = feature_counts.thread.is_alive()
+            # Copying a dict is atomic, so this never observes a partial
+            # increment by the owning thread.
+            totals = feature_counts.totals.copy()
+            for feature_name, total in totals.items():
+                if count := total - feature_counts.flushed.get(feature_name, 0):
+                    analytics_data[feature_name] = (
+                        analytics_data.get(feature_name, 0) + count
+                    )
+            if mark_flushed:
+                feature_counts.flushed = totals
+                if not is_alive:
+                    # The thread cannot count anything else.
+                    self._feature_counts.remove(feature_counts)
+        return analytics_data
+
 
 @dataclass
 class EventProcessorConfig:
+    """
+    :param flush_interval_seconds: longest time buffered events wait to be
+        flushed by the background thread.
+    :param min_flush_interval_seconds: shortest time between flushes by the
+        background thread. While events are tracked quickly, it flushes more
+        often than `flush_interval_seconds`, aiming for batches of half
+        `max_buffer_items`.
+    :param max_idle_flush_interval_seconds: while no events are tracked, the
+        background thread backs off up to this many seconds between wakeups.
+    :param max_in_flight_flushes: number of batches being sent at once,
+        beyond which flushed events wait for the next flush.
+    :param spill_directory: if set, batches that fail to send are written to
+        segment files in this directory rather than being re-queued in memory,
+        and sent again in order, backing off exponentially while the events
+        API keeps failing.
+    :param spill_max_segment_bytes: size of each segment file.
+    :param spill_max_bytes: size of all segment files, beyond which the
+        oldest events are dropped.
+    :param max_replay_backoff_seconds: maximum delay between attempts to
+        send spilled events.
+    :param exposure_dedup_window_seconds: if set, a `$flag_exposure` event
+        is dropped when one with the same identifier, feature name and value
+        was tracked within this many seconds.
+    :param exposure_dedup_max_keys: number of recent exposures remembered
+        for deduplication, beyond which the least recently seen are
+        forgotten.
+    :param exposure_sample_rate: fraction of identities whose `$flag_exposure`
+        events are tracked. Identities are sampled consistently across
+        processes, and the rate is added to the events' metadata as
+        `sample_rate`.
+    """
+
     events_api_url: str = DEFAULT_EVENT_API_URL
     max_buffer_items: int = 1000
     flush_interval_seconds: float = 10.0
+    min_flush_interval_seconds: float = 1.0
+    max_idle_flush_interval_seconds: float = 60.0
+    max_in_flight_flushes: int = 2
+    spill_directory: typing.Optional[str] = None
+    spill_max_segment_bytes: int = 1024 * 1024
+    spill_max_bytes: int = 64 * 1024 * 1024
+    max_replay_backoff_seconds: float = 300.0
+    exposure_dedup_window_seconds: typing.Optional[float] = None
+    exposure_dedup_max_keys: int = 10000
+    exposure_sample_rate: float = 1.0
+
+
+# Event fields, as buffered by `EventProcessor` until flushed: event name,
+# feature name, identifier, value, traits, metadata and timestamp in ms.
+_EventRecord = typing.Tuple[
+    str,
+    typing.Optional[str],
+    typing.Optional[str],
+    typing.Optional[typing.Union[str, int, float, bool]],
+    typing.Optional[typing.Dict[str, typing.Any]],
+    typing.Optional[typing.Dict[str, typing.Any]],
+    int,
+]
+
+# Identifier, feature name and value of a `$flag_exposure` event.
+_ExposureKey = typing.Tuple[
+    typing.Optional[str],
+    str,
+    typing.Optional[typing.Union[str, int, float, bool]],
+]
+
+
+class _EventBuffer:
+    """
+    Events recorded by a single thread.
+    """
+
+    def __init__(self) -> None:
+        self.thread = threading.current_thread()
+        # Only appended to by `thread`, and only consumed from the front.
+        self.records: typing.List[_EventRecord] = []
 
 
 class EventProcessor:
@@ -101,7 +468,19 @@ class EventProcessor:
         self,
         config: EventProcessorConfig,
         environment_key: str,
+        transport: typing.Optional[AnalyticsTransport] = None,
+        json_codec: typing.Optional[JsonCodec] = None,
     ) -> None:
+        """
+        :param transport: transport to send events with, e.g. one shared with
+            the client's analytics processor. Defaults to a transport owned,
+            and closed on :meth:`stop`, by this processor.
+        :param json_codec: codec to serialise events with. Defaults to the
+            fastest installed JSON library.
+        """
+        self._json_codec = json_codec or get_default_json_codec()
+        self._owns_transport = transport is None
+        self.transport = transport or AnalyticsTransport()
         url = config.events_api_url
         if not url.endswith("/"):
             url = f"{url}/"
@@ -109,10 +488,58 @@ class EventProcessor:
         self._environment_key = environment_key
         self._max_buffer = config.max_buffer_items
         self._flush_interval_seconds = config.flush_interval_seconds
-
-        self._buffer: typing.List[typing.Dict[str, typing.Any]] = []
+        self._min_flush_interval_seconds = config.min_flush_interval_seconds
+        self._max_idle_flush_interval_seconds = config.max_idle_flush_interval_seconds
+
+        # Each thread buffers events in its own `_EventBuffer`, so tracking
+        # never contends on a lock. Events are only turned into dicts when
+        # flushed.
+        self._local = threading.local()
+        self._event_buffers: typing.List[_EventBuffer] = []
+        # Approximate number of events buffered across threads.
+        self._buffered = 0
+        # Events that failed to send, to be sent with the next flush.
+        self._requeued: typing.List[typing.Dict[str, typing.Any]] = []
+        # Number of events dropped for exceeding `max_buffer_items` while
+        # waiting to be sent again.
+        self._dropped_events = 0
         self._lock = threading.Lock()
-        self._timer: typing.Optional[threading.Timer] = None
+        self._in_flight_flushes = threading.Semaphore(config.max_in_flight_flushes)
+
+        self._flush_requested = threading.Event()
+        self._flush_thread: typing.Optional[threading.Thread] = None
+        self._stopped = False
+        # Whether the flush thread is backing off for lack of events.
+        self._idle = False
+
+        self._spill_queue = (
+            DiskSpillQueue(
+                config.spill_directory,
+                max_segment_bytes=config.spill_max_segment_bytes,
+                max_total_bytes=config.spill_max_bytes,
+            )
+            if config.spill_directory is not None
+            else None
+        )
+        self._max_replay_backoff_seconds = config.max_replay_backoff_seconds
+        # Only one spilled batch is sent at a time, to keep them in order.
+        self._replaying = False
+        self._replay_backoff_seconds = 0.0
+        self._replay_not_before = 0.0
+
+        if not 0.0 <= config.exposure_sample_rate <= 1.0:
+            raise ValueError("exposure_sample_rate must be between 0 and 1.")
+        self._exposure_sample_rate = config.exposure_sample_rate
+        self._recent_exposures: typing.Optional[
+            LRUCache[_ExposureKey, typing.Literal[True]]
+        ] = (
+            LRUCache(
+                max_size=config.exposure_dedup_max_keys,
+                ttl_seconds=config.exposure_dedup_window_seconds,
+            )
+            if config.exposure_dedup_window_seconds is not None
+            else None
+        )
 
     def track_event(
         self,
@@ -139,6 +566,15 @@ class EventProcessor:
         traits: typing.Optional[typing.Dict[str, typing.Any]] = None,
         metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
     ) -> None:
+        if self._exposure_sample_rate < 1.0:
+            if not self._is_sampled(identifier):
+                return
+            metadata = {**(metadata or {}), "sample_rate": self._exposure_sample_rate}
+        if self._recent_exposures is not None:
+            key = (identifier, feature_name, value)
+            if self._recent_exposures.get(key):
+                return
+            self._recent_exposures.set(key, True)
         self._buffer_event(
             event=FLAG_EXPOSURE_EVENT,
             feature_name=feature_name,
@@ -148,6 +584,13 @@ class EventProcessor:
             metadata=metadata,
         )
 
+    def _is_sampled(self, identifier: typing.Optional[str]) -> bool:
+        if identifier is None:
+            return random.random() < self._exposure_sample_rate
+        # Unlike `hash`, CRC32 is stable across processes.
+        bucket = zlib.crc32(identifier.encode()) / 2**32
+        return bucket < self._exposure_sample_rate
+
     def _buffer_event(
         self,
         event: str,
@@ -157,80 +600,284 @@ class EventProcessor:
         traits: typing.Optional[typing.Dict[str, typing.Any]],
         metadata: typing.Optional[typing.Dict[str, typing.Any]],
     ) -> None:
-        should_flush = False
-        with self._lock:
-            self._buffer.append(
-                {
-                    "event": event,
-                    "feature_name": feature_name,
-                    "identifier": identifier,
-                    "value": str(value) if value is not None else None,
-                    "traits": dict(traits) if traits else None,
-                    "metadata": {**(metadata or {}), "sdk_version": __version__},
-                    "timestamp": int(datetime.now().timestamp() * 1000),
-                }
+        try:
+            records: typing.List[_EventRecord] = self._local.records
+        except AttributeError:
+            records = self._register_thread()
+        # Copy traits and metadata, which callers may reuse once tracked.
+        records.append(
+            (
+                event,
+                feature_name,
+                identifier,
+                value,
+                dict(traits) if traits else None,
+                dict(metadata) if metadata else None,
+                int(time.time() * 1000),
             )
-            if len(self._buffer) >= self._max_buffer:
-                should_flush = True
+        )
+        self._buffered += 1
+        if self._buffered >= self._max_buffer or self._idle:
+            self._request_flush()
 
-        if should_flush:
-            self.flush()
+    def _register_thread(self) -> typing.List[_EventRecord]:
+        event_buffer = _EventBuffer()
+        with self._lock:
+            self._event_buffers.append(event_buffer)
+        self._local.records = event_buffer.records
+        return event_buffer.records
 
-    def flush(self) -> None:
+    def _take_events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Remove and return all buffered events, oldest first.
+        """
+        records: typing.List[_EventRecord] = []
         with self._lock:
-            if not self._buffer:
-                return
-            events = self._buffer
-            self._buffer = []
+            events, self._requeued = self._requeued, []
+            self._buffered = 0
+            for event_buffer in list(self._event_buffers):
+                is_alive = event_buffer.thread.is_alive()
+                # Slicing and deleting are atomic, and the owning thread only
+                # appends, so no event is lost or taken twice.
+                count = len(event_buffer.records)
+                records += event_buffer.records[:count]
+                del event_buffer.records[:count]
+                if not is_alive:
+                    # The thread cannot buffer anything else.
+                    self._event_buffers.remove(event_buffer)
+        records.sort(key=lambda record: record[6])
+        return events + [self._get_event(record) for record in records]
+
+    def _pending_events(self) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        Buffered events, without removing them.
+        """
+        with self._lock:
+            records = [
+                record
+                for event_buffer in self._event_buffers
+                for record in event_buffer.records[:]
+            ]
+            events = list(self._requeued)
+        records.sort(key=lambda record: record[6])
+        return events + [self._get_event(record) for record in records]
+
+    @staticmethod
+    def _get_event(record: _EventRecord) -> typing.Dict[str, typing.Any]:
+        event, feature_name, identifier, value, traits, metadata, timestamp = record
+        return {
+            "event": event,
+            "feature_name": feature_name,
+            "identifier": identifier,
+            "value": str(value) if value is not None else None,
+            "traits": traits,
+            "metadata": {**(metadata or {}), "sdk_version": __version__},
+            "timestamp": timestamp,
+        }
+
+    def flush(self) -> None:
+        events = self._take_events()
 
-        payload = json.dumps({"events": events})
+        if self._spill_queue is not None and self._spill_queue:
+            # Send buffered events after those spilled earlier.
+            if events:
+                self._spill_queue.append(events)
+            self._replay_spilled_events()
+            return
+
+        if not events:
+            return
+        # The final flush on stop waits for a batch in flight to complete.
+        if not self._in_flight_flushes.acquire(timeout=3 if self._stopped else 0):
+            # Send the events later instead.
+            if self._spill_queue is not None:
+                self._spill_queue.append(events)
+            else:
+                self._requeue_events(events)
+            return
+        payload = self._json_codec.dumps({"events": events})
         try:
-            future = session.post(
-                self._batch_endpoint,
-                data=payload,
-                timeout=3,
-                headers={
-                    "Content-Type": "application/json; charset=utf-8",
-                    "X-Environment-Key": self._environment_key,
-                    "Flagsmith-SDK-User-Agent": f"flagsmith-python-client/{__version__}",
-                },
-            )
+            future = self._post(payload)
         except RuntimeError:
             logger.debug("Skipping flush: thread pool already shut down")
+            self._in_flight_flushes.release()
             return
         future.add_done_callback(lambda f: self._handle_flush_result(f, events))
 
+    def _post(self, payload: bytes) -> "Future[typing.Any]":
+        return self.transport.post(
+            self._batch_endpoint,
+            data=payload,
+            timeout=3,
+            headers=self._headers,
+        )
+
+    @property
+    def _headers(self) -> typing.Dict[str, str]:
+        return {
+            "Content-Type": "application/json; charset=utf-8",
+            "X-Environment-Key": self._environment_key,
+            "Flagsmith-SDK-User-Agent": f"flagsmith-python-client/{__version__}",
+        }
+
     def _handle_flush_result(
         self,
         future: typing.Any,
         events: typing.List[typing.Dict[str, typing.Any]],
     ) -> None:
+        self._in_flight_flushes.release()
         try:
             response = future.result()
             response.raise_for_status()
         except Exception:
+            if self._spill_queue is not None:
+                logger.warning(
+                    "Failed to flush pipeline analytics, spilling events to disk",
+                    exc_info=True,
+                )
+                self._spill_queue.append(events)
+                self._back_off_replay()
+                return
             logger.warning(
                 "Failed to flush pipeline analytics, re-queuing events", exc_info=True
             )
+            self._requeue_events(events)
+
+    def _requeue_events(
+        self, events: typing.List[typing.Dict[str, typing.Any]]
+    ) -> None:
+        """
+        Send `events` with the next flush, keeping at most `max_buffer_items`
+        events queued and dropping the oldest beyond that.
+        """
+        with self._lock:
+            requeued = events + self._requeued
+            dropped = max(len(requeued) - self._max_buffer, 0)
+            self._requeued = requeued[dropped:]
+            self._dropped_events += dropped
+        if dropped:
+            logger.warning(
+                "Dropped %d pipeline analytics events exceeding max_buffer_items",
+                dropped,
+            )
+
+    def _replay_spilled_events(self) -> None:
+        assert self._spill_queue is not None
+        with self._lock:
+            if self._replaying or time.monotonic() < self._replay_not_before:
+                return
+            if (events := self._spill_queue.peek()) is None:
+                return
+            self._replaying = True
+
+        try:
+            future = self._post(self._json_codec.dumps({"events": events}))
+        except RuntimeError:
+            logger.debug("Skipping replay: thread pool already shut down")
             with self._lock:
-                self._buffer = events + self._buffer
-                self._buffer = self._buffer[: self._max_buffer]
+                self._replaying = False
+            return
+        future.add_done_callback(self._handle_replay_result)
+
+    def _handle_replay_result(self, future: typing.Any) -> None:
+        assert self._spill_queue is not None
+        try:
+            response = future.result()
+            response.raise_for_status()
+        except Exception:
+            logger.warning("Failed to send spilled pipeline analytics", exc_info=True)
+            with self._lock:
+                self._replaying = False
+            self._back_off_replay()
+            return
+
+        self._spill_queue.pop()
+        with self._lock:
+            self._replaying = False
+            self._replay_backoff_seconds = 0.0
+        # Carry on with the next batch.
+        self._replay_spilled_events()
+
+    def _back_off_replay(self) -> None:
+        with self._lock:
+            self._replay_backoff_seconds = min(
+                max(self._replay_backoff_seconds * 2, self._flush_interval_seconds),
+                self._max_replay_backoff_seconds,
+            )
+            self._replay_not_before = time.monotonic() + self._replay_backoff_seconds
 
     def start(self) -> None:
-        self._schedule_flush()
+        """
+        Flush events from a background thread, and when the interpreter exits.
+        """
+        self._flush_thread = threading.Thread(
+            target=self._flush_periodically, daemon=True
+        )
+        self._flush_thread.start()
         atexit.register(self.stop)
 
     def stop(self) -> None:
         atexit.unregister(self.stop)
-        if self._timer is not None:
-            self._timer.cancel()
+        self._stopped = True
+        self._flush_requested.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join()
         self.flush()
+        if self._owns_transport:
+            self.transport.close()
 
-    def _schedule_flush(self) -> None:
-        self._timer = threading.Timer(self._flush_interval_seconds, self._timer_flush)
-        self._timer.daemon = True
-        self._timer.start()
+    def _request_flush(self) -> None:
+        if self._flush_thread is None:
+            self.flush()
+        else:
+            self._flush_requested.set()
+
+    def _flush_periodically(self) -> None:
+        interval = self._flush_interval_seconds
+        last_flushed = time.monotonic()
+        while True:
+            requested = self._flush_requested.wait(interval)
+            self._flush_requested.clear()
+            if self._stopped:
+                return
+            if self._idle and requested and self._buffered < self._max_buffer:
+                # Woken by the first event tracked while idle, which can wait
+                # for the usual interval.
+                self._idle = False
+                interval = self._flush_interval_seconds
+                continue
+
+            now = time.monotonic()
+            buffered = self._buffered
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Error flushing pipeline analytics")
+            interval = self._get_next_flush_interval(
+                buffered, now - last_flushed, interval
+            )
+            last_flushed = now
 
-    def _timer_flush(self) -> None:
-        self.flush()
-        self._schedule_flush()
+    def _get_next_flush_interval(
+        self,
+        flushed: int,
+        elapsed: float,
+        interval: float,
+    ) -> float:
+        """
+        :param flushed: number of events flushed.
+        :param elapsed: seconds since the previous flush.
+        :param interval: seconds waited before this flush.
+        """
+        if not flushed:
+            self._idle = True
+            return min(
+                max(interval * 2, self._flush_interval_seconds),
+                self._max_idle_flush_interval_seconds,
+            )
+        self._idle = False
+        fill_rate = flushed / max(elapsed, 1e-3)
+        return min(
+            max(self._max_buffer / 2 / fill_rate, self._min_flush_interval_seconds),
+            self._flush_interval_seconds,
+        )
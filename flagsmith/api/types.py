@@ -69,6 +69,7 @@ class EnvironmentModel(typing.TypedDict):
     identity_overrides: list[IdentityModel]
     name: str
     project: ProjectModel
+    updated_at: NotRequired[str]
 
 
 class TraitModel(TypedDict):
@@ -0,0 +1,171 @@
+import asyncio
+import typing
+from concurrent.futures import Future
+
+import httpx
+
+from flagsmith.analytics import (
+    AnalyticsProcessor,
+    AnalyticsProcessorConfig,
+    EventProcessor,
+    EventProcessorConfig,
+)
+from flagsmith.json_codecs import JsonCodec
+
+
+class AsyncAnalyticsProcessor(AnalyticsProcessor):
+    """
+    AnalyticsProcessor that posts flag analytics through an ``httpx.AsyncClient``
+    on the client's event loop, and flushes from an asyncio task rather than
+    from inside ``track_feature``.
+    """
+
+    def __init__(
+        self,
+        environment_key: str,
+        base_api_url: str,
+        client: httpx.AsyncClient,
+        timeout: typing.Optional[int] = 3,
+        analytics_url: typing.Optional[str] = None,
+        config: typing.Optional[AnalyticsProcessorConfig] = None,
+        json_codec: typing.Optional[JsonCodec] = None,
+    ):
+        super().__init__(
+            environment_key,
+            base_api_url,
+            timeout=timeout,
+            analytics_url=analytics_url,
+            config=config,
+            json_codec=json_codec,
+        )
+        self._client = client
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._flush_task: typing.Optional["asyncio.Task[None]"] = None
+        self._in_flight: typing.Set["Future[typing.Any]"] = set()
+
+    def track_feature(self, feature_name: str) -> None:
+        self._count_feature(feature_name)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._flush_task = self._loop.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        if self._loop is None:
+            # Never started, e.g. a client only used for remote evaluation;
+            # deliver what was tracked on the loop closing it.
+            self._loop = asyncio.get_running_loop()
+        self.flush()
+        await _wait_for_futures(self._in_flight)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.flush_interval_seconds)
+            self.flush()
+
+    def _request_flush(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.flush)
+
+    def _post(self, data: bytes) -> "Future[typing.Any]":
+        future = _post_on_loop(
+            self._loop,
+            self._client.post(
+                self.analytics_endpoint,
+                content=data,
+                timeout=self.timeout,
+                headers=self._headers,
+            ),
+        )
+        _track_future(self._in_flight, future)
+        return future
+
+
+class AsyncEventProcessor(EventProcessor):
+    """
+    EventProcessor that posts event batches through an ``httpx.AsyncClient``
+    on the client's event loop, and flushes from an asyncio task rather than
+    a ``threading.Timer``.
+    """
+
+    def __init__(
+        self,
+        config: EventProcessorConfig,
+        environment_key: str,
+        client: httpx.AsyncClient,
+        json_codec: typing.Optional[JsonCodec] = None,
+    ) -> None:
+        super().__init__(
+            config=config,
+            environment_key=environment_key,
+            json_codec=json_codec,
+        )
+        self._client = client
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._flush_task: typing.Optional["asyncio.Task[None]"] = None
+        self._in_flight: typing.Set["Future[typing.Any]"] = set()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._flush_task = self._loop.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        if self._loop is None:
+            # Never started, e.g. a client only used for remote evaluation;
+            # deliver what was tracked on the loop closing it.
+            self._loop = asyncio.get_running_loop()
+        self.flush()
+        await _wait_for_futures(self._in_flight)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval_seconds)
+            self.flush()
+
+    def _post(self, payload: bytes) -> "Future[typing.Any]":
+        future = _post_on_loop(
+            self._loop,
+            self._client.post(
+                self._batch_endpoint,
+                content=payload,
+                timeout=3,
+                headers=self._headers,
+            ),
+        )
+        _track_future(self._in_flight, future)
+        return future
+
+
+def _post_on_loop(
+    loop: typing.Optional[asyncio.AbstractEventLoop],
+    coroutine: typing.Coroutine[typing.Any, typing.Any, httpx.Response],
+) -> "Future[httpx.Response]":
+    # Schedule through `run_coroutine_threadsafe` so flushes triggered from
+    # worker threads (e.g. `run_in_executor`) are safe too, and so callers get
+    # the same `concurrent.futures.Future` interface as the threaded session.
+    if loop is None or loop.is_closed():
+        coroutine.close()
+        raise RuntimeError("Processor is not running on an event loop")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+
+def _track_future(
+    in_flight: typing.Set["Future[typing.Any]"],
+    future: "Future[typing.Any]",
+) -> None:
+    in_flight.add(future)
+    future.add_done_callback(in_flight.discard)
+
+
+async def _wait_for_futures(
+    futures: typing.Set["Future[typing.Any]"],
+) -> None:
+    if futures:
+        await asyncio.gather(
+            *(asyncio.wrap_future(future) for future in list(futures)),
+            return_exceptions=True,
+        )
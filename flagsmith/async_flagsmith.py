@@ -0,0 +1,561 @@
+import asyncio
+import logging
+import typing
+from http import HTTPStatus
+
+import httpx
+import sseclient
+from flag_engine import engine
+
+from flagsmith.analytics import AnalyticsProcessorConfig, EventProcessorConfig
+from flagsmith.api.types import EnvironmentModel
+from flagsmith.async_analytics import (
+    AsyncAnalyticsProcessor,
+    AsyncEventProcessor,
+)
+from flagsmith.cache import (
+    EnvironmentFlagsCacheConfig,
+    IdentityFlagsCacheConfig,
+    LRUCache,
+)
+from flagsmith.exceptions import FlagsmithAPIError
+from flagsmith.flagsmith import DEFAULT_BATCH_MAX_WORKERS, BaseFlagsmith
+from flagsmith.json_codecs import JsonCodec
+from flagsmith.mappers import map_sse_event_to_stream_event
+from flagsmith.models import DefaultFlag, Flag, Flags, Segment
+from flagsmith.offline_handlers import OfflineHandler
+from flagsmith.shared_environment import SharedEnvironmentSnapshot
+from flagsmith.types import (
+    ApplicationMetadata,
+    IdentityData,
+    JsonType,
+    StreamEvent,
+    TraitMapping,
+)
+from flagsmith.utils.identities import generate_identity_data
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncFlagsmith(BaseFlagsmith):
+    """An asyncio Flagsmith client.
+
+    Mirrors :class:`flagsmith.Flagsmith`, but talks to the Flagsmith http API
+    through ``httpx.AsyncClient`` and refreshes the environment and flushes
+    analytics and events from asyncio tasks instead of background threads.
+    Requires the ``async`` extra (``pip install flagsmith[async]``).
+
+    Basic Usage::
+
+      >>> from flagsmith.async_flagsmith import AsyncFlagsmith
+      >>> async with AsyncFlagsmith(environment_key="<your API key>") as flagsmith:
+      ...     environment_flags = await flagsmith.get_environment_flags()
+      ...     feature_enabled = environment_flags.is_feature_enabled("foo")
+      ...     identity_flags = await flagsmith.get_identity_flags(
+      ...         "identifier", {"foo": "bar"}
+      ...     )
+    """
+
+    def __init__(
+        self,
+        environment_key: typing.Optional[str] = None,
+        api_url: typing.Optional[str] = None,
+        realtime_api_url: typing.Optional[str] = None,
+        analytics_url: typing.Optional[str] = None,
+        custom_headers: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        request_timeout_seconds: typing.Optional[int] = 10,
+        enable_local_evaluation: bool = False,
+        environment_refresh_interval_seconds: typing.Union[int, float] = 60,
+        retries: int = 3,
+        enable_analytics: bool = False,
+        enable_events: bool = False,
+        event_processor_config: typing.Optional[EventProcessorConfig] = None,
+        default_flag_handler: typing.Optional[
+            typing.Callable[[str], DefaultFlag]
+        ] = None,
+        proxies: typing.Optional[typing.Dict[str, str]] = None,
+        offline_mode: bool = False,
+        offline_handler: typing.Optional[OfflineHandler] = None,
+        enable_realtime_updates: bool = False,
+        application_metadata: typing.Optional[ApplicationMetadata] = None,
+        analytics_processor_config: typing.Optional[AnalyticsProcessorConfig] = None,
+        enable_compiled_segments: bool = False,
+        identity_flags_cache: typing.Optional[LRUCache[typing.Any, Flags]] = None,
+        environment_flags_cache_config: typing.Optional[
+            EnvironmentFlagsCacheConfig
+        ] = None,
+        remote_identity_flags_cache_config: typing.Optional[
+            IdentityFlagsCacheConfig
+        ] = None,
+        shared_environment_snapshot: typing.Optional[SharedEnvironmentSnapshot] = None,
+        json_codec: typing.Optional[JsonCodec] = None,
+    ):
+        """
+        Takes the same arguments as :class:`flagsmith.Flagsmith`, except:
+
+        :param retries: number of times to retry requests to the Flagsmith API
+            that fail to connect
+        :param proxies: mapping of URL scheme (e.g. ``"https"``) to the URL of
+            the proxy to route those requests through
+
+        Calls to the ``remote_identity_flags_cache_config`` backend run in the
+        default executor, so blocking backends do not stall the event loop.
+
+        Background work only starts once :meth:`start` is awaited, or the
+        client is entered as an async context manager.
+        """
+        super().__init__(
+            environment_key=environment_key,
+            api_url=api_url,
+            realtime_api_url=realtime_api_url,
+            analytics_url=analytics_url,
+            request_timeout_seconds=request_timeout_seconds,
+            enable_local_evaluation=enable_local_evaluation,
+            environment_refresh_interval_seconds=environment_refresh_interval_seconds,
+            enable_analytics=enable_analytics,
+            analytics_processor_config=analytics_processor_config,
+            enable_events=enable_events,
+            event_processor_config=event_processor_config,
+            default_flag_handler=default_flag_handler,
+            offline_mode=offline_mode,
+            offline_handler=offline_handler,
+            enable_realtime_updates=enable_realtime_updates,
+            enable_compiled_segments=enable_compiled_segments,
+            identity_flags_cache=identity_flags_cache,
+            environment_flags_cache_config=environment_flags_cache_config,
+            remote_identity_flags_cache_config=remote_identity_flags_cache_config,
+            shared_environment_snapshot=shared_environment_snapshot,
+            json_codec=json_codec,
+        )
+        self._analytics_processor: typing.Optional[AsyncAnalyticsProcessor] = None
+        self._event_processor: typing.Optional[AsyncEventProcessor] = None
+        self._tasks: typing.List["asyncio.Task[None]"] = []
+        self._environment_flags_revalidation_task: typing.Optional[
+            "asyncio.Task[None]"
+        ] = None
+        # Environment documents are applied in worker threads, one at a time.
+        self._environment_update_lock = asyncio.Lock()
+
+        if not self.offline_mode:
+            # `BaseFlagsmith` rejects a missing key outside offline mode;
+            # assert here so type checkers can narrow.
+            assert environment_key is not None
+
+            self.client = httpx.AsyncClient(
+                headers=self._get_headers(
+                    environment_key=environment_key,
+                    application_metadata=application_metadata,
+                    custom_headers=custom_headers,
+                ),
+                timeout=request_timeout_seconds,
+                transport=httpx.AsyncHTTPTransport(retries=retries),
+                mounts={
+                    (scheme if "://" in scheme else f"{scheme}://"): (
+                        httpx.AsyncHTTPTransport(proxy=proxy_url, retries=retries)
+                    )
+                    for scheme, proxy_url in (proxies or {}).items()
+                },
+            )
+
+            if enable_analytics:
+                self._analytics_processor = AsyncAnalyticsProcessor(
+                    environment_key,
+                    self.api_url,
+                    client=self.client,
+                    timeout=self.request_timeout_seconds,
+                    analytics_url=self.analytics_url,
+                    config=analytics_processor_config,
+                    json_codec=self.json_codec,
+                )
+            if enable_events:
+                self._event_processor = AsyncEventProcessor(
+                    config=event_processor_config or EventProcessorConfig(),
+                    environment_key=environment_key,
+                    client=self.client,
+                    json_codec=self.json_codec,
+                )
+
+    async def __aenter__(self) -> "AsyncFlagsmith":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args: typing.Any) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Retrieve the environment when using local evaluation, and start the
+        tasks that keep it up to date and flush analytics and events.
+        """
+        if self.offline_mode:
+            return
+
+        if self.enable_local_evaluation:
+            # To ensure that the environment is set before allowing subsequent
+            # method calls, update the environment manually.
+            await self.update_environment()
+            if self.enable_realtime_updates:
+                self._tasks.append(
+                    asyncio.create_task(
+                        self._stream_environment_updates(self._get_stream_url())
+                    )
+                )
+            else:
+                self._tasks.append(asyncio.create_task(self._poll_environment()))
+
+        if self._analytics_processor:
+            self._analytics_processor.start()
+        if self._event_processor:
+            self._event_processor.start()
+
+    async def close(self) -> None:
+        """
+        Stop the background tasks, flush any pending analytics and events,
+        and close the HTTP client.
+        """
+        if self._environment_flags_revalidation_task is not None:
+            self._tasks.append(self._environment_flags_revalidation_task)
+            self._environment_flags_revalidation_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._analytics_processor:
+            await self._analytics_processor.aclose()
+        if self._event_processor:
+            await self._event_processor.aclose()
+        if not self.offline_mode:
+            await self.client.aclose()
+
+    async def handle_stream_event(self, event: StreamEvent) -> None:
+        if self._is_environment_outdated(event):
+            await self.update_environment()
+
+    async def get_environment_flags(self) -> Flags:
+        """
+        Get all the default for flags for the current environment.
+
+        :return: Flags object holding all the flags for the current environment.
+        """
+        if self._use_local_evaluation():
+            return self._get_environment_flags_from_document()
+        if self.environment_flags_cache_config is not None:
+            return await self._get_environment_flags_from_cache()
+        return await self._get_environment_flags_from_api()
+
+    async def get_identity_flags(
+        self,
+        identifier: str,
+        traits: typing.Optional[TraitMapping] = None,
+        *,
+        transient: bool = False,
+    ) -> Flags:
+        """
+        Get all the flags for the current environment for a given identity. Will also
+        upsert all traits to the Flagsmith API for future evaluations. Providing a
+        trait with a value of None will remove the trait from the identity if it exists.
+
+        :param identifier: a unique identifier for the identity in the current
+            environment, e.g. email address, username, uuid
+        :param traits: a dictionary of traits to add / update on the identity in
+            Flagsmith, e.g. `{"num_orders": 10}`. Envelope traits you don't want persisted
+            in a dictionary with `"transient"` and `"value"` keys, e.g.
+            `{"num_orders": 10, "color": {"value": "pink", "transient": True}}`.
+        :param transient: if `True`, the identity won't get persisted
+        :return: Flags object holding all the flags for the given identity.
+        """
+        traits = traits or {}
+        if self._use_local_evaluation():
+            return self._get_identity_flags_from_document(identifier, traits)
+        return await self._get_identity_flags_from_api(
+            identifier,
+            traits,
+            transient=transient,
+        )
+
+    async def get_identity_flags_batch(
+        self,
+        identities: typing.Iterable[IdentityData],
+        *,
+        transient: bool = False,
+        max_concurrency: int = DEFAULT_BATCH_MAX_WORKERS,
+    ) -> typing.List[Flags]:
+        """
+        Get all the flags for the current environment for each of a number of
+        identities, as per :meth:`flagsmith.Flagsmith.get_identity_flags_batch`.
+
+        :param identities: an iterable of `(identifier, traits)` pairs
+        :param transient: if `True`, the identities won't get persisted
+        :param max_concurrency: maximum number of concurrent requests to the
+            Flagsmith API when using remote evaluation
+        :return: list of Flags objects, in the same order as `identities`.
+        """
+        if self._use_local_evaluation():
+            return self._get_identity_flags_batch_from_document(identities)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_identity_flags(identity: IdentityData) -> Flags:
+            identifier, traits = identity
+            async with semaphore:
+                return await self._get_identity_flags_from_api(
+                    identifier,
+                    traits or {},
+                    transient=transient,
+                )
+
+        return list(
+            await asyncio.gather(
+                *(get_identity_flags(identity) for identity in identities)
+            )
+        )
+
+    async def get_identity_segments(
+        self,
+        identifier: str,
+        traits: typing.Optional[typing.Mapping[str, engine.ContextValue]] = None,
+    ) -> typing.List[Segment]:
+        """
+        Get a list of segments that the given identity is in.
+
+        :param identifier: a unique identifier for the identity in the current
+            environment, e.g. email address, username, uuid
+        :param traits: a dictionary of traits to add / update on the identity in
+            Flagsmith, e.g. {"num_orders": 10}
+        :return: list of Segment objects that the identity is part of.
+        """
+        return self._get_identity_segments_from_document(identifier, traits)
+
+    async def get_experiment_flag(
+        self,
+        feature_name: str,
+        identifier: str,
+        traits: typing.Optional[TraitMapping] = None,
+    ) -> typing.Union[DefaultFlag, Flag]:
+        """
+        Resolve a flag for an identity and record an exposure event.
+
+        Skips the exposure event when the resolved flag is a `DefaultFlag`
+        or when the feature is disabled, as per
+        :meth:`flagsmith.Flagsmith.get_experiment_flag`.
+        """
+        if not self._event_processor:
+            raise ValueError("Events must be enabled to use experiment flags.")
+        flags = await self.get_identity_flags(identifier, traits)
+        flag = flags.get_flag(feature_name)
+        self._track_experiment_exposure(flag, feature_name, identifier, traits)
+        return flag
+
+    async def update_environment(self) -> None:
+        if self._reads_shared_environment_snapshot:
+            self._update_environment_from_shared_snapshot()
+            return
+        try:
+            environment_document_response = await self._get_environment_document()
+        except FlagsmithAPIError:
+            logger.exception("Error retrieving environment document from API")
+            return
+
+        if environment_document_response is None:
+            logger.debug("Environment document not modified, skipping update")
+            return
+
+        # Mapping and indexing a large document would block the event loop
+        # for as long as it takes, so run it in a worker thread instead.
+        async with self._environment_update_lock:
+            await asyncio.to_thread(
+                self._apply_environment_document, *environment_document_response
+            )
+
+    async def _poll_environment(self) -> None:
+        while True:
+            await asyncio.sleep(self.environment_refresh_interval_seconds)
+            try:
+                await self.update_environment()
+            except Exception:
+                logger.exception("Error updating environment")
+
+    async def _stream_environment_updates(self, stream_url: str) -> None:
+        while True:
+            try:
+                async with httpx.AsyncClient(timeout=None) as client:
+                    async with client.stream(
+                        "GET",
+                        stream_url,
+                        headers={"Accept": "application/json, text/event-stream"},
+                    ) as response:
+                        async for event in _iter_sse_events(response):
+                            await self.handle_stream_event(
+                                map_sse_event_to_stream_event(event, self.json_codec)
+                            )
+            except Exception:
+                logger.exception("Error opening or reading from the event stream")
+                await asyncio.sleep(1)
+
+    async def _get_environment_document(
+        self,
+    ) -> typing.Optional[typing.Tuple[EnvironmentModel, typing.Dict[str, str]]]:
+        """
+        Conditionally fetch the environment document.
+
+        :return: the environment document together with the cache validators to
+            send on the next request, or None if the document has not been
+            modified since it was last applied.
+        """
+        try:
+            response = await self.client.get(
+                self.environment_url,
+                headers=self._environment_document_validators,
+            )
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                return None
+            response.raise_for_status()
+            environment_document: EnvironmentModel = self.json_codec.loads(
+                response.content
+            )
+        except (httpx.HTTPError, ValueError) as e:
+            raise FlagsmithAPIError(
+                "Unable to get valid response from Flagsmith API."
+            ) from e
+
+        return environment_document, self._get_environment_document_validators(
+            response.headers
+        )
+
+    async def _get_environment_flags_from_cache(self) -> Flags:
+        flags, should_revalidate = self._get_cached_environment_flags()
+        if flags is None:
+            return await self._get_environment_flags_from_api()
+        if should_revalidate and (
+            self._environment_flags_revalidation_task is None
+            or self._environment_flags_revalidation_task.done()
+        ):
+            self._environment_flags_revalidation_task = asyncio.create_task(
+                self._revalidate_environment_flags()
+            )
+        return flags
+
+    async def _revalidate_environment_flags(self) -> None:
+        try:
+            await self._get_environment_flags_from_api()
+        except FlagsmithAPIError:
+            logger.exception("Error refreshing environment flags from API")
+
+    async def _get_environment_flags_from_api(self) -> Flags:
+        try:
+            json_response: typing.List[typing.Mapping[str, JsonType]] = (
+                await self._get_json_response(
+                    url=self.environment_flags_url, method="GET"
+                )
+            )
+            flags = Flags.from_api_flags(
+                api_flags=json_response,
+                analytics_processor=self._analytics_processor,
+                default_flag_handler=self.default_flag_handler,
+            )
+            self._cache_environment_flags(flags)
+            return flags
+        except FlagsmithAPIError:
+            if self.offline_handler:
+                return self._get_environment_flags_from_document()
+            elif self.default_flag_handler:
+                return Flags(default_flag_handler=self.default_flag_handler)
+            raise
+
+    async def _get_identity_flags_from_api(
+        self,
+        identifier: str,
+        traits: TraitMapping,
+        *,
+        transient: bool = False,
+    ) -> Flags:
+        request_body = generate_identity_data(
+            identifier,
+            traits,
+            transient=transient,
+        )
+        cache_key = self._get_identity_flags_cache_key(request_body)
+        if (
+            cache_key is not None
+            and (
+                cached_flags := await asyncio.to_thread(
+                    self._get_cached_identity_flags, cache_key
+                )
+            )
+            is not None
+        ):
+            return cached_flags
+        try:
+            json_response: typing.Dict[str, typing.List[typing.Dict[str, JsonType]]] = (
+                await self._get_json_response(
+                    url=self.identities_url,
+                    method="POST",
+                    body=request_body,
+                )
+            )
+            if cache_key is not None:
+                await asyncio.to_thread(
+                    self._cache_identity_flags, cache_key, json_response["flags"]
+                )
+            return Flags.from_api_flags(
+                api_flags=json_response["flags"],
+                analytics_processor=self._analytics_processor,
+                default_flag_handler=self.default_flag_handler,
+            )
+        except FlagsmithAPIError:
+            if self.offline_handler:
+                return self._get_identity_flags_from_document(identifier, traits)
+            elif self.default_flag_handler:
+                return Flags(default_flag_handler=self.default_flag_handler)
+            raise
+
+    async def _get_json_response(
+        self,
+        url: str,
+        method: str,
+        body: typing.Optional[JsonType] = None,
+    ) -> typing.Any:
+        try:
+            if body is None:
+                response = await self.client.request(method, url)
+            else:
+                response = await self.client.request(
+                    method,
+                    url,
+                    content=self.json_codec.dumps(body),
+                    headers={"Content-Type": "application/json"},
+                )
+            response.raise_for_status()
+            return self.json_codec.loads(response.content)
+        except (httpx.HTTPError, ValueError) as e:
+            raise FlagsmithAPIError(
+                "Unable to get valid response from Flagsmith API."
+            ) from e
+
+
+async def _iter_sse_events(
+    response: httpx.Response,
+) -> typing.AsyncIterator[sseclient.Event]:
+    # Minimal server-sent events parser; `sseclient` only reads from
+    # synchronous iterators.
+    event_name = "message"
+    data_lines: typing.List[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                event = sseclient.Event()
+                event.event = event_name
+                event.data = "\n".join(data_lines)
+                yield event
+            event_name = "message"
+            data_lines = []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "data":
+                data_lines.append(value)
+            elif field == "event":
+                event_name = value
@@ -0,0 +1,134 @@
+import threading
+import time
+import typing
+from collections import OrderedDict
+from dataclasses import dataclass
+
+K = typing.TypeVar("K", bound=typing.Hashable)
+V = typing.TypeVar("V")
+
+
+class LRUCache(typing.Generic[K, V]):
+    """
+    Thread-safe in-memory cache.
+
+    Once `max_size` entries are held, setting a new entry evicts the least
+    recently used one. Entries expire `ttl_seconds` after they were set.
+
+    Counts `hits` and `misses` on :meth:`get`, e.g. for exporting as metrics.
+
+    Can be used as an in-memory :class:`CacheBackend`.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl_seconds: typing.Optional[float] = 60.0,
+    ) -> None:
+        """
+        :param max_size: maximum number of entries to hold.
+        :param ttl_seconds: number of seconds an entry is valid for after being
+            set. If None, entries only leave the cache when evicted or cleared.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[K, typing.Tuple[float, V]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> typing.Optional[V]:
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(
+        self,
+        key: K,
+        value: V,
+        ttl_seconds: typing.Optional[float] = None,
+    ) -> None:
+        """
+        :param ttl_seconds: number of seconds this entry is valid for,
+            overriding the cache's `ttl_seconds`.
+        """
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        expires_at = (
+            time.monotonic() + ttl_seconds if ttl_seconds is not None else float("inf")
+        )
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheBackend(typing.Protocol):
+    """
+    A cache that can be shared between clients, e.g. by several processes.
+
+    Implementations should raise
+    :class:`flagsmith.exceptions.FlagsmithCacheError` when the cache is
+    unavailable; clients then carry on without it.
+    """
+
+    def get(self, key: str) -> typing.Optional[bytes]: ...
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+
+@dataclass
+class EnvironmentFlagsCacheConfig:
+    """
+    Configuration for caching environment flags retrieved from the Flagsmith API.
+
+    :param ttl_seconds: number of seconds the flags are reused for before
+        being retrieved again.
+    :param stale_while_revalidate_seconds: number of seconds after the TTL
+        has passed for which the expired flags are still returned while they
+        are retrieved again in the background.
+    """
+
+    ttl_seconds: float = 10.0
+    stale_while_revalidate_seconds: float = 0.0
+
+
+@dataclass
+class IdentityFlagsCacheConfig:
+    """
+    Configuration for sharing identity flags retrieved from the Flagsmith API
+    through a cache backend.
+
+    :param backend: the cache to store identity flags in, e.g. a
+        :class:`flagsmith.redis_cache.RedisCacheBackend` shared between
+        processes, or an :class:`LRUCache`.
+    :param ttl_seconds: number of seconds cached identity flags are reused for.
+    :param key_prefix: prefix of the keys identity flags are stored under.
+    """
+
+    backend: CacheBackend
+    ttl_seconds: float = 60.0
+    key_prefix: str = "flagsmith:identity-flags:"
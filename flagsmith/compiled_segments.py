@@ -0,0 +1,435 @@
+"""
+Segment rules compiled into Python predicates.
+
+The engine interprets segment rules from their dict form on every
+evaluation: it dispatches on the operator string, resolves the condition
+property and re-parses the condition value for every identity. Here that
+work is done once per environment refresh instead, so the per-identity
+cost is only the property lookups and comparisons themselves.
+
+Predicates must agree with :func:`flag_engine.engine.get_evaluation_result`
+for every context; anything that can't be compiled faithfully falls back
+to the engine's own primitives.
+"""
+
+from __future__ import annotations
+
+import json
+import operator
+import re
+import typing
+
+import semver
+from flag_engine.context.mappers import map_any_value_to_context_value
+from flag_engine.context.types import (
+    FeatureContext,
+    SegmentCondition,
+    SegmentContext,
+    SegmentRule,
+)
+from flag_engine.result.types import SegmentResult
+from flag_engine.segments import constants
+from flag_engine.segments.evaluator import (
+    context_matches_condition,
+    get_context_value,
+    get_enriched_context,
+    get_flag_result_from_context,
+)
+from flag_engine.segments.types import ContextValue, is_context_value
+from flag_engine.segments.utils import get_matching_function
+from flag_engine.utils.hashing import get_hashed_percentage_for_object_ids
+from flag_engine.utils.semver import is_semver
+from flag_engine.utils.types import get_casting_function
+
+from flagsmith.types import (
+    FeatureMetadata,
+    SDKEvaluationContext,
+    SDKEvaluationResult,
+    SDKFlagResult,
+    SegmentMetadata,
+)
+
+SegmentPredicate = typing.Callable[[SDKEvaluationContext], bool]
+ContextValueGetter = typing.Callable[[SDKEvaluationContext], ContextValue]
+ValueMatcher = typing.Callable[[ContextValue], bool]
+
+CompiledSegment = typing.Tuple[
+    SegmentContext[SegmentMetadata, FeatureMetadata], SegmentPredicate
+]
+
+_TYPED_OPERATORS: typing.Dict[str, typing.Callable[[typing.Any, typing.Any], bool]] = {
+    constants.EQUAL: operator.eq,
+    constants.GREATER_THAN: operator.gt,
+    constants.GREATER_THAN_INCLUSIVE: operator.ge,
+    constants.LESS_THAN: operator.lt,
+    constants.LESS_THAN_INCLUSIVE: operator.le,
+    constants.NOT_EQUAL: operator.ne,
+    constants.CONTAINS: operator.contains,
+}
+
+# JSONPath properties made only of member-name shorthands can be resolved
+# with plain dict lookups; anything fancier goes through the engine.
+_SIMPLE_JSONPATH_RE = re.compile(r"\$(\.[A-Za-z_][A-Za-z0-9_]*)+")
+
+# Marks a condition value that can't be cast to a given context value type.
+_INVALID = object()
+
+
+class CompiledSegments:
+    """
+    The segments of an evaluation context, with their rules compiled.
+
+    Built once per environment refresh and shared by every identity
+    evaluated against that environment.
+    """
+
+    def __init__(
+        self,
+        context: SDKEvaluationContext,
+        previous: typing.Optional["CompiledSegments"] = None,
+    ) -> None:
+        """
+        :param previous: segments compiled for a previous context. Segment
+            contexts shared with `context` are not compiled again.
+        """
+        compiled = (
+            {
+                id(segment_context): matches
+                for segment_context, matches in previous.segments
+            }
+            if previous is not None
+            else {}
+        )
+        self.segments: typing.List[CompiledSegment] = [
+            (
+                segment_context,
+                compiled.get(id(segment_context)) or compile_segment(segment_context),
+            )
+            for segment_context in (context.get("segments") or {}).values()
+        ]
+        self.overrides_index: typing.Dict[str, typing.List[CompiledSegment]] = {}
+        for compiled_segment in self.segments:
+            for override in compiled_segment[0].get("overrides") or ():
+                self.overrides_index.setdefault(override["name"], []).append(
+                    compiled_segment
+                )
+
+    def get_evaluation_result(
+        self,
+        context: SDKEvaluationContext,
+        feature_name: typing.Optional[str] = None,
+        identity_overrides: typing.Optional[
+            typing.Mapping[str, SegmentContext[SegmentMetadata, FeatureMetadata]]
+        ] = None,
+    ) -> SDKEvaluationResult:
+        """
+        Equivalent of :func:`flag_engine.engine.get_evaluation_result`
+        using the compiled segments rather than ``context["segments"]``.
+
+        :param context: the evaluation context, usually for an identity.
+        :param feature_name: when given, only evaluate this feature and the
+            segments that override it.
+        :param identity_overrides: identity override segments already known
+            to match the identity, evaluated after the compiled segments.
+        """
+        context = get_enriched_context(context)
+        features = context.get("features") or {}
+        if feature_name is not None:
+            segments = self.overrides_index.get(feature_name, [])
+            features = {feature_name: features[feature_name]}
+        else:
+            segments = self.segments
+        if identity_overrides:
+            segments = [
+                *segments,
+                *(
+                    (segment_context, _matches_any_context)
+                    for segment_context in identity_overrides.values()
+                    if feature_name is None
+                    or any(
+                        override["name"] == feature_name
+                        for override in segment_context.get("overrides") or ()
+                    )
+                ),
+            ]
+
+        segment_results: typing.List[SegmentResult[SegmentMetadata]] = []
+        segment_overrides: typing.Dict[
+            str, typing.Tuple[FeatureContext[FeatureMetadata], str]
+        ] = {}
+        for segment_context, predicate in segments:
+            if not predicate(context):
+                continue
+
+            segment_result: SegmentResult[SegmentMetadata] = {
+                "name": segment_context["name"]
+            }
+            if segment_metadata := segment_context.get("metadata"):
+                segment_result["metadata"] = segment_metadata
+            segment_results.append(segment_result)
+
+            for override in segment_context.get("overrides") or ():
+                name = override["name"]
+                if name not in segment_overrides or override.get(
+                    "priority", constants.DEFAULT_PRIORITY
+                ) < segment_overrides[name][0].get(
+                    "priority", constants.DEFAULT_PRIORITY
+                ):
+                    segment_overrides[name] = (override, segment_context["name"])
+
+        flags: typing.Dict[str, SDKFlagResult] = {}
+        for name, feature_context in features.items():
+            if segment_override := segment_overrides.get(name):
+                override, segment_name = segment_override
+                flags[name] = get_flag_result_from_context(
+                    context=context,
+                    feature_context=override,
+                    reason=f"TARGETING_MATCH; segment={segment_name}",
+                )
+            else:
+                flags[name] = get_flag_result_from_context(
+                    context=context,
+                    feature_context=feature_context,
+                    reason="DEFAULT",
+                )
+
+        return {"flags": flags, "segments": segment_results}
+
+
+def compile_segment(
+    segment_context: SegmentContext[typing.Any, typing.Any],
+) -> SegmentPredicate:
+    """
+    Compile a segment's rules into a single predicate over an (enriched)
+    evaluation context.
+    """
+    if not (rules := segment_context["rules"]):
+        return lambda context: False
+
+    segment_key = segment_context["key"]
+    compiled_rules = [_compile_rule(rule, segment_key) for rule in rules]
+    return lambda context: all(rule(context) for rule in compiled_rules)
+
+
+def _compile_rule(rule: SegmentRule, segment_key: str) -> SegmentPredicate:
+    matching_function = get_matching_function(rule["type"])
+    conditions = [
+        _compile_condition(condition, segment_key)
+        for condition in rule.get("conditions") or ()
+    ]
+    sub_rules = [
+        _compile_rule(sub_rule, segment_key) for sub_rule in rule.get("rules") or ()
+    ]
+
+    def predicate(context: SDKEvaluationContext) -> bool:
+        return (
+            not conditions or matching_function(c(context) for c in conditions)
+        ) and (not sub_rules or matching_function(r(context) for r in sub_rules))
+
+    return predicate
+
+
+def _compile_condition(
+    condition: SegmentCondition,
+    segment_key: str,
+) -> SegmentPredicate:
+    try:
+        return _compile_condition_predicate(condition, segment_key)
+    except (AttributeError, TypeError, ValueError, re.error):
+        # Malformed condition values are left for the engine to deal with
+        # at evaluation time, exactly as it would without compilation.
+        return lambda context: context_matches_condition(
+            context=context, condition=condition, segment_key=segment_key
+        )
+
+
+def _compile_condition_predicate(
+    condition: SegmentCondition,
+    segment_key: str,
+) -> SegmentPredicate:
+    condition_property = condition["property"]
+    condition_operator = condition["operator"]
+    condition_value: typing.Any = condition.get("value")
+
+    if condition_operator == constants.PERCENTAGE_SPLIT:
+        get_value = (
+            _compile_property(condition_property)
+            if condition_property
+            else _get_identity_key
+        )
+        threshold = float(condition_value)
+
+        def matches_percentage_split(context: SDKEvaluationContext) -> bool:
+            if (value := get_value(context)) is None:
+                return False
+            return (
+                get_hashed_percentage_for_object_ids([segment_key, value]) <= threshold
+            )
+
+        return matches_percentage_split
+
+    get_value = _compile_property(condition_property)
+
+    if condition_operator == constants.IN:
+        in_values = _get_in_values(condition_value)
+
+        def matches_in(context: SDKEvaluationContext) -> bool:
+            value = get_value(context)
+            # Guard against comparing boolean values to numeric strings.
+            if type(value) is int:
+                value = str(value)
+            return value in in_values
+
+        return matches_in
+
+    if condition_operator == constants.IS_NOT_SET:
+        return lambda context: get_value(context) is None
+
+    if condition_operator == constants.IS_SET:
+        return lambda context: get_value(context) is not None
+
+    matcher = _compile_matcher(condition_operator, condition_value)
+
+    def matches(context: SDKEvaluationContext) -> bool:
+        value = get_value(context)
+        return value is not None and matcher(value)
+
+    return matches
+
+
+def _compile_matcher(
+    condition_operator: str,
+    segment_value: typing.Any,
+) -> ValueMatcher:
+    if condition_operator == constants.NOT_CONTAINS:
+        needle = str(segment_value)
+        return lambda value: isinstance(value, str) and needle not in value
+
+    if condition_operator == constants.REGEX:
+        pattern = re.compile(str(segment_value))
+        return lambda value: pattern.match(str(value)) is not None
+
+    if condition_operator == constants.MODULO:
+        if not segment_value:
+            return lambda value: False
+        divisor_part, remainder_part = segment_value.split("|")
+        divisor = float(divisor_part)
+        remainder = float(remainder_part)
+        return (
+            lambda value: isinstance(value, (int, float))
+            and value % divisor == remainder
+        )
+
+    if compare := _TYPED_OPERATORS.get(condition_operator):
+        return _compile_typed_matcher(compare, segment_value)
+
+    return lambda value: False
+
+
+def _compile_typed_matcher(
+    compare: typing.Callable[[typing.Any, typing.Any], bool],
+    segment_value: typing.Optional[str],
+) -> ValueMatcher:
+    # The engine casts the condition value to the type of the context value
+    # being compared; cache the cast per type so it only happens once.
+    comparands: typing.Dict[type, typing.Any] = {}
+
+    def matches(value: ContextValue) -> bool:
+        value_type = type(value)
+        if value_type not in comparands:
+            try:
+                comparands[value_type] = get_casting_function(value)(segment_value)
+            except (TypeError, ValueError):
+                comparands[value_type] = _INVALID
+        if (comparand := comparands[value_type]) is _INVALID:
+            return False
+        try:
+            return compare(value, comparand)
+        except (TypeError, ValueError):
+            return False
+
+    if segment_value is not None and is_semver(segment_value):
+        return _compile_semver_matcher(compare, segment_value, matches)
+    return matches
+
+
+def _compile_semver_matcher(
+    compare: typing.Callable[[typing.Any, typing.Any], bool],
+    segment_value: str,
+    matches: ValueMatcher,
+) -> ValueMatcher:
+    # Only string context values are compared as versions; anything else
+    # is cast like any other condition value, as the engine does.
+    try:
+        version: typing.Optional[semver.Version] = semver.Version.parse(
+            segment_value[:-7]
+        )
+    except ValueError:
+        version = None
+
+    def matches_semver(value: ContextValue) -> bool:
+        if not isinstance(value, str):
+            return matches(value)
+        if version is None:
+            return False
+        try:
+            return compare(semver.Version.parse(value), version)
+        except (TypeError, ValueError):
+            return False
+
+    return matches_semver
+
+
+def _compile_property(condition_property: str) -> ContextValueGetter:
+    if not condition_property.startswith("$."):
+        return lambda context: map_any_value_to_context_value(
+            _get_trait_value(context, condition_property)
+        )
+
+    if not _SIMPLE_JSONPATH_RE.fullmatch(condition_property):
+        return lambda context: get_context_value(context, condition_property)
+
+    path = condition_property[2:].split(".")
+
+    def get_value(context: SDKEvaluationContext) -> ContextValue:
+        # As in the engine, a trait named like the path takes precedence.
+        if (value := _get_trait_value(context, condition_property)) is None:
+            value = context
+            for key in path:
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(key)
+            if not is_context_value(value):
+                return None
+        return map_any_value_to_context_value(value)
+
+    return get_value
+
+
+def _matches_any_context(context: SDKEvaluationContext) -> bool:
+    return True
+
+
+def _get_trait_value(context: SDKEvaluationContext, trait_key: str) -> typing.Any:
+    if identity_context := context.get("identity"):
+        if traits := identity_context.get("traits"):
+            return traits.get(trait_key)
+    return None
+
+
+def _get_identity_key(context: SDKEvaluationContext) -> typing.Optional[str]:
+    if identity_context := context.get("identity"):
+        return identity_context.get("key")
+    return None
+
+
+def _get_in_values(segment_value: typing.Any) -> typing.FrozenSet[str]:
+    if isinstance(segment_value, list):
+        return frozenset(v if type(v) is str else str(v) for v in segment_value)
+    if segment_value.startswith("["):
+        try:
+            parsed = json.loads(segment_value)
+        except ValueError:
+            return frozenset(segment_value.split(","))
+        return frozenset(v if type(v) is str else str(v) for v in parsed)
+    return frozenset(segment_value.split(","))
@@ -8,3 +8,7 @@ class FlagsmithAPIError(FlagsmithClientError):
 
 class FlagsmithFeatureDoesNotExistError(FlagsmithClientError):
     pass
+
+
+class FlagsmithCacheError(FlagsmithClientError):
+    pass
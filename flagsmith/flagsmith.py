@@ -1,6 +1,12 @@
+import hashlib
+import json
 import logging
+import threading
+import time
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from http import HTTPStatus
 from urllib.parse import urljoin
 
 import requests
@@ -11,36 +17,65 @@ from urllib3 import Retry
 from flagsmith.analytics import (
     FLAG_EXPOSURE_EVENT,
     AnalyticsProcessor,
+    AnalyticsProcessorConfig,
+    AnalyticsTransport,
+    AnalyticsTransportConfig,
     EventProcessor,
     EventProcessorConfig,
 )
-from flagsmith.exceptions import FlagsmithAPIError, FlagsmithClientError
+from flagsmith.api.types import EnvironmentModel
+from flagsmith.cache import (
+    EnvironmentFlagsCacheConfig,
+    IdentityFlagsCacheConfig,
+    LRUCache,
+)
+from flagsmith.compiled_segments import CompiledSegments
+from flagsmith.exceptions import (
+    FlagsmithAPIError,
+    FlagsmithCacheError,
+    FlagsmithClientError,
+)
+from flagsmith.json_codecs import JsonCodec, get_default_json_codec
 from flagsmith.mappers import (
+    EnvironmentDocumentDigest,
     map_context_and_identity_data_to_context,
     map_environment_document_to_context,
+    map_environment_document_to_digest,
     map_environment_document_to_environment_updated_at,
     map_segment_results_to_identity_segments,
+    map_streamed_environment_document_to_context,
     resolve_trait_values,
 )
 from flagsmith.models import (
     DefaultFlag,
     Flag,
     Flags,
+    IdentityOverridesIndex,
     Segment,
     SegmentOverridesIndex,
+    build_identity_overrides_index,
     build_segment_overrides_index,
+    get_identity_overrides,
+    update_identity_overrides_index,
+    update_segment_overrides_index,
 )
 from flagsmith.offline_handlers import OfflineHandler
 from flagsmith.polling_manager import EnvironmentDataPollingManager
+from flagsmith.shared_environment import SharedEnvironmentSnapshot
 from flagsmith.streaming_manager import EventStreamManager
 from flagsmith.types import (
     ApplicationMetadata,
+    IdentityData,
     JsonType,
     SDKEvaluationContext,
+    SDKEvaluationResult,
     StreamEvent,
     TraitMapping,
 )
-from flagsmith.utils.identities import generate_identity_data
+from flagsmith.utils.identities import (
+    generate_identity_cache_key,
+    generate_identity_data,
+)
 from flagsmith.version import __version__
 
 logger = logging.getLogger(__name__)
@@ -48,9 +83,617 @@ logger = logging.getLogger(__name__)
 DEFAULT_API_URL = "https://edge.api.flagsmith.com/api/v1/"
 DEFAULT_REALTIME_API_URL = "https://realtime.flagsmith.com/"
 DEFAULT_USER_AGENT = f"flagsmith-python-sdk/{__version__}"
+DEFAULT_BATCH_MAX_WORKERS = 10
+ENVIRONMENT_DOCUMENT_CHUNK_SIZE = 64 * 1024
+
+
+class BaseFlagsmith:
+    """
+    Configuration and local evaluation logic shared by the synchronous
+    :class:`Flagsmith` client and the asyncio
+    :class:`flagsmith.async_flagsmith.AsyncFlagsmith` client.
+
+    Subclasses own the transport used to talk to the Flagsmith API.
+    """
+
+    def __init__(
+        self,
+        environment_key: typing.Optional[str],
+        api_url: typing.Optional[str],
+        realtime_api_url: typing.Optional[str],
+        analytics_url: typing.Optional[str],
+        request_timeout_seconds: typing.Optional[int],
+        enable_local_evaluation: bool,
+        environment_refresh_interval_seconds: typing.Union[int, float],
+        enable_analytics: bool,
+        analytics_processor_config: typing.Optional[AnalyticsProcessorConfig],
+        enable_events: bool,
+        event_processor_config: typing.Optional[EventProcessorConfig],
+        default_flag_handler: typing.Optional[typing.Callable[[str], DefaultFlag]],
+        offline_mode: bool,
+        offline_handler: typing.Optional[OfflineHandler],
+        enable_realtime_updates: bool,
+        enable_compiled_segments: bool,
+        identity_flags_cache: typing.Optional[LRUCache[typing.Any, Flags]],
+        environment_flags_cache_config: typing.Optional[EnvironmentFlagsCacheConfig],
+        remote_identity_flags_cache_config: typing.Optional[IdentityFlagsCacheConfig],
+        shared_environment_snapshot: typing.Optional[SharedEnvironmentSnapshot],
+        json_codec: typing.Optional[JsonCodec],
+    ):
+        self.offline_mode = offline_mode
+        self.enable_local_evaluation = enable_local_evaluation
+        self.environment_refresh_interval_seconds = environment_refresh_interval_seconds
+        self.offline_handler = offline_handler
+        self.default_flag_handler = default_flag_handler
+        self.enable_realtime_updates = enable_realtime_updates
+        self.enable_compiled_segments = enable_compiled_segments
+        self.identity_flags_cache = identity_flags_cache
+        self.environment_flags_cache_config = environment_flags_cache_config
+        self.remote_identity_flags_cache_config = remote_identity_flags_cache_config
+        self.shared_environment_snapshot = shared_environment_snapshot
+        self.json_codec = json_codec or get_default_json_codec()
+        # Identity flags are shared through the cache per environment, without
+        # storing the environment key itself in the cache.
+        self._identity_flags_cache_key_prefix = (
+            remote_identity_flags_cache_config.key_prefix
+            + hashlib.sha256((environment_key or "").encode()).hexdigest()[:16]
+            + ":"
+            if remote_identity_flags_cache_config is not None
+            else ""
+        )
+        self._analytics_processor: typing.Optional[AnalyticsProcessor] = None
+        self._event_processor: typing.Optional[EventProcessor] = None
+        self.__evaluation_context: typing.Optional[SDKEvaluationContext] = None
+        self._identity_evaluation_context: typing.Optional[SDKEvaluationContext] = None
+        self._identity_overrides_index: IdentityOverridesIndex = {}
+        self._segment_overrides_index: SegmentOverridesIndex = {}
+        self._compiled_segments: typing.Optional[CompiledSegments] = None
+        self._environment_updated_at: typing.Optional[datetime] = None
+        # Digest of the environment document last mapped, and the context it
+        # was mapped to, so the next document only needs mapping where it
+        # differs.
+        self._mapped_environment_document: typing.Optional[
+            typing.Tuple[EnvironmentDocumentDigest, SDKEvaluationContext]
+        ] = None
+        # Evaluation result of the environment flags last evaluated locally,
+        # keyed by the evaluation context they were evaluated from.
+        self._environment_flags: typing.Optional[
+            typing.Tuple[SDKEvaluationContext, SDKEvaluationResult]
+        ] = None
+        # Environment flags last retrieved from the API, along with the
+        # `time.monotonic()` they were retrieved at.
+        self._cached_environment_flags: typing.Optional[typing.Tuple[float, Flags]] = (
+            None
+        )
+        # Cache validators (If-None-Match / If-Modified-Since) taken from the
+        # last environment document that was successfully applied.
+        self._environment_document_validators: typing.Dict[str, str] = {}
+
+        # argument validation
+        if offline_mode and not offline_handler:
+            raise ValueError("offline_handler must be provided to use offline mode.")
+        elif default_flag_handler and offline_handler:
+            raise ValueError(
+                "Cannot use both default_flag_handler and offline_handler."
+            )
+
+        if enable_realtime_updates and not enable_local_evaluation:
+            raise ValueError(
+                "Can only use realtime updates when running in local evaluation mode."
+            )
+
+        if shared_environment_snapshot is not None and not enable_local_evaluation:
+            raise ValueError(
+                "Can only share the environment when running in local evaluation mode."
+            )
+
+        self._validate_processor_configs(
+            enable_analytics=enable_analytics,
+            analytics_processor_config=analytics_processor_config,
+            enable_events=enable_events,
+            event_processor_config=event_processor_config,
+        )
+
+        if self.offline_handler:
+            self._evaluation_context = map_environment_document_to_context(
+                self.offline_handler.get_environment()
+            )
+
+        if not self.offline_mode:
+            if not environment_key:
+                raise ValueError("environment_key is required.")
+
+            if self.enable_local_evaluation and not environment_key.startswith("ser."):
+                raise ValueError(
+                    "In order to use local evaluation, please generate a server key "
+                    "in the environment settings page."
+                )
 
+            self.api_url = self._ensure_trailing_slash(api_url or DEFAULT_API_URL)
+            self.realtime_api_url = self._ensure_trailing_slash(
+                realtime_api_url or DEFAULT_REALTIME_API_URL
+            )
+            self.analytics_url = (
+                self._ensure_trailing_slash(analytics_url) if analytics_url else None
+            )
+
+            self.request_timeout_seconds = request_timeout_seconds
+
+            self.environment_flags_url = urljoin(self.api_url, "flags/")
+            self.identities_url = urljoin(self.api_url, "identities/")
+            self.environment_url = urljoin(self.api_url, "environment-document/")
+
+    @staticmethod
+    def _validate_processor_configs(
+        enable_analytics: bool,
+        analytics_processor_config: typing.Optional[AnalyticsProcessorConfig],
+        enable_events: bool,
+        event_processor_config: typing.Optional[EventProcessorConfig],
+    ) -> None:
+        if analytics_processor_config is not None and not enable_analytics:
+            raise ValueError(
+                "analytics_processor_config can only be set when enable_analytics=True."
+            )
+
+        if event_processor_config is not None and not enable_events:
+            raise ValueError(
+                "event_processor_config can only be set when enable_events=True."
+            )
+
+    @staticmethod
+    def _ensure_trailing_slash(url: str) -> str:
+        return url if url.endswith("/") else f"{url}/"
+
+    def _get_stream_url(self) -> str:
+        if not self._evaluation_context:
+            raise ValueError("Unable to get environment from API key")
+
+        return urljoin(
+            self.realtime_api_url,
+            f"sse/environments/{self._evaluation_context['environment']['key']}/stream",
+        )
+
+    def _is_environment_outdated(self, event: StreamEvent) -> bool:
+        if not (environment_updated_at := self._environment_updated_at):
+            raise ValueError(
+                "Cannot handle stream events before retrieving initial environment"
+            )
+        return event["updated_at"] > environment_updated_at
+
+    def _use_local_evaluation(self) -> bool:
+        return (
+            self.offline_mode or self.enable_local_evaluation
+        ) and self._evaluation_context is not None
+
+    def _get_identity_segments_from_document(
+        self,
+        identifier: str,
+        traits: typing.Optional[typing.Mapping[str, engine.ContextValue]],
+    ) -> typing.List[Segment]:
+        if not self._identity_evaluation_context:
+            raise FlagsmithClientError(
+                "Local evaluation required to obtain identity segments."
+            )
+
+        # Identity overrides are left out: they are never reported as segments.
+        context = map_context_and_identity_data_to_context(
+            context=self._identity_evaluation_context,
+            identifier=identifier,
+            traits=traits,
+        )
+
+        if self._compiled_segments is not None:
+            evaluation_result = self._compiled_segments.get_evaluation_result(context)
+        else:
+            evaluation_result = engine.get_evaluation_result(
+                context=context,
+            )
+
+        return map_segment_results_to_identity_segments(evaluation_result["segments"])
+
+    def _track_experiment_exposure(
+        self,
+        flag: typing.Union[DefaultFlag, Flag],
+        feature_name: str,
+        identifier: str,
+        traits: typing.Optional[TraitMapping],
+    ) -> None:
+        if isinstance(flag, Flag) and flag.enabled:
+            self.track_exposure_event(
+                feature_name=feature_name,
+                identifier=identifier,
+                value=flag.variant if flag.variant is not None else flag.value,
+                traits=traits,
+            )
 
-class Flagsmith:
+    def track_event(
+        self,
+        event: str,
+        identifier: typing.Optional[str] = None,
+        value: typing.Optional[typing.Union[str, int, float, bool]] = None,
+        traits: typing.Optional[TraitMapping] = None,
+        metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    ) -> None:
+        if not self._event_processor:
+            raise ValueError("Events must be enabled to track events.")
+        if event.startswith("$") and event != FLAG_EXPOSURE_EVENT:
+            raise ValueError(
+                f'Event name "{event}" uses the reserved "$" prefix '
+                "but is not a known system event."
+            )
+        self._event_processor.track_event(
+            event=event,
+            identifier=identifier,
+            value=value,
+            traits=resolve_trait_values(traits),
+            metadata=metadata,
+        )
+
+    def track_exposure_event(
+        self,
+        feature_name: str,
+        identifier: typing.Optional[str] = None,
+        value: typing.Optional[typing.Union[str, int, float, bool]] = None,
+        traits: typing.Optional[TraitMapping] = None,
+        metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
+    ) -> None:
+        if not self._event_processor:
+            raise ValueError("Events must be enabled to track exposure events.")
+        self._event_processor.track_exposure_event(
+            feature_name=feature_name,
+            identifier=identifier,
+            value=value,
+            traits=resolve_trait_values(traits),
+            metadata=metadata,
+        )
+
+    def _apply_environment_document(
+        self,
+        environment_data: EnvironmentModel,
+        validators: typing.Dict[str, str],
+    ) -> None:
+        try:
+            environment_updated_at = map_environment_document_to_environment_updated_at(
+                environment_data,
+            )
+            # Remapping the document also rebuilds the overrides index, so
+            # avoid it when the environment has not changed.
+            if not self._is_environment_up_to_date(environment_updated_at):
+                digest = map_environment_document_to_digest(
+                    environment_data, self.json_codec
+                )
+                context = map_environment_document_to_context(
+                    environment_data,
+                    previous=self._get_previous_environment_document(),
+                    digest=digest,
+                )
+                self._set_environment(context, environment_updated_at)
+                self._mapped_environment_document = digest, context
+        except (KeyError, TypeError, ValueError):
+            logger.exception("Error parsing environment document")
+        else:
+            # Only trust the validators once the document has been applied,
+            # otherwise a bad document would be pinned by 304 responses.
+            self._environment_document_validators = validators
+
+    def _get_previous_environment_document(
+        self,
+    ) -> typing.Optional[typing.Tuple[EnvironmentDocumentDigest, SDKEvaluationContext]]:
+        mapped = self._mapped_environment_document
+        # The context may have been replaced since, e.g. by a streamed document.
+        if mapped is None or mapped[1] is not self._evaluation_context:
+            return None
+        return mapped
+
+    def _is_environment_up_to_date(self, environment_updated_at: datetime) -> bool:
+        if (
+            self._evaluation_context is not None
+            and self._environment_updated_at is not None
+            and environment_updated_at <= self._environment_updated_at
+        ):
+            logger.debug("Environment document unchanged, skipping update")
+            return True
+        return False
+
+    def _set_environment(
+        self,
+        context: SDKEvaluationContext,
+        environment_updated_at: datetime,
+    ) -> None:
+        self._evaluation_context = context
+        self._environment_updated_at = environment_updated_at
+        self._publish_shared_environment_snapshot()
+
+    @property
+    def _reads_shared_environment_snapshot(self) -> bool:
+        return (
+            self.shared_environment_snapshot is not None
+            and not self.shared_environment_snapshot.writer
+        )
+
+    def _publish_shared_environment_snapshot(self) -> None:
+        snapshot = self.shared_environment_snapshot
+        if snapshot is None or not snapshot.writer:
+            return
+        assert self._evaluation_context is not None
+        assert self._environment_updated_at is not None
+        try:
+            snapshot.publish(self._evaluation_context, self._environment_updated_at)
+        except OSError:
+            logger.exception("Error publishing shared environment snapshot")
+
+    def _update_environment_from_shared_snapshot(self) -> None:
+        assert self.shared_environment_snapshot is not None
+        try:
+            snapshot = self.shared_environment_snapshot.read()
+        except (OSError, KeyError, ValueError):
+            logger.exception("Error reading shared environment snapshot")
+            return
+        if snapshot is None:
+            logger.debug("Shared environment snapshot unchanged, skipping update")
+            return
+        self._evaluation_context, self._environment_updated_at = snapshot
+
+    @staticmethod
+    def _get_environment_document_validators(
+        response_headers: typing.Mapping[str, str],
+    ) -> typing.Dict[str, str]:
+        validators = {}
+        if etag := response_headers.get("ETag"):
+            validators["If-None-Match"] = etag
+        if last_modified := response_headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = last_modified
+        return validators
+
+    @property
+    def _evaluation_context(self) -> typing.Optional[SDKEvaluationContext]:
+        return self.__evaluation_context
+
+    @_evaluation_context.setter
+    def _evaluation_context(
+        self, context: typing.Optional[SDKEvaluationContext]
+    ) -> None:
+        """Swap in a new evaluation context and rebuild the overrides index.
+
+        The index maps feature_name -> segments that override it. Built once
+        per refresh and reused across every subsequent per-identity lazy
+        resolution; rebuilding here keeps it in sync with the current doc
+        without any hot-path cost. The same goes for the identifier ->
+        identity overrides index, and for the compiled segment rules when
+        `enable_compiled_segments` is set. Indexes and compiled rules are
+        patched rather than rebuilt for the segments the new context shares
+        with the previous one. Identity and environment flags evaluated from
+        the previous context are dropped.
+        """
+        previous_context = self.__evaluation_context
+        previous_identity_context = self._identity_evaluation_context
+        self.__evaluation_context = context
+        self._environment_flags = None
+        if self.identity_flags_cache is not None:
+            self.identity_flags_cache.clear()
+        if context is None:
+            self._identity_evaluation_context = None
+            self._identity_overrides_index = {}
+            self._segment_overrides_index = {}
+            self._compiled_segments = None
+            return
+
+        if previous_context is None or previous_identity_context is None:
+            (
+                self._identity_evaluation_context,
+                self._identity_overrides_index,
+            ) = build_identity_overrides_index(context)
+            self._segment_overrides_index = build_segment_overrides_index(
+                self._identity_evaluation_context
+            )
+        else:
+            (
+                self._identity_evaluation_context,
+                self._identity_overrides_index,
+            ) = update_identity_overrides_index(
+                context,
+                previous_context,
+                previous_identity_context,
+                self._identity_overrides_index,
+            )
+            self._segment_overrides_index = update_segment_overrides_index(
+                self._segment_overrides_index,
+                previous_identity_context,
+                self._identity_evaluation_context,
+            )
+        self._compiled_segments = (
+            CompiledSegments(
+                self._identity_evaluation_context,
+                previous=self._compiled_segments,
+            )
+            if self.enable_compiled_segments
+            else None
+        )
+
+    def _get_cached_environment_flags(
+        self,
+    ) -> typing.Tuple[typing.Optional[Flags], bool]:
+        """
+        Get the environment flags cached from the API, if still usable.
+
+        :return: the cached flags, or None if there are none or they have
+            expired, and whether they should be retrieved again in the
+            background.
+        """
+        config = self.environment_flags_cache_config
+        if config is None or (cached := self._cached_environment_flags) is None:
+            return None, False
+        retrieved_at, flags = cached
+        age = time.monotonic() - retrieved_at
+        if age < config.ttl_seconds:
+            return flags, False
+        if age < config.ttl_seconds + config.stale_while_revalidate_seconds:
+            return flags, True
+        return None, False
+
+    def _cache_environment_flags(self, flags: Flags) -> None:
+        if self.environment_flags_cache_config is not None:
+            self._cached_environment_flags = (time.monotonic(), flags)
+
+    def _get_identity_flags_cache_key(
+        self, request_body: JsonType
+    ) -> typing.Optional[str]:
+        if self.remote_identity_flags_cache_config is None:
+            return None
+        body_digest = hashlib.sha256(
+            json.dumps(request_body, sort_keys=True).encode()
+        ).hexdigest()
+        return self._identity_flags_cache_key_prefix + body_digest
+
+    def _get_cached_identity_flags(
+        self, key: typing.Optional[str]
+    ) -> typing.Optional[Flags]:
+        """
+        Get identity flags previously retrieved from the API from the shared
+        cache, if configured and present.
+        """
+        config = self.remote_identity_flags_cache_config
+        if config is None or key is None:
+            return None
+        try:
+            cached = config.backend.get(key)
+        except FlagsmithCacheError:
+            logger.warning("Error reading identity flags from cache", exc_info=True)
+            return None
+        if cached is None:
+            return None
+        return Flags.from_api_flags(
+            api_flags=self.json_codec.loads(cached),
+            analytics_processor=self._analytics_processor,
+            default_flag_handler=self.default_flag_handler,
+        )
+
+    def _cache_identity_flags(
+        self,
+        key: typing.Optional[str],
+        api_flags: typing.Sequence[typing.Mapping[str, JsonType]],
+    ) -> None:
+        config = self.remote_identity_flags_cache_config
+        if config is None or key is None:
+            return
+        try:
+            config.backend.set(
+                key, self.json_codec.dumps(api_flags), config.ttl_seconds
+            )
+        except FlagsmithCacheError:
+            logger.warning("Error writing identity flags to cache", exc_info=True)
+
+    def _get_headers(
+        self,
+        environment_key: str,
+        application_metadata: typing.Optional[ApplicationMetadata],
+        custom_headers: typing.Optional[typing.Dict[str, typing.Any]],
+    ) -> typing.Dict[str, str]:
+        headers = {
+            "X-Environment-Key": environment_key,
+            "User-Agent": DEFAULT_USER_AGENT,
+        }
+        if application_metadata:
+            if name := application_metadata.get("name"):
+                headers["Flagsmith-Application-Name"] = name
+            if version := application_metadata.get("version"):
+                headers["Flagsmith-Application-Version"] = version
+        headers.update(custom_headers or {})
+        return headers
+
+    def _get_identity_flags_batch_from_document(
+        self,
+        identities: typing.Iterable[IdentityData],
+    ) -> typing.List[Flags]:
+        # Read the context and index once so that every identity in the batch
+        # is evaluated against the same environment, even if a refresh lands
+        # part way through. `_environment_updated_at` is only set after the
+        # context is swapped, so read it first to never pair it with an older
+        # context in cache keys.
+        environment_updated_at = self._environment_updated_at
+        evaluation_context = self._identity_evaluation_context
+        identity_overrides_index = self._identity_overrides_index
+        overrides_index = self._segment_overrides_index
+        compiled_segments = self._compiled_segments
+        if evaluation_context is None:
+            raise TypeError("No environment present")
+
+        cache = self.identity_flags_cache
+        flags_list = []
+        for identifier, traits in identities:
+            cache_key = None
+            if cache is not None and (
+                (identity_key := generate_identity_cache_key(identifier, traits))
+                is not None
+            ):
+                cache_key = (identity_key, environment_updated_at)
+                if (flags := cache.get(cache_key)) is not None:
+                    flags_list.append(flags)
+                    continue
+
+            context = map_context_and_identity_data_to_context(
+                context=evaluation_context,
+                identifier=identifier,
+                traits=traits,
+            )
+            flags = Flags.from_evaluation_context(
+                context=context,
+                overrides_index=overrides_index,
+                compiled_segments=compiled_segments,
+                identity_overrides=get_identity_overrides(
+                    context, identity_overrides_index
+                ),
+                analytics_processor=self._analytics_processor,
+                default_flag_handler=self.default_flag_handler,
+            )
+            if cache is not None and cache_key is not None:
+                cache.set(cache_key, flags)
+            flags_list.append(flags)
+        return flags_list
+
+    def _get_environment_flags_from_document(self) -> Flags:
+        if (context := self._evaluation_context) is None:
+            raise TypeError("No environment present")
+
+        # Environment flags only change with the evaluation context, so
+        # evaluate them once per context. Comparing the context, rather than
+        # relying on the setter's reset alone, ignores flags evaluated by a
+        # concurrent call from a context that has since been replaced.
+        environment_flags = self._environment_flags
+        if environment_flags is None or environment_flags[0] is not context:
+            # Omit segments from evaluation context for environment flags
+            # as they are only relevant for identity-specific evaluations
+            context_without_segments = context.copy()
+            context_without_segments.pop("segments", None)
+
+            evaluation_result = engine.get_evaluation_result(
+                context=context_without_segments,
+            )
+            environment_flags = (context, evaluation_result)
+            if context is self._evaluation_context:
+                self._environment_flags = environment_flags
+
+        # Callers may modify their flags, so each gets its own, built from
+        # the shared evaluation result only as they are read.
+        return Flags.from_shared_evaluation_result(
+            evaluation_result=environment_flags[1],
+            analytics_processor=self._analytics_processor,
+            default_flag_handler=self.default_flag_handler,
+        )
+
+    def _get_identity_flags_from_document(
+        self,
+        identifier: str,
+        traits: TraitMapping,
+    ) -> Flags:
+        # Lazy: defer per-feature evaluation until the caller actually reads
+        # a flag. Hot for callers that only read one or a few flags out of a
+        # large environment.
+        [flags] = self._get_identity_flags_batch_from_document([(identifier, traits)])
+        return flags
+
+
+class Flagsmith(BaseFlagsmith):
     """A Flagsmith client.
 
     Provides an interface for interacting with the Flagsmith http API.
@@ -87,6 +730,19 @@ class Flagsmith:
         offline_handler: typing.Optional[OfflineHandler] = None,
         enable_realtime_updates: bool = False,
         application_metadata: typing.Optional[ApplicationMetadata] = None,
+        analytics_processor_config: typing.Optional[AnalyticsProcessorConfig] = None,
+        analytics_transport_config: typing.Optional[AnalyticsTransportConfig] = None,
+        enable_compiled_segments: bool = False,
+        identity_flags_cache: typing.Optional[LRUCache[typing.Any, Flags]] = None,
+        environment_flags_cache_config: typing.Optional[
+            EnvironmentFlagsCacheConfig
+        ] = None,
+        remote_identity_flags_cache_config: typing.Optional[
+            IdentityFlagsCacheConfig
+        ] = None,
+        shared_environment_snapshot: typing.Optional[SharedEnvironmentSnapshot] = None,
+        stream_environment_document: bool = False,
+        json_codec: typing.Optional[JsonCodec] = None,
     ):
         """
         :param environment_key: The environment key obtained from Flagsmith interface.
@@ -126,46 +782,76 @@ class Flagsmith:
             default_flag_handler if offline_mode is not set and using remote evaluation.
         :param enable_realtime_updates: Use real-time functionality via SSE as opposed to polling the API
         :param application_metadata: Optional metadata about the client application.
+        :param analytics_processor_config: optional configuration for how often
+            flag analytics are flushed. Only valid when ``enable_analytics=True``.
+        :param analytics_transport_config: optional configuration for the HTTP
+            transport this client sends flag analytics and events with.
+        :param enable_compiled_segments: when evaluating flags locally, compile
+            segment rules into Python callables each time the environment is
+            refreshed, instead of interpreting them for every identity. Speeds
+            up segment-heavy identity evaluation at the cost of slower refreshes.
+        :param identity_flags_cache: when evaluating flags locally, cache the
+            identity flags returned for each identifier and set of trait values
+            here, e.g. ``LRUCache(max_size=1000, ttl_seconds=60)``. Cached flags
+            are dropped whenever the environment changes. The cache's ``hits``
+            and ``misses`` counters can be used to monitor it.
+        :param environment_flags_cache_config: when evaluating flags remotely,
+            reuse the environment flags retrieved from the Flagsmith API as per
+            this configuration, rather than requesting them on every call.
+        :param remote_identity_flags_cache_config: when evaluating flags
+            remotely, share the identity flags retrieved from the Flagsmith API
+            through the configured cache backend, e.g. between processes.
+            Identities whose flags are served from the cache do not have their
+            traits persisted by that call.
+        :param shared_environment_snapshot: when evaluating flags locally,
+            share the environment with other processes through this snapshot.
+            A writer snapshot publishes each environment retrieved from the
+            API; otherwise the environment is reloaded from the snapshot every
+            ``environment_refresh_interval_seconds`` instead of the API.
+        :param stream_environment_document: when evaluating flags locally,
+            map the environment document while it is downloaded, rather than
+            loading the whole document first. Reduces peak memory use when
+            refreshing large environments.
+        :param json_codec: codec to encode and decode JSON with, e.g.
+            ``StdlibJsonCodec()`` from :mod:`flagsmith.json_codecs`. Defaults
+            to the fastest installed JSON library: orjson, then msgspec, then
+            the standard library.
         """
-
-        self.offline_mode = offline_mode
-        self.enable_local_evaluation = enable_local_evaluation
-        self.environment_refresh_interval_seconds = environment_refresh_interval_seconds
-        self.offline_handler = offline_handler
-        self.default_flag_handler = default_flag_handler
-        self.enable_realtime_updates = enable_realtime_updates
-        self._analytics_processor: typing.Optional[AnalyticsProcessor] = None
-        self._event_processor: typing.Optional[EventProcessor] = None
-        self.__evaluation_context: typing.Optional[SDKEvaluationContext] = None
-        self._segment_overrides_index: SegmentOverridesIndex = {}
-        self._environment_updated_at: typing.Optional[datetime] = None
-
-        # argument validation
-        if offline_mode and not offline_handler:
-            raise ValueError("offline_handler must be provided to use offline mode.")
-        elif default_flag_handler and offline_handler:
-            raise ValueError(
-                "Cannot use both default_flag_handler and offline_handler."
-            )
-
-        if enable_realtime_updates and not enable_local_evaluation:
-            raise ValueError(
-                "Can only use realtime updates when running in local evaluation mode."
-            )
-
-        if event_processor_config is not None and not enable_events:
-            raise ValueError(
-                "event_processor_config can only be set when enable_events=True."
-            )
-
-        if self.offline_handler:
-            self._evaluation_context = map_environment_document_to_context(
-                self.offline_handler.get_environment()
-            )
+        super().__init__(
+            environment_key=environment_key,
+            api_url=api_url,
+            realtime_api_url=realtime_api_url,
+            analytics_url=analytics_url,
+            request_timeout_seconds=request_timeout_seconds,
+            enable_local_evaluation=enable_local_evaluation,
+            environment_refresh_interval_seconds=environment_refresh_interval_seconds,
+            enable_analytics=enable_analytics,
+            analytics_processor_config=analytics_processor_config,
+            enable_events=enable_events,
+            event_processor_config=event_processor_config,
+            default_flag_handler=default_flag_handler,
+            offline_mode=offline_mode,
+            offline_handler=offline_handler,
+            enable_realtime_updates=enable_realtime_updates,
+            enable_compiled_segments=enable_compiled_segments,
+            identity_flags_cache=identity_flags_cache,
+            environment_flags_cache_config=environment_flags_cache_config,
+            remote_identity_flags_cache_config=remote_identity_flags_cache_config,
+            shared_environment_snapshot=shared_environment_snapshot,
+            json_codec=json_codec,
+        )
+        # Flag analytics and events are sent through a transport owned by
+        # this client, rather than competing with other clients for threads.
+        self._analytics_transport = AnalyticsTransport(analytics_transport_config)
+        self.stream_environment_document = stream_environment_document
+        # Held while the cached environment flags are being refreshed in the
+        # background, so only one refresh runs at a time.
+        self._environment_flags_revalidation_lock = threading.Lock()
 
         if not self.offline_mode:
-            if not environment_key:
-                raise ValueError("environment_key is required.")
+            # `BaseFlagsmith` rejects a missing key outside offline mode;
+            # assert here so type checkers can narrow.
+            assert environment_key is not None
 
             self.session = requests.Session()
             self.session.headers.update(
@@ -177,35 +863,16 @@ class Flagsmith:
             )
             self.session.proxies.update(proxies or {})
             retries = retries or Retry(total=3, backoff_factor=0.1)
-
-            self.api_url = self._ensure_trailing_slash(api_url or DEFAULT_API_URL)
-            self.realtime_api_url = self._ensure_trailing_slash(
-                realtime_api_url or DEFAULT_REALTIME_API_URL
-            )
-            self.analytics_url = (
-                self._ensure_trailing_slash(analytics_url) if analytics_url else None
-            )
-
-            self.request_timeout_seconds = request_timeout_seconds
             self.session.mount(self.api_url, HTTPAdapter(max_retries=retries))
 
-            self.environment_flags_url = urljoin(self.api_url, "flags/")
-            self.identities_url = urljoin(self.api_url, "identities/")
-            self.environment_url = urljoin(self.api_url, "environment-document/")
-
             if self.enable_local_evaluation:
-                if not environment_key.startswith("ser."):
-                    raise ValueError(
-                        "In order to use local evaluation, please generate a server key "
-                        "in the environment settings page."
-                    )
-
                 self._initialise_local_evaluation()
 
             self._initialise_analytics(
                 environment_key=environment_key,
                 enable_analytics=enable_analytics,
                 analytics_url=self.analytics_url,
+                analytics_processor_config=analytics_processor_config,
             )
             self._initialise_events(
                 environment_key=environment_key,
@@ -213,15 +880,12 @@ class Flagsmith:
                 event_processor_config=event_processor_config,
             )
 
-    @staticmethod
-    def _ensure_trailing_slash(url: str) -> str:
-        return url if url.endswith("/") else f"{url}/"
-
     def _initialise_analytics(
         self,
         environment_key: str,
         enable_analytics: bool,
         analytics_url: typing.Optional[str] = None,
+        analytics_processor_config: typing.Optional[AnalyticsProcessorConfig] = None,
     ) -> None:
         if enable_analytics:
             self._analytics_processor = AnalyticsProcessor(
@@ -229,7 +893,11 @@ class Flagsmith:
                 self.api_url,
                 timeout=self.request_timeout_seconds,
                 analytics_url=analytics_url,
+                config=analytics_processor_config,
+                transport=self._analytics_transport,
+                json_codec=self.json_codec,
             )
+            self._analytics_processor.start()
 
     def _initialise_events(
         self,
@@ -241,6 +909,8 @@ class Flagsmith:
             self._event_processor = EventProcessor(
                 config=event_processor_config or EventProcessorConfig(),
                 environment_key=environment_key,
+                transport=self._analytics_transport,
+                json_codec=self.json_codec,
             )
             self._event_processor.start()
 
@@ -249,17 +919,10 @@ class Flagsmith:
         # method calls, update the environment manually.
         self.update_environment()
         if self.enable_realtime_updates:
-            if not self._evaluation_context:
-                raise ValueError("Unable to get environment from API key")
-
-            stream_url = urljoin(
-                self.realtime_api_url,
-                f"sse/environments/{self._evaluation_context['environment']['key']}/stream",
-            )
-
             self.event_stream_thread = EventStreamManager(
-                stream_url=stream_url,
+                stream_url=self._get_stream_url(),
                 on_event=self.handle_stream_event,
+                json_codec=self.json_codec,
                 daemon=True,
             )
 
@@ -277,11 +940,7 @@ class Flagsmith:
             self.environment_data_polling_manager_thread.start()
 
     def handle_stream_event(self, event: StreamEvent) -> None:
-        if not (environment_updated_at := self._environment_updated_at):
-            raise ValueError(
-                "Cannot handle stream events before retrieving initial environment"
-            )
-        if event["updated_at"] > environment_updated_at:
+        if self._is_environment_outdated(event):
             self.update_environment()
 
     def get_environment_flags(self) -> Flags:
@@ -290,10 +949,10 @@ class Flagsmith:
 
         :return: Flags object holding all the flags for the current environment.
         """
-        if (
-            self.offline_mode or self.enable_local_evaluation
-        ) and self._evaluation_context:
+        if self._use_local_evaluation():
             return self._get_environment_flags_from_document()
+        if self.environment_flags_cache_config is not None:
+            return self._get_environment_flags_from_cache()
         return self._get_environment_flags_from_api()
 
     def get_identity_flags(
@@ -318,9 +977,7 @@ class Flagsmith:
         :return: Flags object holding all the flags for the given identity.
         """
         traits = traits or {}
-        if (
-            self.offline_mode or self.enable_local_evaluation
-        ) and self._evaluation_context:
+        if self._use_local_evaluation():
             return self._get_identity_flags_from_document(identifier, traits)
         return self._get_identity_flags_from_api(
             identifier,
@@ -328,6 +985,42 @@ class Flagsmith:
             transient=transient,
         )
 
+    def get_identity_flags_batch(
+        self,
+        identities: typing.Iterable[IdentityData],
+        *,
+        transient: bool = False,
+        max_workers: int = DEFAULT_BATCH_MAX_WORKERS,
+    ) -> typing.List[Flags]:
+        """
+        Get all the flags for the current environment for each of a number of
+        identities. Behaves as calling :meth:`get_identity_flags` once per
+        identity, but evaluates every identity against the same environment when
+        using local evaluation, and issues the requests to the Flagsmith API
+        concurrently otherwise.
+
+        :param identities: an iterable of `(identifier, traits)` pairs, where
+            traits are as per :meth:`get_identity_flags` and may be None
+        :param transient: if `True`, the identities won't get persisted
+        :param max_workers: maximum number of concurrent requests to the Flagsmith
+            API when using remote evaluation. Values above the connection pool size
+            of the session (10 by default) will not increase throughput.
+        :return: list of Flags objects, in the same order as `identities`.
+        """
+        if self._use_local_evaluation():
+            return self._get_identity_flags_batch_from_document(identities)
+
+        def get_identity_flags(identity: IdentityData) -> Flags:
+            identifier, traits = identity
+            return self._get_identity_flags_from_api(
+                identifier,
+                traits or {},
+                transient=transient,
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(get_identity_flags, identities))
+
     def get_identity_segments(
         self,
         identifier: str,
@@ -342,22 +1035,7 @@ class Flagsmith:
             Flagsmith, e.g. {"num_orders": 10}
         :return: list of Segment objects that the identity is part of.
         """
-        if not self._evaluation_context:
-            raise FlagsmithClientError(
-                "Local evaluation required to obtain identity segments."
-            )
-
-        context = map_context_and_identity_data_to_context(
-            context=self._evaluation_context,
-            identifier=identifier,
-            traits=traits,
-        )
-
-        evaluation_result = engine.get_evaluation_result(
-            context=context,
-        )
-
-        return map_segment_results_to_identity_segments(evaluation_result["segments"])
+        return self._get_identity_segments_from_document(identifier, traits)
 
     def get_experiment_flag(
         self,
@@ -376,166 +1054,122 @@ class Flagsmith:
         if not self._event_processor:
             raise ValueError("Events must be enabled to use experiment flags.")
         flag = self.get_identity_flags(identifier, traits).get_flag(feature_name)
-        if isinstance(flag, Flag) and flag.enabled:
-            self.track_exposure_event(
-                feature_name=feature_name,
-                identifier=identifier,
-                value=flag.variant if flag.variant is not None else flag.value,
-                traits=traits,
-            )
+        self._track_experiment_exposure(flag, feature_name, identifier, traits)
         return flag
 
-    def track_event(
-        self,
-        event: str,
-        identifier: typing.Optional[str] = None,
-        value: typing.Optional[typing.Union[str, int, float, bool]] = None,
-        traits: typing.Optional[TraitMapping] = None,
-        metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
-    ) -> None:
-        if not self._event_processor:
-            raise ValueError("Events must be enabled to track events.")
-        if event.startswith("$") and event != FLAG_EXPOSURE_EVENT:
-            raise ValueError(
-                f'Event name "{event}" uses the reserved "$" prefix '
-                "but is not a known system event."
-            )
-        self._event_processor.track_event(
-            event=event,
-            identifier=identifier,
-            value=value,
-            traits=resolve_trait_values(traits),
-            metadata=metadata,
-        )
-
-    def track_exposure_event(
-        self,
-        feature_name: str,
-        identifier: typing.Optional[str] = None,
-        value: typing.Optional[typing.Union[str, int, float, bool]] = None,
-        traits: typing.Optional[TraitMapping] = None,
-        metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
-    ) -> None:
-        if not self._event_processor:
-            raise ValueError("Events must be enabled to track exposure events.")
-        self._event_processor.track_exposure_event(
-            feature_name=feature_name,
-            identifier=identifier,
-            value=value,
-            traits=resolve_trait_values(traits),
-            metadata=metadata,
-        )
-
     def update_environment(self) -> None:
+        if self._reads_shared_environment_snapshot:
+            self._update_environment_from_shared_snapshot()
+            return
+        if self.stream_environment_document:
+            self._update_environment_from_streamed_document()
+            return
         try:
-            environment_data = self._get_json_response(
-                self.environment_url, method="GET"
-            )
+            environment_document_response = self._get_environment_document()
         except FlagsmithAPIError:
             logger.exception("Error retrieving environment document from API")
-        else:
-            try:
-                self._evaluation_context = map_environment_document_to_context(
-                    environment_data,
-                )
-                self._environment_updated_at = (
-                    map_environment_document_to_environment_updated_at(
-                        environment_data,
-                    )
-                )
-            except (KeyError, TypeError, ValueError):
-                logger.exception("Error parsing environment document")
+            return
 
-    @property
-    def _evaluation_context(self) -> typing.Optional[SDKEvaluationContext]:
-        return self.__evaluation_context
+        if environment_document_response is None:
+            logger.debug("Environment document not modified, skipping update")
+            return
 
-    @_evaluation_context.setter
-    def _evaluation_context(
-        self, context: typing.Optional[SDKEvaluationContext]
-    ) -> None:
-        """Swap in a new evaluation context and rebuild the overrides index.
-
-        The index maps feature_name -> segments that override it. Built once
-        per refresh and reused across every subsequent per-identity lazy
-        resolution; rebuilding here keeps it in sync with the current doc
-        without any hot-path cost.
-        """
-        self.__evaluation_context = context
-        self._segment_overrides_index = (
-            build_segment_overrides_index(context) if context is not None else {}
-        )
+        self._apply_environment_document(*environment_document_response)
 
-    def _get_headers(
+    def _get_environment_document(
         self,
-        environment_key: str,
-        application_metadata: typing.Optional[ApplicationMetadata],
-        custom_headers: typing.Optional[typing.Dict[str, typing.Any]],
-    ) -> typing.Dict[str, str]:
-        headers = {
-            "X-Environment-Key": environment_key,
-            "User-Agent": DEFAULT_USER_AGENT,
-        }
-        if application_metadata:
-            if name := application_metadata.get("name"):
-                headers["Flagsmith-Application-Name"] = name
-            if version := application_metadata.get("version"):
-                headers["Flagsmith-Application-Version"] = version
-        headers.update(custom_headers or {})
-        return headers
-
-    def _get_environment_flags_from_document(self) -> Flags:
-        if self._evaluation_context is None:
-            raise TypeError("No environment present")
+    ) -> typing.Optional[typing.Tuple[EnvironmentModel, typing.Dict[str, str]]]:
+        """
+        Conditionally fetch the environment document.
 
-        # Omit segments from evaluation context for environment flags
-        # as they are only relevant for identity-specific evaluations
-        context_without_segments = self._evaluation_context.copy()
-        context_without_segments.pop("segments", None)
+        :return: the environment document together with the cache validators to
+            send on the next request, or None if the document has not been
+            modified since it was last applied.
+        """
+        try:
+            response = self.session.get(
+                self.environment_url,
+                headers=self._environment_document_validators,
+                timeout=self.request_timeout_seconds,
+            )
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                return None
+            response.raise_for_status()
+            environment_document: EnvironmentModel = self.json_codec.loads(
+                response.content
+            )
+        except (requests.RequestException, ValueError) as e:
+            raise FlagsmithAPIError(
+                "Unable to get valid response from Flagsmith API."
+            ) from e
 
-        evaluation_result = engine.get_evaluation_result(
-            context=context_without_segments,
+        return environment_document, self._get_environment_document_validators(
+            response.headers
         )
 
-        return Flags.from_evaluation_result(
-            evaluation_result=evaluation_result,
-            analytics_processor=self._analytics_processor,
-            default_flag_handler=self.default_flag_handler,
+    def _update_environment_from_streamed_document(self) -> None:
+        try:
+            with self.session.get(
+                self.environment_url,
+                headers=self._environment_document_validators,
+                timeout=self.request_timeout_seconds,
+                stream=True,
+            ) as response:
+                if response.status_code == HTTPStatus.NOT_MODIFIED:
+                    logger.debug("Environment document not modified, skipping update")
+                    return
+                response.raise_for_status()
+                # Stop parsing the document as soon as its `updated_at` shows
+                # it is unchanged.
+                mapped = map_streamed_environment_document_to_context(
+                    response.iter_content(chunk_size=ENVIRONMENT_DOCUMENT_CHUNK_SIZE),
+                    is_up_to_date=self._is_environment_up_to_date,
+                )
+        except requests.RequestException:
+            logger.exception("Error retrieving environment document from API")
+            return
+        except (KeyError, TypeError, ValueError):
+            logger.exception("Error parsing environment document")
+            return
+
+        if mapped is not None:
+            self._set_environment(*mapped)
+        self._environment_document_validators = (
+            self._get_environment_document_validators(response.headers)
         )
 
-    def _get_identity_flags_from_document(
-        self,
-        identifier: str,
-        traits: TraitMapping,
-    ) -> Flags:
-        if self._evaluation_context is None:
-            raise TypeError("No environment present")
+    def _get_environment_flags_from_cache(self) -> Flags:
+        flags, should_revalidate = self._get_cached_environment_flags()
+        if flags is None:
+            return self._get_environment_flags_from_api()
+        if should_revalidate and self._environment_flags_revalidation_lock.acquire(
+            blocking=False
+        ):
+            threading.Thread(
+                target=self._revalidate_environment_flags, daemon=True
+            ).start()
+        return flags
 
-        context = map_context_and_identity_data_to_context(
-            context=self._evaluation_context,
-            identifier=identifier,
-            traits=traits,
-        )
-        # Lazy: defer per-feature evaluation until the caller actually reads
-        # a flag. Hot for callers that only read one or a few flags out of a
-        # large environment.
-        return Flags.from_evaluation_context(
-            context=context,
-            overrides_index=self._segment_overrides_index,
-            analytics_processor=self._analytics_processor,
-            default_flag_handler=self.default_flag_handler,
-        )
+    def _revalidate_environment_flags(self) -> None:
+        try:
+            self._get_environment_flags_from_api()
+        except FlagsmithAPIError:
+            logger.exception("Error refreshing environment flags from API")
+        finally:
+            self._environment_flags_revalidation_lock.release()
 
     def _get_environment_flags_from_api(self) -> Flags:
         try:
             json_response: typing.List[typing.Mapping[str, JsonType]] = (
                 self._get_json_response(url=self.environment_flags_url, method="GET")
             )
-            return Flags.from_api_flags(
+            flags = Flags.from_api_flags(
                 api_flags=json_response,
                 analytics_processor=self._analytics_processor,
                 default_flag_handler=self.default_flag_handler,
             )
+            self._cache_environment_flags(flags)
+            return flags
         except FlagsmithAPIError:
             if self.offline_handler:
                 return self._get_environment_flags_from_document()
@@ -555,6 +1189,9 @@ class Flagsmith:
             traits,
             transient=transient,
         )
+        cache_key = self._get_identity_flags_cache_key(request_body)
+        if (cached_flags := self._get_cached_identity_flags(cache_key)) is not None:
+            return cached_flags
         try:
             json_response: typing.Dict[str, typing.List[typing.Dict[str, JsonType]]] = (
                 self._get_json_response(
@@ -563,6 +1200,7 @@ class Flagsmith:
                     body=request_body,
                 )
             )
+            self._cache_identity_flags(cache_key, json_response["flags"])
             return Flags.from_api_flags(
                 api_flags=json_response["flags"],
                 analytics_processor=self._analytics_processor,
@@ -583,12 +1221,18 @@ class Flagsmith:
     ) -> typing.Any:
         try:
             request_method = getattr(self.session, method.lower())
-            response = request_method(
-                url, json=body, timeout=self.request_timeout_seconds
-            )
+            if body is None:
+                response = request_method(url, timeout=self.request_timeout_seconds)
+            else:
+                response = request_method(
+                    url,
+                    data=self.json_codec.dumps(body),
+                    headers={"Content-Type": "application/json"},
+                    timeout=self.request_timeout_seconds,
+                )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self.json_codec.loads(response.content)
+        except (requests.RequestException, ValueError) as e:
             raise FlagsmithAPIError(
                 "Unable to get valid response from Flagsmith API."
             ) from e
@@ -600,5 +1244,11 @@ class Flagsmith:
         if hasattr(self, "event_stream_thread"):
             self.event_stream_thread.stop()
 
+        if self._analytics_processor:
+            self._analytics_processor.stop()
+
         if self._event_processor:
             self._event_processor.stop()
+
+        if hasattr(self, "_analytics_transport"):
+            self._analytics_transport.close()
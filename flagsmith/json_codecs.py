@@ -0,0 +1,79 @@
+import functools
+import json
+import typing
+
+
+class JsonCodec(typing.Protocol):
+    """
+    Encodes and decodes the JSON exchanged with the Flagsmith API.
+    """
+
+    def dumps(self, obj: typing.Any) -> bytes: ...
+
+    def loads(self, data: typing.Union[bytes, str]) -> typing.Any: ...
+
+
+class StdlibJsonCodec:
+    """
+    JSON codec using the standard library's `json` module.
+    """
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(self, data: typing.Union[bytes, str]) -> typing.Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """
+    JSON codec using `orjson <https://github.com/ijl/orjson>`_.
+    """
+
+    def __init__(self) -> None:
+        import orjson  # type: ignore[import-not-found,unused-ignore]
+
+        self._orjson = orjson
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, data: typing.Union[bytes, str]) -> typing.Any:
+        return self._orjson.loads(data)
+
+
+class MsgspecJsonCodec:
+    """
+    JSON codec using `msgspec <https://jcristharif.com/msgspec/>`_.
+    """
+
+    def __init__(self) -> None:
+        import msgspec  # type: ignore[import-not-found,unused-ignore]
+
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: typing.Any) -> bytes:
+        data: bytes = self._encoder.encode(obj)
+        return data
+
+    def loads(self, data: typing.Union[bytes, str]) -> typing.Any:
+        return self._decoder.decode(data)
+
+
+@functools.cache
+def get_default_json_codec() -> JsonCodec:
+    """
+    :return: a codec using the fastest installed JSON library, i.e. orjson,
+        then msgspec, falling back to the standard library.
+    """
+    codec_classes: typing.Tuple[typing.Callable[[], JsonCodec], ...] = (
+        OrjsonCodec,
+        MsgspecJsonCodec,
+    )
+    for codec_class in codec_classes:
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return StdlibJsonCodec()
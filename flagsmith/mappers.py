@@ -1,4 +1,6 @@
-import json
+import functools
+import hashlib
+import sys
 import typing
 import uuid
 from collections import defaultdict
@@ -18,8 +20,10 @@ from flagsmith.api.types import (
     EnvironmentModel,
     FeatureStateModel,
     IdentityModel,
+    SegmentModel,
     SegmentRuleModel,
 )
+from flagsmith.json_codecs import JsonCodec, get_default_json_codec
 from flagsmith.models import Segment
 from flagsmith.types import (
     FeatureMetadata,
@@ -29,6 +33,7 @@ from flagsmith.types import (
     TraitMapping,
 )
 from flagsmith.utils.datetime import fromisoformat
+from flagsmith.utils.json_stream import load_streamed
 
 OverrideKey = typing.Tuple[
     int,
@@ -37,6 +42,34 @@ OverrideKey = typing.Tuple[
     typing.Any,
 ]
 OverridesKey = typing.Tuple[OverrideKey, ...]
+FeaturesToIdentifiers = typing.DefaultDict[OverridesKey, typing.List[str]]
+
+
+class SegmentDigest(typing.NamedTuple):
+    # Digest of the segment, less its rules and feature states.
+    segment: bytes
+    rules: typing.Tuple[bytes, ...]
+    # Feature name and digest of each feature state.
+    feature_states: typing.Tuple[typing.Tuple[str, bytes], ...]
+
+
+class EnvironmentDocumentDigest(typing.NamedTuple):
+    # Digests of feature states by feature name, and of segments by key.
+    features: typing.Dict[str, bytes]
+    segments: typing.Dict[str, SegmentDigest]
+    identity_overrides: bytes
+
+
+_S = typing.TypeVar("_S", bound=str)
+
+
+def _intern(string: _S) -> _S:
+    """
+    Intern strings repeated throughout environment documents, such as
+    feature names and segment condition operators, so that each is held in
+    memory once rather than once per occurrence.
+    """
+    return typing.cast(_S, sys.intern(string))
 
 
 def map_segment_results_to_identity_segments(
@@ -57,8 +90,11 @@ def map_segment_results_to_identity_segments(
     return identity_segments
 
 
-def map_sse_event_to_stream_event(event: sseclient.Event) -> StreamEvent:
-    event_data = json.loads(event.data)
+def map_sse_event_to_stream_event(
+    event: sseclient.Event,
+    json_codec: typing.Optional[JsonCodec] = None,
+) -> StreamEvent:
+    event_data = (json_codec or get_default_json_codec()).loads(event.data)
     return {
         "updated_at": datetime.fromtimestamp(
             event_data["updated_at"],
@@ -68,9 +104,13 @@ def map_sse_event_to_stream_event(event: sseclient.Event) -> StreamEvent:
 
 
 def map_environment_document_to_environment_updated_at(
-    environment_document: dict[str, typing.Any],
+    environment_document: EnvironmentModel,
 ) -> datetime:
-    if (updated_at := fromisoformat(environment_document["updated_at"])).tzinfo is None:
+    return _map_updated_at(environment_document["updated_at"])
+
+
+def _map_updated_at(updated_at_str: str) -> datetime:
+    if (updated_at := fromisoformat(updated_at_str)).tzinfo is None:
         return updated_at.replace(tzinfo=timezone.utc)
     return updated_at.astimezone(tz=timezone.utc)
 
@@ -91,10 +131,16 @@ def map_context_and_identity_data_to_context(
     identifier: str,
     traits: typing.Optional[TraitMapping] = None,
 ) -> SDKEvaluationContext:
+    """
+    :return: `context` for the given identity. The identity key is set as
+        the engine would derive it, so that the engine does not copy the
+        context to enrich it on every evaluation.
+    """
     return {
         **context,
         "identity": {
             "identifier": identifier,
+            "key": f"{context['environment']['key']}_{identifier}",
             "traits": resolve_trait_values(traits) or {},
         },
     }
@@ -102,7 +148,25 @@ def map_context_and_identity_data_to_context(
 
 def map_environment_document_to_context(
     environment_document: EnvironmentModel,
+    previous: typing.Optional[
+        typing.Tuple[EnvironmentDocumentDigest, SDKEvaluationContext]
+    ] = None,
+    digest: typing.Optional[EnvironmentDocumentDigest] = None,
 ) -> SDKEvaluationContext:
+    """
+    :param previous: the digest of a document mapped earlier, along with its
+        context. Features, segments and identity overrides left unchanged
+        since are taken from that context rather than mapped again, so they
+        are shared between both contexts. Changed segments still share their
+        unchanged rules and overrides.
+    :param digest: the digest of `environment_document`, if already taken.
+    """
+    if previous is not None:
+        return _remap_environment_document_to_context(
+            environment_document,
+            digest or map_environment_document_to_digest(environment_document),
+            *previous,
+        )
     return {
         "environment": {
             "key": environment_document["api_key"],
@@ -115,25 +179,12 @@ def map_environment_document_to_context(
             )
         },
         "segments": {
-            **{
-                (segment_key := str(segment_id := segment["id"])): {
-                    "key": segment_key,
-                    "name": segment["name"],
-                    "rules": _map_environment_document_rules_to_context_rules(
-                        segment["rules"]
-                    ),
-                    "overrides": list(
-                        _map_environment_document_feature_states_to_feature_contexts(
-                            segment.get("feature_states") or []
-                        )
-                    ),
-                    "metadata": SegmentMetadata(
-                        id=segment_id,
-                        source="api",
-                    ),
-                }
-                for segment in environment_document["project"]["segments"]
-            },
+            **dict(
+                map(
+                    _map_environment_document_segment_to_segment_context,
+                    environment_document["project"]["segments"],
+                )
+            ),
             **_map_identity_overrides_to_segments(
                 environment_document.get("identity_overrides") or []
             ),
@@ -141,30 +192,308 @@ def map_environment_document_to_context(
     }
 
 
+def map_environment_document_to_digest(
+    environment_document: EnvironmentModel,
+    json_codec: typing.Optional[JsonCodec] = None,
+) -> EnvironmentDocumentDigest:
+    """
+    Digest the parts of an environment document that
+    :func:`map_environment_document_to_context` compares with a previous
+    document, which is much smaller to keep than the document itself.
+
+    :param json_codec: codec to encode the parts with before digesting them.
+        Pass the codec the document was decoded with, which can encode every
+        value it decoded. Only digests taken with the same codec compare
+        equal.
+    """
+    digest = functools.partial(_digest, json_codec or get_default_json_codec())
+    return EnvironmentDocumentDigest(
+        features={
+            feature_state["feature"]["name"]: digest(feature_state)
+            for feature_state in environment_document["feature_states"]
+        },
+        segments={
+            str(segment["id"]): _map_segment_to_digest(segment, digest)
+            for segment in environment_document["project"]["segments"]
+        },
+        identity_overrides=digest(environment_document.get("identity_overrides") or []),
+    )
+
+
+def _map_segment_to_digest(
+    segment: SegmentModel,
+    digest: typing.Callable[[typing.Any], bytes],
+) -> SegmentDigest:
+    return SegmentDigest(
+        segment=digest(
+            {
+                key: value
+                for key, value in segment.items()
+                if key not in ("rules", "feature_states")
+            }
+        ),
+        rules=tuple(map(digest, segment["rules"])),
+        feature_states=tuple(
+            (feature_state["feature"]["name"], digest(feature_state))
+            for feature_state in segment.get("feature_states") or []
+        ),
+    )
+
+
+def _digest(json_codec: JsonCodec, value: typing.Any) -> bytes:
+    return hashlib.blake2b(json_codec.dumps(value), digest_size=16).digest()
+
+
+def _remap_environment_document_to_context(
+    environment_document: EnvironmentModel,
+    digest: EnvironmentDocumentDigest,
+    previous_digest: EnvironmentDocumentDigest,
+    previous_context: SDKEvaluationContext,
+) -> SDKEvaluationContext:
+    previous_features = previous_context.get("features") or {}
+    features: typing.Dict[str, FeatureContext[FeatureMetadata]] = {}
+    for feature_state in environment_document["feature_states"]:
+        feature_name = feature_state["feature"]["name"]
+        if (
+            previous_digest.features.get(feature_name) == digest.features[feature_name]
+            and (feature := previous_features.get(feature_name)) is not None
+        ):
+            features[feature_name] = feature
+            continue
+        for feature in _map_environment_document_feature_states_to_feature_contexts(
+            [feature_state]
+        ):
+            features[feature["name"]] = feature
+
+    previous_segments = previous_context.get("segments") or {}
+    segments: typing.Dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]] = {}
+    for segment in environment_document["project"]["segments"]:
+        segment_key = str(segment["id"])
+        segment_digest = digest.segments[segment_key]
+        previous_segment_digest = previous_digest.segments.get(segment_key)
+        previous_segment_context = previous_segments.get(segment_key)
+        if (
+            previous_segment_digest == segment_digest
+            and previous_segment_context is not None
+        ):
+            segments[segment_key] = previous_segment_context
+            continue
+        segment_key, segment_context = (
+            _map_environment_document_segment_to_segment_context(segment)
+        )
+        if previous_segment_digest is not None and previous_segment_context is not None:
+            _share_unchanged_segment_parts(
+                segment_context,
+                segment_digest,
+                previous_segment_context,
+                previous_segment_digest,
+            )
+        segments[segment_key] = segment_context
+
+    previous_identity_override_segments = {
+        segment_key: segment_context
+        for segment_key, segment_context in previous_segments.items()
+        if (segment_context.get("metadata") or {}).get("source") == "identity_overrides"
+    }
+    if digest.identity_overrides == previous_digest.identity_overrides:
+        segments.update(previous_identity_override_segments)
+    else:
+        segments.update(
+            _map_identity_overrides_to_segments(
+                environment_document.get("identity_overrides") or [],
+                previous_identity_override_segments,
+            )
+        )
+
+    return {
+        "environment": {
+            "key": environment_document["api_key"],
+            "name": environment_document["name"],
+        },
+        "features": features,
+        "segments": segments,
+    }
+
+
+def _share_unchanged_segment_parts(
+    segment_context: SegmentContext[SegmentMetadata, FeatureMetadata],
+    segment_digest: SegmentDigest,
+    previous_segment_context: SegmentContext[SegmentMetadata, FeatureMetadata],
+    previous_segment_digest: SegmentDigest,
+) -> None:
+    """
+    Replace the top-level rules and overrides of a remapped segment context
+    with those of its previous context wherever they are unchanged.
+    """
+    previous_rules = list(
+        zip(previous_segment_digest.rules, previous_segment_context["rules"])
+    )
+    segment_context["rules"] = [
+        (
+            previous_rules[index][1]
+            if index < len(previous_rules) and previous_rules[index][0] == rule_digest
+            else rule_context
+        )
+        for index, (rule_digest, rule_context) in enumerate(
+            zip(segment_digest.rules, segment_context["rules"])
+        )
+    ]
+
+    previous_feature_states = dict(previous_segment_digest.feature_states)
+    previous_overrides = {
+        override["name"]: override
+        for override in previous_segment_context.get("overrides") or []
+    }
+    segment_context["overrides"] = [
+        (
+            previous_override
+            if previous_feature_states.get(override["name"]) == feature_state_digest
+            and (previous_override := previous_overrides.get(override["name"]))
+            is not None
+            else override
+        )
+        for (_, feature_state_digest), override in zip(
+            segment_digest.feature_states,
+            segment_context.get("overrides") or [],
+        )
+    ]
+
+
+class _EnvironmentUpToDate(Exception):
+    pass
+
+
+def map_streamed_environment_document_to_context(
+    chunks: typing.Iterable[bytes],
+    is_up_to_date: typing.Optional[typing.Callable[[datetime], bool]] = None,
+) -> typing.Optional[typing.Tuple[SDKEvaluationContext, datetime]]:
+    """
+    Map an environment document to an evaluation context while parsing it
+    from `chunks`, so that the raw document is never held in memory in full.
+
+    :param is_up_to_date: called with the time the environment was last
+        updated as soon as it is parsed. If it returns True, parsing and
+        mapping stop there.
+    :return: the evaluation context, and the time the environment was last
+        updated, or None if the environment is up to date.
+    :raises ValueError: if the document is not valid JSON.
+    """
+    features: typing.Dict[str, FeatureContext[FeatureMetadata]] = {}
+    segments: typing.Dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]] = {}
+    features_to_identifiers: FeaturesToIdentifiers = defaultdict(list)
+
+    def add_feature_state(feature_state: FeatureStateModel) -> None:
+        for feature in _map_environment_document_feature_states_to_feature_contexts(
+            [feature_state]
+        ):
+            features[feature["name"]] = feature
+
+    def add_segment(segment: SegmentModel) -> None:
+        segment_key, segment_context = (
+            _map_environment_document_segment_to_segment_context(segment)
+        )
+        segments[segment_key] = segment_context
+
+    def add_identity_override(identity_override: IdentityModel) -> None:
+        _add_identity_override(features_to_identifiers, identity_override)
+
+    def check_updated_at(updated_at: str) -> None:
+        if is_up_to_date is not None and is_up_to_date(_map_updated_at(updated_at)):
+            raise _EnvironmentUpToDate
+
+    try:
+        environment_document = typing.cast(
+            EnvironmentModel,
+            load_streamed(
+                chunks,
+                {
+                    ("feature_states",): add_feature_state,
+                    ("project", "segments"): add_segment,
+                    ("identity_overrides",): add_identity_override,
+                    ("updated_at",): check_updated_at,
+                },
+            ),
+        )
+    except _EnvironmentUpToDate:
+        return None
+    context: SDKEvaluationContext = {
+        "environment": {
+            "key": environment_document["api_key"],
+            "name": environment_document["name"],
+        },
+        "features": features,
+        "segments": {
+            **segments,
+            **_map_features_to_identifiers_to_segments(features_to_identifiers),
+        },
+    }
+    return context, map_environment_document_to_environment_updated_at(
+        environment_document
+    )
+
+
+def _map_environment_document_segment_to_segment_context(
+    segment: SegmentModel,
+) -> typing.Tuple[str, SegmentContext[SegmentMetadata, FeatureMetadata]]:
+    segment_key = str(segment_id := segment["id"])
+    return segment_key, {
+        "key": segment_key,
+        "name": segment["name"],
+        "rules": _map_environment_document_rules_to_context_rules(segment["rules"]),
+        "overrides": list(
+            _map_environment_document_feature_states_to_feature_contexts(
+                segment.get("feature_states") or []
+            )
+        ),
+        "metadata": SegmentMetadata(
+            id=segment_id,
+            source="api",
+        ),
+    }
+
+
 def _map_identity_overrides_to_segments(
     identity_overrides: list[IdentityModel],
+    previous_segments: typing.Optional[
+        typing.Mapping[str, SegmentContext[SegmentMetadata, FeatureMetadata]]
+    ] = None,
 ) -> dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]]:
-    features_to_identifiers: typing.Dict[
-        OverridesKey,
-        typing.List[str],
-    ] = defaultdict(list)
+    features_to_identifiers: FeaturesToIdentifiers = defaultdict(list)
     for identity_override in identity_overrides:
-        identity_features = identity_override["identity_features"]
-        if not identity_features:
-            continue
-        overrides_key = tuple(
-            (
-                feature_state["feature"]["id"],
-                feature_state["feature"]["name"],
-                feature_state["enabled"],
-                feature_state["feature_state_value"],
-            )
-            for feature_state in sorted(
-                identity_features,
-                key=lambda feature_state: feature_state["feature"]["name"],
-            )
+        _add_identity_override(features_to_identifiers, identity_override)
+    return _map_features_to_identifiers_to_segments(
+        features_to_identifiers, previous_segments
+    )
+
+
+def _add_identity_override(
+    features_to_identifiers: FeaturesToIdentifiers,
+    identity_override: IdentityModel,
+) -> None:
+    identity_features = identity_override["identity_features"]
+    if not identity_features:
+        return
+    overrides_key = tuple(
+        (
+            feature_state["feature"]["id"],
+            feature_state["feature"]["name"],
+            feature_state["enabled"],
+            feature_state["feature_state_value"],
         )
-        features_to_identifiers[overrides_key].append(identity_override["identifier"])
+        for feature_state in sorted(
+            identity_features,
+            key=lambda feature_state: feature_state["feature"]["name"],
+        )
+    )
+    features_to_identifiers[overrides_key].append(identity_override["identifier"])
+
+
+def _map_features_to_identifiers_to_segments(
+    features_to_identifiers: FeaturesToIdentifiers,
+    previous_segments: typing.Optional[
+        typing.Mapping[str, SegmentContext[SegmentMetadata, FeatureMetadata]]
+    ] = None,
+) -> dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]]:
     segment_contexts: typing.Dict[
         str,
         SegmentContext[
@@ -176,6 +505,13 @@ def _map_identity_overrides_to_segments(
         # Create a segment context for each unique set of overrides
         # Generate a unique key to avoid collisions
         segment_key = str(hash(overrides_key))
+        if (
+            previous_segment := (previous_segments or {}).get(segment_key)
+        ) is not None and _is_identity_override_segment_for(
+            previous_segment, overrides_key, identifiers
+        ):
+            segment_contexts[segment_key] = previous_segment
+            continue
         segment_contexts[segment_key] = SegmentContext(
             key="",  # Identity override segments never use % Split operator
             name="identity_overrides",
@@ -194,7 +530,7 @@ def _map_identity_overrides_to_segments(
             overrides=[
                 {
                     "key": "",  # Identity overrides never carry multivariate options
-                    "name": feature_name,
+                    "name": _intern(feature_name),
                     "enabled": feature_enabled,
                     "value": feature_value,
                     "priority": float("-inf"),  # Highest possible priority
@@ -207,16 +543,32 @@ def _map_identity_overrides_to_segments(
     return segment_contexts
 
 
+def _is_identity_override_segment_for(
+    segment_context: SegmentContext[SegmentMetadata, FeatureMetadata],
+    overrides_key: OverridesKey,
+    identifiers: typing.List[str],
+) -> bool:
+    return segment_context["rules"][0]["conditions"][0]["value"] == identifiers and [
+        (
+            override["metadata"]["id"],
+            override["name"],
+            override["enabled"],
+            override["value"],
+        )
+        for override in segment_context.get("overrides") or []
+    ] == list(overrides_key)
+
+
 def _map_environment_document_rules_to_context_rules(
     rules: list[SegmentRuleModel],
 ) -> list[SegmentRule]:
     return [
         dict(
-            type=rule["type"],
+            type=_intern(rule["type"]),
             conditions=[
                 StrValueSegmentCondition(
-                    property=condition.get("property_") or "",
-                    operator=condition["operator"],
+                    property=_intern(condition.get("property_") or ""),
+                    operator=_intern(condition["operator"]),
                     value=condition["value"],
                 )
                 for condition in rule.get("conditions", [])
@@ -238,7 +590,7 @@ def _map_environment_document_feature_states_to_feature_contexts(
             key=str(
                 feature_state.get("django_id") or feature_state["featurestate_uuid"]
             ),
-            name=feature_state["feature"]["name"],
+            name=_intern(feature_state["feature"]["name"]),
             enabled=feature_state["enabled"],
             value=feature_state["feature_state_value"],
             metadata=metadata,
@@ -4,9 +4,12 @@ import typing
 from dataclasses import dataclass, field
 
 from flag_engine import engine
-from flag_engine.context.types import SegmentContext
+from flag_engine.context.mappers import map_any_value_to_context_value
+from flag_engine.context.types import SegmentContext, SegmentRule
+from flag_engine.segments import constants
 
 from flagsmith.analytics import AnalyticsProcessor
+from flagsmith.compiled_segments import CompiledSegments
 from flagsmith.exceptions import FlagsmithFeatureDoesNotExistError
 from flagsmith.types import (
     FeatureMetadata,
@@ -19,6 +22,16 @@ from flagsmith.types import (
 SegmentOverridesIndex = typing.Dict[
     str, typing.List[SegmentContext[SegmentMetadata, FeatureMetadata]]
 ]
+IdentityOverrides = typing.Mapping[
+    str, SegmentContext[SegmentMetadata, FeatureMetadata]
+]
+IdentityOverridesIndex = typing.Dict[str, IdentityOverrides]
+
+IDENTITY_IDENTIFIER_PROPERTY = "$.identity.identifier"
+
+# Identity override segments looked up through the index already match, so
+# their rules are swapped for one that holds for every context.
+_MATCHED_RULES: typing.List[SegmentRule] = [{"type": "ALL", "conditions": []}]
 
 
 def build_segment_overrides_index(
@@ -29,25 +42,219 @@ def build_segment_overrides_index(
     Computed once per environment-document refresh so the lazy eval path
     can walk only the segments actually relevant to a given flag.
     """
+    return _index_segment_overrides((context.get("segments") or {}).values())
+
+
+def _index_segment_overrides(
+    segment_contexts: typing.Iterable[SegmentContext[SegmentMetadata, FeatureMetadata]],
+) -> SegmentOverridesIndex:
     index: SegmentOverridesIndex = {}
-    for segment_context in (context.get("segments") or {}).values():
+    for segment_context in segment_contexts:
         for override in segment_context.get("overrides") or ():
             index.setdefault(override["name"], []).append(segment_context)
     return index
 
 
-@dataclass
+def update_segment_overrides_index(
+    index: SegmentOverridesIndex,
+    previous_context: SDKEvaluationContext,
+    context: SDKEvaluationContext,
+) -> SegmentOverridesIndex:
+    """Patch `index`, built for `previous_context`, to match `context`.
+
+    Segments are compared by identity, so when `context` reuses the segment
+    contexts left unchanged by a refresh, only the entries of features
+    overridden by added, removed or replaced segments are rebuilt. Neither
+    `index` nor its lists are modified.
+    """
+    previous_segments = previous_context.get("segments") or {}
+    segments = context.get("segments") or {}
+    added = [
+        segment_context
+        for segment_key, segment_context in segments.items()
+        if previous_segments.get(segment_key) is not segment_context
+    ]
+    removed_ids = {
+        id(segment_context)
+        for segment_key, segment_context in previous_segments.items()
+        if segments.get(segment_key) is not segment_context
+    }
+    if not added and not removed_ids:
+        return index
+    if [key for key in segments if key in previous_segments] != [
+        key for key in previous_segments if key in segments
+    ]:
+        # Segments are evaluated in order, which every entry must follow.
+        return build_segment_overrides_index(context)
+
+    if 2 * len(added) > len(segments):
+        return build_segment_overrides_index(context)
+
+    added_index = _index_segment_overrides(added)
+    feature_names = set(added_index)
+    feature_names.update(
+        override["name"]
+        for segment_context in previous_segments.values()
+        if id(segment_context) in removed_ids
+        for override in segment_context.get("overrides") or ()
+    )
+    positions = {
+        id(segment_context): position
+        for position, segment_context in enumerate(segments.values())
+    }
+    patched = dict(index)
+    for feature_name in feature_names:
+        if entry := sorted(
+            [
+                *(
+                    segment_context
+                    for segment_context in index.get(feature_name, ())
+                    if id(segment_context) not in removed_ids
+                ),
+                *added_index.get(feature_name, ()),
+            ],
+            key=lambda segment_context: positions[id(segment_context)],
+        ):
+            patched[feature_name] = entry
+        else:
+            patched.pop(feature_name, None)
+    return patched
+
+
+def build_identity_overrides_index(
+    context: SDKEvaluationContext,
+) -> typing.Tuple[SDKEvaluationContext, IdentityOverridesIndex]:
+    """Split identity override segments out of `context`.
+
+    The mapper turns identity overrides into segments matching
+    `$.identity.identifier IN [...]`, which the engine checks by scanning
+    every such segment for every identity. Instead, index them by
+    identifier once per environment-document refresh, so they can be
+    looked up in O(1) with :func:`get_identity_overrides`.
+
+    :return: a copy of `context` without the indexed segments, and a map of
+        identifier -> segments that apply to that identifier.
+    """
+    segments: typing.Dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]] = {}
+    index: IdentityOverridesIndex = {}
+    for segment_key, segment_context in (context.get("segments") or {}).items():
+        if (identifiers := _get_identity_override_identifiers(segment_context)) is None:
+            segments[segment_key] = segment_context
+            continue
+        matched: IdentityOverrides = {
+            segment_key: {**segment_context, "rules": _MATCHED_RULES}
+        }
+        for identifier in identifiers:
+            # An identifier only ever appears in one identity override
+            # segment, so share the mapping rather than copying it.
+            index[identifier] = (
+                {**index[identifier], **matched} if identifier in index else matched
+            )
+    return {**context, "segments": segments}, index
+
+
+def update_identity_overrides_index(
+    context: SDKEvaluationContext,
+    previous_context: SDKEvaluationContext,
+    previous_identity_context: SDKEvaluationContext,
+    previous_index: IdentityOverridesIndex,
+) -> typing.Tuple[SDKEvaluationContext, IdentityOverridesIndex]:
+    """Equivalent of :func:`build_identity_overrides_index`, reusing the
+    index built from `previous_context` if `context` holds the very same
+    identity override segments.
+
+    :param previous_identity_context: the context without identity override
+        segments, as split from `previous_context`.
+    """
+    previous_segments = previous_context.get("segments") or {}
+    previous_kept_segments = previous_identity_context.get("segments") or {}
+    segments: typing.Dict[str, SegmentContext[SegmentMetadata, FeatureMetadata]] = {}
+    indexed = 0
+    for segment_key, segment_context in (context.get("segments") or {}).items():
+        if previous_segments.get(segment_key) is segment_context:
+            if segment_key in previous_kept_segments:
+                segments[segment_key] = segment_context
+            else:
+                indexed += 1
+        elif _get_identity_override_identifiers(segment_context) is None:
+            segments[segment_key] = segment_context
+        else:
+            return build_identity_overrides_index(context)
+    if indexed != len(previous_segments) - len(previous_kept_segments):
+        # Identity override segments were removed.
+        return build_identity_overrides_index(context)
+    return {**context, "segments": segments}, previous_index
+
+
+def get_identity_overrides(
+    context: SDKEvaluationContext,
+    index: IdentityOverridesIndex,
+) -> IdentityOverrides:
+    """Get the identity override segments matching the identity in `context`.
+
+    Resolves the identifier the same way the engine resolves the
+    `$.identity.identifier` property of the segment condition, so the result
+    is what evaluating the indexed segments would have matched.
+    """
+    if not index or not (identity_context := context.get("identity")):
+        return {}
+    value = (identity_context.get("traits") or {}).get(IDENTITY_IDENTIFIER_PROPERTY)
+    if value is None:
+        value = identity_context["identifier"]
+    value = map_any_value_to_context_value(value)
+    if type(value) is int:
+        value = str(value)
+    if not isinstance(value, str):
+        return {}
+    return index.get(value, {})
+
+
+def _get_identity_override_identifiers(
+    segment_context: SegmentContext[SegmentMetadata, FeatureMetadata],
+) -> typing.Optional[typing.List[str]]:
+    # Only segments with exactly the shape produced by the mapper are
+    # indexed; anything else is left to the engine.
+    if (segment_context.get("metadata") or {}).get("source") != "identity_overrides":
+        return None
+    if len(rules := segment_context["rules"]) != 1:
+        return None
+    [rule] = rules
+    if rule["type"] != "ALL" or rule.get("rules"):
+        return None
+    if len(conditions := rule.get("conditions") or []) != 1:
+        return None
+    [condition] = conditions
+    if (
+        condition["property"] != IDENTITY_IDENTIFIER_PROPERTY
+        or condition["operator"] != constants.IN
+        or not isinstance(identifiers := condition.get("value"), list)
+    ):
+        return None
+    return [v if type(v) is str else str(v) for v in identifiers]
+
+
+def _overrides_feature(
+    segment_context: SegmentContext[SegmentMetadata, FeatureMetadata],
+    feature_name: str,
+) -> bool:
+    return any(
+        override["name"] == feature_name
+        for override in segment_context.get("overrides") or ()
+    )
+
+
+@dataclass(slots=True)
 class BaseFlag:
     enabled: bool
     value: typing.Union[str, int, float, bool, None]
 
 
-@dataclass
+@dataclass(slots=True)
 class DefaultFlag(BaseFlag):
     is_default: bool = field(default=True)
 
 
-@dataclass
+@dataclass(slots=True)
 class Flag(BaseFlag):
     feature_id: int
     feature_name: str
@@ -83,7 +290,7 @@ class Flag(BaseFlag):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Flags:
     flags: typing.Dict[str, Flag] = field(default_factory=dict)
     default_flag_handler: typing.Optional[typing.Callable[[str], DefaultFlag]] = None
@@ -95,6 +302,15 @@ class Flags:
     # paths (`from_evaluation_result` / `from_api_flags`).
     _context: typing.Optional[SDKEvaluationContext] = None
     _overrides_index: typing.Optional[SegmentOverridesIndex] = None
+    _compiled_segments: typing.Optional[CompiledSegments] = None
+    # Identity override segments already matched against `_context`'s
+    # identity, kept out of `_context` itself; see
+    # `build_identity_overrides_index`.
+    _identity_overrides: IdentityOverrides = field(default_factory=dict)
+    # Evaluation result shared with other `Flags`, and never modified.
+    # When set, `flags` memoises this instance's own copies of its flags,
+    # made on first access.
+    _evaluation_result: typing.Optional[SDKEvaluationResult] = None
     _fully_materialised: bool = False
 
     @classmethod
@@ -114,6 +330,27 @@ class Flags:
             _analytics_processor=analytics_processor,
         )
 
+    @classmethod
+    def from_shared_evaluation_result(
+        cls,
+        evaluation_result: SDKEvaluationResult,
+        analytics_processor: typing.Optional[AnalyticsProcessor],
+        default_flag_handler: typing.Optional[typing.Callable[[str], DefaultFlag]],
+    ) -> Flags:
+        """Build a lazy `Flags` backed by an evaluation result.
+
+        Unlike :meth:`from_evaluation_result`, no `Flag` is built here, so
+        many `Flags` can cheaply wrap one evaluation result. Each builds its
+        own `Flag` for a feature on first access, so callers modifying their
+        flags do not affect one another.
+        """
+        return cls(
+            flags={},
+            default_flag_handler=default_flag_handler,
+            _analytics_processor=analytics_processor,
+            _evaluation_result=evaluation_result,
+        )
+
     @classmethod
     def from_evaluation_context(
         cls,
@@ -121,13 +358,19 @@ class Flags:
         overrides_index: SegmentOverridesIndex,
         analytics_processor: typing.Optional[AnalyticsProcessor],
         default_flag_handler: typing.Optional[typing.Callable[[str], DefaultFlag]],
+        compiled_segments: typing.Optional[CompiledSegments] = None,
+        identity_overrides: typing.Optional[IdentityOverrides] = None,
     ) -> Flags:
         """Build a lazy `Flags` backed by an evaluation context.
 
         No engine work is done here — flags are resolved on first access
         via :meth:`_resolve_flag`. Reusing the same `overrides_index`
         across calls amortises its construction cost (it's rebuilt only
-        when the environment doc refreshes, not per identity).
+        when the environment doc refreshes, not per identity). When
+        `compiled_segments` is given, segments are matched with its
+        precompiled predicates instead of the engine's rule interpreter.
+        `identity_overrides` are identity override segments known to match
+        the identity, evaluated on top of the segments in `context`.
         """
         return cls(
             flags={},
@@ -135,6 +378,8 @@ class Flags:
             _analytics_processor=analytics_processor,
             _context=context,
             _overrides_index=overrides_index,
+            _compiled_segments=compiled_segments,
+            _identity_overrides=identity_overrides or {},
         )
 
     @classmethod
@@ -162,12 +407,32 @@ class Flags:
         In lazy mode, the caller has signalled they want every flag, so
         we run the bulk evaluator once on the full context and copy the
         results into the per-flag cache. Cheaper than asking the engine
-        for each feature one at a time.
+        for each feature one at a time. A shared evaluation result is
+        copied into the cache the same way.
 
         :return: list of Flag objects.
         """
-        if self._context is not None and not self._fully_materialised:
-            result = engine.get_evaluation_result(self._context)
+        if self._fully_materialised:
+            return list(self.flags.values())
+        result = self._evaluation_result
+        if self._context is not None:
+            if self._compiled_segments is not None:
+                result = self._compiled_segments.get_evaluation_result(
+                    self._context, identity_overrides=self._identity_overrides
+                )
+            elif self._identity_overrides:
+                result = engine.get_evaluation_result(
+                    {
+                        **self._context,
+                        "segments": {
+                            **(self._context.get("segments") or {}),
+                            **self._identity_overrides,
+                        },
+                    }
+                )
+            else:
+                result = engine.get_evaluation_result(self._context)
+        if result is not None:
             for feature_name, flag_result in result["flags"].items():
                 if feature_name not in self.flags:
                     self.flags[feature_name] = Flag.from_evaluation_result(
@@ -218,6 +483,11 @@ class Flags:
             ):
                 flag = self._resolve_flag(feature_name)
                 self.flags[feature_name] = flag
+            elif self._evaluation_result is not None and (
+                flag_result := self._evaluation_result["flags"].get(feature_name)
+            ):
+                flag = Flag.from_evaluation_result(flag_result)
+                self.flags[feature_name] = flag
             elif self.default_flag_handler:
                 return self.default_flag_handler(feature_name)
             else:
@@ -248,13 +518,25 @@ class Flags:
         # non-None checks; assert here so type checkers can narrow.
         assert context is not None and overrides_index is not None
 
+        if self._compiled_segments is not None:
+            result = self._compiled_segments.get_evaluation_result(
+                context,
+                feature_name=feature_name,
+                identity_overrides=self._identity_overrides,
+            )
+            return Flag.from_evaluation_result(result["flags"][feature_name])
+
+        segments = {
+            segment_context["key"]: segment_context
+            for segment_context in overrides_index.get(feature_name, ())
+        }
+        for segment_key, segment_context in self._identity_overrides.items():
+            if _overrides_feature(segment_context, feature_name):
+                segments[segment_key] = segment_context
         trimmed: SDKEvaluationContext = {
             **context,
             "features": {feature_name: context["features"][feature_name]},
-            "segments": {
-                segment_context["key"]: segment_context
-                for segment_context in overrides_index.get(feature_name, ())
-            },
+            "segments": segments,
         }
         result = engine.get_evaluation_result(trimmed)
         return Flag.from_evaluation_result(result["flags"][feature_name])
@@ -1,9 +1,9 @@
-import json
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Protocol
+from typing import Optional, Protocol
 
 from flagsmith.api.types import EnvironmentModel
+from flagsmith.json_codecs import JsonCodec, get_default_json_codec
 from flagsmith.mappers import map_environment_document_to_context
 
 
@@ -26,8 +26,18 @@ class LocalFileHandler:
     https://api.flagsmith.com/api/v1/docs/#/api/api_v1_environment-document_list
     """
 
-    def __init__(self, file_path: str) -> None:
-        environment_document = json.loads(Path(file_path).read_text())
+    def __init__(
+        self,
+        file_path: str,
+        json_codec: Optional[JsonCodec] = None,
+    ) -> None:
+        """
+        :param json_codec: codec to parse the file with. Defaults to the
+            fastest installed JSON library.
+        """
+        environment_document = (json_codec or get_default_json_codec()).loads(
+            Path(file_path).read_bytes()
+        )
         # Make sure the document can be used for evaluation
         map_environment_document_to_context(environment_document)
         self.environment_document: EnvironmentModel = environment_document
@@ -0,0 +1,123 @@
+import socket
+import threading
+import typing
+
+from flagsmith.exceptions import FlagsmithCacheError
+
+RESPReply = typing.Union[None, int, bytes, typing.List[typing.Any]]
+
+
+class RedisCacheBackend:
+    """
+    :class:`flagsmith.cache.CacheBackend` storing entries in Redis, or any
+    server speaking the Redis protocol (RESP), e.g. Valkey or KeyDB.
+
+    Talks to the server over a single socket, so no Redis client library is
+    needed. The connection is opened on first use and reopened after errors.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        *,
+        db: int = 0,
+        password: typing.Optional[str] = None,
+        timeout_seconds: float = 1.0,
+    ) -> None:
+        """
+        :param host: host name of the server.
+        :param port: port of the server.
+        :param db: index of the database to use.
+        :param password: password to authenticate with, if required.
+        :param timeout_seconds: number of seconds to wait for the server
+            before treating the cache as unavailable.
+        """
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout_seconds = timeout_seconds
+        self._socket: typing.Optional[socket.socket] = None
+        self._reader: typing.Optional[typing.BinaryIO] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        reply = self._execute(b"GET", key.encode())
+        return reply if isinstance(reply, bytes) else None
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        ttl_milliseconds = max(1, int(ttl_seconds * 1000))
+        self._execute(b"SET", key.encode(), value, b"PX", b"%d" % ttl_milliseconds)
+
+    def delete(self, key: str) -> None:
+        self._execute(b"DEL", key.encode())
+
+    def close(self) -> None:
+        with self._lock:
+            self._disconnect()
+
+    def _execute(self, *args: bytes) -> RESPReply:
+        with self._lock:
+            try:
+                if self._socket is None:
+                    self._connect()
+                return self._send(*args)
+            except (OSError, ValueError) as e:
+                self._disconnect()
+                raise FlagsmithCacheError(
+                    f"Unable to reach cache at {self.host}:{self.port}"
+                ) from e
+
+    def _connect(self) -> None:
+        self._socket = socket.create_connection(
+            (self.host, self.port), timeout=self.timeout_seconds
+        )
+        self._reader = self._socket.makefile("rb")
+        try:
+            if self.password is not None:
+                self._send(b"AUTH", self.password.encode())
+            if self.db:
+                self._send(b"SELECT", b"%d" % self.db)
+        except FlagsmithCacheError:
+            self._disconnect()
+            raise
+
+    def _disconnect(self) -> None:
+        if self._reader is not None:
+            self._reader.close()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = self._reader = None
+
+    def _send(self, *args: bytes) -> RESPReply:
+        assert self._socket is not None  # connected by `_execute`
+        command = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            command.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self._socket.sendall(b"".join(command))
+        return self._read_reply()
+
+    def _read_reply(self) -> RESPReply:
+        assert self._reader is not None  # connected by `_execute`
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        reply_type, payload = line[:1], line[1:-2]
+        if reply_type == b"+":
+            return payload
+        if reply_type == b"-":
+            raise FlagsmithCacheError(
+                f"Cache server error: {payload.decode(errors='replace')}"
+            )
+        if reply_type == b":":
+            return int(payload)
+        if reply_type == b"$":
+            if (length := int(payload)) < 0:
+                return None
+            return self._reader.read(length + 2)[:-2]
+        if reply_type == b"*":
+            if (length := int(payload)) < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ValueError(f"Unexpected reply from cache server: {line!r}")
@@ -0,0 +1,139 @@
+import json
+import os
+import struct
+import tempfile
+import typing
+from datetime import datetime
+
+from flagsmith.types import SDKEvaluationContext
+from flagsmith.utils.datetime import fromisoformat
+
+# Magic bytes, format version, generation and payload length.
+_HEADER = struct.Struct("<4sHQQ")
+_MAGIC = b"FSES"
+_FORMAT_VERSION = 1
+
+
+class SharedEnvironmentSnapshot:
+    """
+    Environment snapshot shared between processes through a file,
+    e.g. between the workers of a pre-fork server such as gunicorn or uWSGI.
+
+    One process creates its client with a ``writer=True`` snapshot and keeps
+    the environment up to date from the Flagsmith API, publishing every new
+    environment to the file. Every other process creates its client with a
+    read-only snapshot on the same path; instead of requesting the
+    environment document from the API, it reloads the environment from the
+    file whenever its generation counter has changed.
+
+    Example::
+
+      >>> from flagsmith import Flagsmith
+      >>> from flagsmith.shared_environment import SharedEnvironmentSnapshot
+      >>> path = "/dev/shm/flagsmith-environment"
+      >>> # e.g. in the server's master process:
+      >>> poller = Flagsmith(
+      ...     environment_key="ser.<server-side key>",
+      ...     enable_local_evaluation=True,
+      ...     shared_environment_snapshot=SharedEnvironmentSnapshot(path, writer=True),
+      ... )
+      >>> # in each worker:
+      >>> flagsmith = Flagsmith(
+      ...     environment_key="ser.<server-side key>",
+      ...     enable_local_evaluation=True,
+      ...     environment_refresh_interval_seconds=1,
+      ...     shared_environment_snapshot=SharedEnvironmentSnapshot(path),
+      ... )
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        writer: bool = False,
+        mode: int = 0o644,
+    ) -> None:
+        """
+        :param path: path of the file holding the snapshot. Preferably on a
+            memory-backed filesystem, e.g. ``/dev/shm`` on Linux.
+        :param writer: whether this process publishes the environment to
+            the file, rather than reading it from there.
+        :param mode: permissions the writer publishes the file with. The
+            default lets readers running as other users read it.
+        """
+        self.path = path
+        self.writer = writer
+        self.mode = mode
+        # Generation of the snapshot last published or read by this process.
+        self.generation = (self._read_generation() or 0) if writer else 0
+
+    def publish(
+        self,
+        context: SDKEvaluationContext,
+        environment_updated_at: datetime,
+    ) -> None:
+        """
+        Atomically replace the snapshot, bumping its generation.
+        """
+        if not self.writer:
+            raise ValueError("Only a writer snapshot can be published.")
+        payload = json.dumps(
+            {
+                "updated_at": environment_updated_at.isoformat(),
+                "context": context,
+            }
+        ).encode()
+        generation = self.generation + 1
+        directory = os.path.dirname(os.path.abspath(self.path))
+        f = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        try:
+            with f:
+                f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, generation, len(payload)))
+                f.write(payload)
+            # `NamedTemporaryFile` creates the file readable by its owner only.
+            os.chmod(f.name, self.mode)
+            # Readers holding the previous file open keep reading it intact.
+            os.replace(f.name, self.path)
+        except BaseException:
+            # Don't leave a temporary file behind on every failed publish.
+            os.unlink(f.name)
+            raise
+        self.generation = generation
+
+    def read(
+        self,
+    ) -> typing.Optional[typing.Tuple[SDKEvaluationContext, datetime]]:
+        """
+        Read the snapshot if it was published since it was last read.
+
+        :return: the evaluation context and the time the environment was
+            last updated, or None if there is no new snapshot.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                generation, length = self._unpack_header(f.read(_HEADER.size))
+                if generation == self.generation:
+                    return None
+                # Published snapshots are never modified in place, so the open
+                # file stays consistent even if a new one replaces it.
+                data = json.loads(f.read(length))
+        except FileNotFoundError:
+            return None
+        self.generation = generation
+        return data["context"], fromisoformat(data["updated_at"])
+
+    def _read_generation(self) -> typing.Optional[int]:
+        try:
+            with open(self.path, "rb") as f:
+                return self._unpack_header(f.read(_HEADER.size))[0]
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @staticmethod
+    def _unpack_header(header: bytes) -> typing.Tuple[int, int]:
+        if len(header) != _HEADER.size:
+            raise ValueError("Environment snapshot is truncated.")
+        magic, format_version, generation, length = _HEADER.unpack(header)
+        if magic != _MAGIC or format_version != _FORMAT_VERSION:
+            raise ValueError("File is not a Flagsmith environment snapshot.")
+        return generation, length
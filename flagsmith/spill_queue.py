@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import threading
+import typing
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX: typing.Final[str] = ".jsonl"
+
+Batch = typing.List[typing.Dict[str, typing.Any]]
+
+
+class DiskSpillQueue:
+    """
+    Append-only queue of event batches stored in segment files on disk.
+
+    Each batch is one line of JSON, appended to the newest segment until it
+    reaches `max_segment_bytes`. Batches are consumed in order from the oldest
+    segment, which is deleted once consumed. How far the oldest segment has
+    been consumed is only held in memory, so batches consumed but not yet
+    deleted are delivered again after a restart.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 1024 * 1024,
+        max_total_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        """
+        :param directory: directory to store segments in, created if missing.
+            Must not be shared with another queue.
+        :param max_segment_bytes: size after which a new segment is started.
+        :param max_total_bytes: size of all segments after which the oldest
+            are dropped to make space for new batches.
+        """
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_total_bytes = max_total_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._segments: typing.List[int] = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX) and name[: -len(SEGMENT_SUFFIX)].isdigit()
+        )
+        self._total_bytes = sum(
+            os.path.getsize(self._get_path(segment)) for segment in self._segments
+        )
+        # Offset of the next batch to read in the oldest segment.
+        self._read_offset = 0
+        # Next batch to consume, along with its size on disk.
+        self._head: typing.Optional[typing.Tuple[Batch, int]] = None
+
+    def __bool__(self) -> bool:
+        with self._lock:
+            return self._total_bytes > self._read_offset
+
+    def append(self, batch: Batch) -> None:
+        line = (json.dumps(batch) + "\n").encode()
+        with self._lock:
+            self._make_space(len(line))
+            if (
+                not self._segments
+                or os.path.getsize(self._get_path(self._segments[-1]))
+                >= self.max_segment_bytes
+            ):
+                self._segments.append(self._segments[-1] + 1 if self._segments else 0)
+            with open(self._get_path(self._segments[-1]), "ab") as f:
+                f.write(line)
+            self._total_bytes += len(line)
+
+    def peek(self) -> typing.Optional[Batch]:
+        """
+        :return: the oldest batch, or None if the queue is empty.
+        """
+        with self._lock:
+            while self._head is None and self._segments:
+                self._head = self._read_batch()
+            return self._head[0] if self._head is not None else None
+
+    def pop(self) -> None:
+        """
+        Remove the batch last returned by :meth:`peek`.
+        """
+        with self._lock:
+            if self._head is not None:
+                self._read_offset += self._head[1]
+                self._head = None
+                self._remove_consumed_segment()
+
+    def _read_batch(self) -> typing.Optional[typing.Tuple[Batch, int]]:
+        with open(self._get_path(self._segments[0]), "rb") as f:
+            f.seek(self._read_offset)
+            line = f.readline()
+        if not line:
+            self._remove_consumed_segment()
+            return None
+        try:
+            if not line.endswith(b"\n"):
+                raise ValueError("Incomplete batch")
+            batch: Batch = json.loads(line)
+        except ValueError:
+            logger.warning("Skipping unreadable spilled event batch")
+            self._read_offset += len(line)
+            self._remove_consumed_segment()
+            return None
+        return batch, len(line)
+
+    def _remove_consumed_segment(self) -> None:
+        path = self._get_path(self._segments[0])
+        size = os.path.getsize(path)
+        if self._read_offset < size:
+            return
+        os.remove(path)
+        self._segments.pop(0)
+        self._total_bytes -= size
+        self._read_offset = 0
+
+    def _make_space(self, size: int) -> None:
+        while self._segments and self._total_bytes + size > self.max_total_bytes:
+            path = self._get_path(self._segments.pop(0))
+            logger.warning("Event spill queue is full, dropping oldest batches")
+            self._total_bytes -= os.path.getsize(path)
+            os.remove(path)
+            self._read_offset = 0
+            self._head = None
+
+    def _get_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}{SEGMENT_SUFFIX}")
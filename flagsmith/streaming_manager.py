@@ -6,6 +6,7 @@ from typing import Callable, Optional
 import requests
 import sseclient
 
+from flagsmith.json_codecs import JsonCodec
 from flagsmith.mappers import map_sse_event_to_stream_event
 from flagsmith.types import StreamEvent
 
@@ -19,6 +20,7 @@ class EventStreamManager(threading.Thread):
         stream_url: str,
         on_event: Callable[[StreamEvent], None],
         request_timeout_seconds: Optional[int] = None,
+        json_codec: Optional[JsonCodec] = None,
         **kwargs: typing.Any,
     ) -> None:
         super().__init__(*args, **kwargs)
@@ -26,6 +28,7 @@ class EventStreamManager(threading.Thread):
         self.stream_url = stream_url
         self.on_event = on_event
         self.request_timeout_seconds = request_timeout_seconds
+        self.json_codec = json_codec
 
     def run(self) -> None:
         while not self._stop_event.is_set():
@@ -38,7 +41,9 @@ class EventStreamManager(threading.Thread):
                 ) as response:
                     sse_client = sseclient.SSEClient(chunk for chunk in response)
                     for event in sse_client.events():
-                        self.on_event(map_sse_event_to_stream_event(event))
+                        self.on_event(
+                            map_sse_event_to_stream_event(event, self.json_codec)
+                        )
 
             except Exception:
                 logger.exception("Error opening or reading from the event stream")
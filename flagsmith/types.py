@@ -31,6 +31,8 @@ class TraitConfig(typing.TypedDict):
 
 TraitMapping: TypeAlias = typing.Mapping[str, typing.Union[ContextValue, TraitConfig]]
 
+IdentityData: TypeAlias = typing.Tuple[str, typing.Optional[TraitMapping]]
+
 
 class ApplicationMetadata(typing.TypedDict):
     name: NotRequired[str]
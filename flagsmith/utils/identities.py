@@ -24,3 +24,30 @@ def generate_identity_data(
     if transient:
         identity_data["transient"] = True
     return identity_data
+
+
+def generate_identity_cache_key(
+    identifier: str,
+    traits: typing.Optional[TraitMapping],
+) -> typing.Optional[typing.Hashable]:
+    """
+    Generate a key identifying an identity and its trait values, or None
+    if the trait values aren't hashable.
+
+    Trait value types are part of the key, as e.g. `True` and `1` evaluate
+    differently but compare equal.
+    """
+    trait_values = (
+        (
+            trait_key,
+            trait_value["value"] if isinstance(trait_value, dict) else trait_value,
+        )
+        for trait_key, trait_value in (traits or {}).items()
+    )
+    try:
+        return identifier, frozenset(
+            (trait_key, type(trait_value), trait_value)
+            for trait_key, trait_value in trait_values
+        )
+    except TypeError:
+        return None
@@ -0,0 +1,167 @@
+import codecs
+import json
+import re
+import typing
+
+StreamedPaths = typing.Mapping[
+    typing.Tuple[str, ...],
+    typing.Callable[[typing.Any], None],
+]
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters that may follow the valid prefix of a number, e.g. "1." or "1e".
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+def load_streamed(
+    chunks: typing.Iterable[bytes],
+    streamed_paths: StreamedPaths,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Parse a UTF-8 encoded JSON object from `chunks` without holding the
+    whole document in memory.
+
+    Each element of an array found at one of `streamed_paths`, e.g.
+    ``("project", "segments")``, is passed to that path's callback as soon
+    as it is parsed, and the array is left out of the returned object. Any
+    other value found at one of `streamed_paths` is passed to the callback
+    whole, and kept in the returned object. Exceptions raised by callbacks
+    stop parsing and are propagated.
+
+    :raises ValueError: if the document is not a valid JSON object.
+    """
+    reader = _Reader(chunks, streamed_paths)
+    document = reader.read_object(())
+    if reader.peek():
+        raise ValueError("Unexpected data after JSON document.")
+    return document
+
+
+class _Reader:
+    def __init__(
+        self,
+        chunks: typing.Iterable[bytes],
+        streamed_paths: StreamedPaths,
+    ) -> None:
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._exhausted = False
+        self._streamed_paths = streamed_paths
+        # Objects containing streamed arrays, which are parsed key by key.
+        self._streamed_parents = {
+            path[:length] for path in streamed_paths for length in range(1, len(path))
+        }
+
+    def peek(self) -> str:
+        """
+        Skip whitespace.
+
+        :return: the next character, or an empty string at the end of the
+            document.
+        """
+        while True:
+            match = _WHITESPACE.match(self._buffer, self._pos)
+            assert match is not None
+            self._pos = match.end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read(1):
+                return ""
+
+    def read_object(self, path: typing.Tuple[str, ...]) -> typing.Dict[str, typing.Any]:
+        self._expect("{")
+        document: typing.Dict[str, typing.Any] = {}
+        if self.peek() == "}":
+            self._pos += 1
+            return document
+        while True:
+            key = self._read_value()
+            if not isinstance(key, str):
+                raise ValueError("Expected a JSON object key.")
+            self._expect(":")
+            key_path = path + (key,)
+            if (callback := self._streamed_paths.get(key_path)) and self.peek() == "[":
+                self._read_array(callback)
+            elif callback:
+                callback(document.setdefault(key, self._read_value()))
+            elif key_path in self._streamed_parents and self.peek() == "{":
+                document[key] = self.read_object(key_path)
+            else:
+                document[key] = self._read_value()
+            if self._next_separator("}"):
+                return document
+
+    def _read_array(self, callback: typing.Callable[[typing.Any], None]) -> None:
+        self._expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            callback(self._read_value())
+            if self._next_separator("]"):
+                return
+
+    def _read_value(self) -> typing.Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value is incomplete. Read as much again as
+                # is buffered, so large values are not parsed too many times.
+                if not self._read(2 * (len(self._buffer) - self._pos)):
+                    raise
+                continue
+            # A number ending at, or just before, the end of the buffer may
+            # continue in the next chunk, e.g. "1." followed by "5".
+            if (
+                self._buffer[self._pos] in "-0123456789"
+                and _NUMBER_TAIL.fullmatch(self._buffer, end)
+                and self._read(len(self._buffer) - self._pos + 1)
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def _next_separator(self, closing: str) -> bool:
+        """
+        :return: whether the container was closed, rather than continued.
+        """
+        char = self.peek()
+        self._pos += 1
+        if char == closing:
+            return True
+        if char != ",":
+            raise ValueError(f"Expected ',' or {closing!r} in JSON document.")
+        return False
+
+    def _expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON document.")
+        self._pos += 1
+
+    def _read(self, size: int) -> bool:
+        """
+        Read chunks until at least `size` unconsumed characters are buffered.
+
+        :return: whether anything was read.
+        """
+        if self._exhausted:
+            return False
+        pos = self._pos
+        parts = [self._buffer[pos:]]
+        buffered = len(parts[0])
+        while buffered < size or buffered == len(parts[0]):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._exhausted = True
+                parts.append(self._text_decoder.decode(b"", final=True))
+                break
+            parts.append(text := self._text_decoder.decode(chunk))
+            buffered += len(text)
+        self._buffer = "".join(parts)
+        self._pos = 0
+        return True
@@ -49,6 +49,8 @@ def stop_flagsmith_background_threads(
         if stream := getattr(flagsmith, "event_stream_thread", None):
             stream.stop()
             stream.join(timeout=5)
+        if flagsmith._analytics_processor:
+            flagsmith._analytics_processor.stop()
         if flagsmith._event_processor:
             flagsmith._event_processor.stop()
 
@@ -104,7 +106,7 @@ def requests_session_response_ok(mocker: MockerFixture, environment_json: str) -
     mocker.patch("flagsmith.flagsmith.requests.Session", return_value=mock_session)
 
     mock_environment_document_response = mocker.MagicMock(status_code=200)
-    mock_environment_document_response.json.return_value = json.loads(environment_json)
+    mock_environment_document_response.content = environment_json.encode()
     mock_session.get.return_value = mock_environment_document_response
 
 
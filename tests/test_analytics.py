@@ -1,11 +1,20 @@
+import gzip
 import json
-from datetime import datetime, timedelta
+import threading
+import time
+import typing
+from concurrent.futures import Future
 from unittest import mock
 
+import pytest
+
 from flagsmith.analytics import (
     ANALYTICS_ENDPOINT,
     ANALYTICS_TIMER,
     AnalyticsProcessor,
+    AnalyticsProcessorConfig,
+    AnalyticsTransport,
+    AnalyticsTransportConfig,
 )
 
 
@@ -32,7 +41,7 @@ def test_analytics_processor_flush_post_request_data_match_ananlytics_data(
     analytics_processor: AnalyticsProcessor,
 ) -> None:
     # Given
-    with mock.patch("flagsmith.analytics.session") as session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
         # When
         analytics_processor.track_feature("my_feature_1")
         analytics_processor.track_feature("my_feature_2")
@@ -49,7 +58,7 @@ def test_analytics_processor_flush_post_request_data_match_ananlytics_data(
 def test_analytics_processor_flush_early_exit_if_analytics_data_is_empty(
     analytics_processor: AnalyticsProcessor,
 ) -> None:
-    with mock.patch("flagsmith.analytics.session") as session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
         analytics_processor.flush()
 
     # Then
@@ -61,13 +70,11 @@ def test_analytics_processor_calling_track_feature_calls_flush_when_timer_runs_o
 ) -> None:
     # Given
     with (
-        mock.patch("flagsmith.analytics.datetime") as mocked_datetime,
-        mock.patch("flagsmith.analytics.session") as session,
+        mock.patch("flagsmith.analytics.time") as mocked_time,
+        mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session,
     ):
         # Let's move the time
-        mocked_datetime.now.return_value = datetime.now() + timedelta(
-            seconds=ANALYTICS_TIMER + 1
-        )
+        mocked_time.monotonic.return_value = time.monotonic() + ANALYTICS_TIMER + 1
         # When
         analytics_processor.track_feature("my_feature")
 
@@ -75,6 +82,37 @@ def test_analytics_processor_calling_track_feature_calls_flush_when_timer_runs_o
     session.post.assert_called()
 
 
+def test_analytics_processor_track_feature_counts_exactly_across_threads(
+    analytics_processor: AnalyticsProcessor,
+) -> None:
+    # Given
+    def track_features() -> None:
+        for _ in range(10_000):
+            analytics_processor.track_feature("my_feature_1")
+            analytics_processor.track_feature("my_feature_2")
+
+    threads = [threading.Thread(target=track_features) for _ in range(8)]
+
+    # When
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
+        for thread in threads:
+            thread.start()
+        # Flush while counting to check no evaluations are lost or repeated.
+        analytics_processor.flush()
+        for thread in threads:
+            thread.join()
+        analytics_processor.flush()
+
+    # Then
+    totals: typing.Dict[str, int] = {}
+    for call in session.post.call_args_list:
+        for feature_name, count in json.loads(call.kwargs["data"]).items():
+            totals[feature_name] = totals.get(feature_name, 0) + count
+    assert totals == {"my_feature_1": 80_000, "my_feature_2": 80_000}
+    # Counts of finished threads are dropped once flushed.
+    assert analytics_processor._feature_counts == []
+
+
 def test_analytics_processor_posts_to_analytics_url_when_set() -> None:
     # Given
     processor = AnalyticsProcessor(
@@ -84,7 +122,7 @@ def test_analytics_processor_posts_to_analytics_url_when_set() -> None:
     )
 
     # When
-    with mock.patch("flagsmith.analytics.session") as session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
         processor.track_feature("my_feature")
         processor.flush()
 
@@ -92,3 +130,149 @@ def test_analytics_processor_posts_to_analytics_url_when_set() -> None:
     session.post.assert_called_once()
     assert session.post.call_args[0][0] == "http://core-api/analytics/flags/"
     assert "edge-proxy" not in session.post.call_args[0][0]
+
+
+def test_analytics_processor_start_flushes_from_background_thread() -> None:
+    # Given
+    processor = AnalyticsProcessor(
+        environment_key="test_key",
+        base_api_url="http://test_url",
+        config=AnalyticsProcessorConfig(flush_interval_seconds=0.01),
+    )
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
+        processor.start()
+
+        # When
+        processor.track_feature("my_feature")
+        deadline = time.monotonic() + 5
+        while not session.post.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        processor.stop()
+
+    # Then
+    session.post.assert_called_once()
+    assert json.loads(session.post.call_args.kwargs["data"]) == {"my_feature": 1}
+
+
+def test_analytics_processor_max_keys_requests_flush() -> None:
+    # Given
+    processor = AnalyticsProcessor(
+        environment_key="test_key",
+        base_api_url="http://test_url",
+        config=AnalyticsProcessorConfig(flush_interval_seconds=60, max_keys=2),
+    )
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session:
+        processor.start()
+
+        # When
+        processor.track_feature("my_feature_1")
+        processor.track_feature("my_feature_1")
+        processor.track_feature("my_feature_2")
+        deadline = time.monotonic() + 5
+        while not session.post.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        processor.stop()
+
+    # Then
+    session.post.assert_called_once()
+    assert json.loads(session.post.call_args.kwargs["data"]) == {
+        "my_feature_1": 2,
+        "my_feature_2": 1,
+    }
+
+
+def test_analytics_processor_stop_flushes_and_unregisters_atexit() -> None:
+    # Given
+    processor = AnalyticsProcessor(
+        environment_key="test_key", base_api_url="http://test_url"
+    )
+
+    with (
+        mock.patch("flagsmith.analytics.atexit") as mocked_atexit,
+        mock.patch("flagsmith.analytics.AnalyticsTransport.session") as session,
+    ):
+        processor.start()
+        processor.track_feature("my_feature")
+
+        # When
+        processor.stop()
+
+    # Then
+    mocked_atexit.register.assert_called_once_with(processor.stop)
+    mocked_atexit.unregister.assert_called_once_with(processor.stop)
+    session.post.assert_called_once()
+    assert processor._flush_thread is not None
+    assert not processor._flush_thread.is_alive()
+
+
+def test_analytics_transport_session__created_lazily_from_config() -> None:
+    # Given
+    transport = AnalyticsTransport(
+        AnalyticsTransportConfig(max_workers=2, pool_maxsize=8, keep_alive=False)
+    )
+    assert "session" not in transport.__dict__
+
+    # When
+    session = transport.session
+
+    # Then
+    adapter = session.get_adapter("https://")
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries is transport.config.retries
+    assert session.executor._max_workers == 2
+    assert session.headers["Connection"] == "close"
+    transport.close()
+
+
+def test_analytics_transport_close__waits_for_requests_in_flight() -> None:
+    # Given
+    transport = AnalyticsTransport()
+    future: Future[None] = Future()
+    with mock.patch.object(AnalyticsTransport, "session") as session:
+        session.post.return_value = future
+        transport.post("http://test_url", data=b"{}", headers={})
+        threading.Timer(0.05, future.set_result, args=(None,)).start()
+
+        # When
+        transport.close()
+
+    # Then
+    assert future.done()
+    with pytest.raises(RuntimeError):
+        transport.post("http://test_url", data=b"{}", headers={})
+
+
+@pytest.mark.parametrize(
+    "data, expected_content_encoding",
+    [(b"x" * 1024, "gzip"), (b"x" * 1023, None)],
+)
+def test_analytics_transport_post__compresses_body_above_threshold(
+    data: bytes,
+    expected_content_encoding: typing.Optional[str],
+) -> None:
+    # Given
+    transport = AnalyticsTransport(
+        AnalyticsTransportConfig(compression="gzip", compression_threshold_bytes=1024)
+    )
+    headers = {"Content-Type": "application/json"}
+
+    # When
+    with mock.patch.object(AnalyticsTransport, "session") as session:
+        transport.post("http://test_url", data=data, headers=headers)
+
+    # Then
+    sent = session.post.call_args.kwargs
+    assert sent["headers"].get("Content-Encoding") == expected_content_encoding
+    body = sent["data"]
+    if expected_content_encoding:
+        body = gzip.decompress(body)
+    assert body == data
+    assert headers == {"Content-Type": "application/json"}
+
+
+def test_analytics_transport__unsupported_compression__raises_value_error() -> None:
+    # When
+    with pytest.raises(ValueError):
+        AnalyticsTransport(AnalyticsTransportConfig(compression="brotli"))
@@ -0,0 +1,375 @@
+import json
+import threading
+import typing
+
+import httpx
+import pytest
+import respx
+from pytest_mock import MockerFixture
+
+from flagsmith.analytics import ANALYTICS_ENDPOINT, EventProcessorConfig
+from flagsmith.async_flagsmith import AsyncFlagsmith, _iter_sse_events
+from flagsmith.cache import (
+    EnvironmentFlagsCacheConfig,
+    IdentityFlagsCacheConfig,
+    LRUCache,
+)
+from flagsmith.exceptions import FlagsmithAPIError
+from flagsmith.models import DefaultFlag
+
+API_URL = "https://mocked.flagsmith.com/api/v1/"
+
+
+@pytest.fixture()
+def environment_document_route(
+    respx_mock: respx.MockRouter, environment_json: str
+) -> respx.Route:
+    return respx_mock.get(f"{API_URL}environment-document/").respond(
+        text=environment_json, headers={"ETag": '"some-etag"'}
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_environment_flags__remote_evaluation__returns_expected(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+    flags_json: str,
+) -> None:
+    # Given
+    route = respx_mock.get(f"{API_URL}flags/").respond(text=flags_json)
+
+    # When
+    async with AsyncFlagsmith(environment_key=api_key, api_url=API_URL) as flagsmith:
+        flags = await flagsmith.get_environment_flags()
+
+    # Then
+    assert route.calls.last.request.headers["X-Environment-Key"] == api_key
+    assert flags.is_feature_enabled("some_feature") is True
+    assert flags.get_feature_value("some_feature") == "some-value"
+
+
+@pytest.mark.asyncio
+async def test_get_identity_flags__remote_evaluation__returns_expected(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+    identities_json: str,
+) -> None:
+    # Given
+    route = respx_mock.post(f"{API_URL}identities/").respond(text=identities_json)
+
+    # When
+    async with AsyncFlagsmith(environment_key=api_key, api_url=API_URL) as flagsmith:
+        flags = await flagsmith.get_identity_flags(
+            "identifier", traits={"some_trait": "some_value"}
+        )
+
+    # Then
+    assert json.loads(route.calls.last.request.content) == {
+        "identifier": "identifier",
+        "traits": [{"trait_key": "some_trait", "trait_value": "some_value"}],
+    }
+    assert flags.get_feature_value("some_feature") == "some-value"
+
+
+@pytest.mark.asyncio
+async def test_get_environment_flags__api_error__uses_default_flag_handler(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+) -> None:
+    # Given
+    respx_mock.get(f"{API_URL}flags/").respond(status_code=500)
+    default_flag = DefaultFlag(enabled=True, value="some-default-value")
+
+    # When
+    async with AsyncFlagsmith(
+        environment_key=api_key,
+        api_url=API_URL,
+        default_flag_handler=lambda feature_name: default_flag,
+    ) as flagsmith:
+        flags = await flagsmith.get_environment_flags()
+
+    # Then
+    assert flags.get_flag("some_feature") is default_flag
+
+
+@pytest.mark.asyncio
+async def test_get_environment_flags__api_error__raises_flagsmith_api_error(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+) -> None:
+    # Given
+    respx_mock.get(f"{API_URL}flags/").mock(side_effect=httpx.ConnectError)
+
+    # When
+    async with AsyncFlagsmith(environment_key=api_key, api_url=API_URL) as flagsmith:
+        with pytest.raises(FlagsmithAPIError):
+            await flagsmith.get_environment_flags()
+
+
+@pytest.mark.asyncio
+async def test_local_evaluation__start__retrieves_environment(
+    environment_document_route: respx.Route,
+    server_api_key: str,
+) -> None:
+    # When
+    async with AsyncFlagsmith(
+        environment_key=server_api_key,
+        api_url=API_URL,
+        enable_local_evaluation=True,
+    ) as flagsmith:
+        environment_flags = await flagsmith.get_environment_flags()
+        identity_flags = await flagsmith.get_identity_flags("overridden-id")
+        segments = await flagsmith.get_identity_segments(
+            "identifier", traits={"foo": "bar"}
+        )
+
+    # Then
+    assert environment_document_route.call_count == 1
+    assert environment_flags.get_feature_value("some_feature") == "some-value"
+    assert identity_flags.get_feature_value("some_feature") == "some-overridden-value"
+    assert [segment.name for segment in segments] == ["Test segment"]
+
+
+@pytest.mark.asyncio
+async def test_update_environment__applies_document_off_event_loop(
+    mocker: MockerFixture,
+    environment_document_route: respx.Route,
+    server_api_key: str,
+) -> None:
+    # Given
+    flagsmith = AsyncFlagsmith(
+        environment_key=server_api_key,
+        api_url=API_URL,
+        enable_local_evaluation=True,
+    )
+    apply_threads: typing.List[int] = []
+    apply_environment_document = flagsmith._apply_environment_document
+
+    def record_apply_thread(*args: typing.Any) -> None:
+        apply_threads.append(threading.get_ident())
+        apply_environment_document(*args)
+
+    mocker.patch.object(
+        flagsmith, "_apply_environment_document", side_effect=record_apply_thread
+    )
+
+    # When
+    await flagsmith.update_environment()
+    await flagsmith.close()
+
+    # Then
+    assert len(apply_threads) == 1
+    assert apply_threads[0] != threading.get_ident()
+    assert flagsmith._evaluation_context is not None
+
+
+@pytest.mark.asyncio
+async def test_update_environment__not_modified__keeps_context(
+    respx_mock: respx.MockRouter,
+    environment_document_route: respx.Route,
+    server_api_key: str,
+) -> None:
+    # Given
+    async with AsyncFlagsmith(
+        environment_key=server_api_key,
+        api_url=API_URL,
+        enable_local_evaluation=True,
+    ) as flagsmith:
+        evaluation_context = flagsmith._evaluation_context
+        environment_document_route.respond(status_code=304)
+
+        # When
+        await flagsmith.update_environment()
+
+    # Then
+    request = environment_document_route.calls.last.request
+    assert request.headers["If-None-Match"] == '"some-etag"'
+    assert flagsmith._evaluation_context is evaluation_context
+
+
+@pytest.mark.asyncio
+async def test_get_experiment_flag__flushes_exposure_event_on_close(
+    respx_mock: respx.MockRouter,
+    environment_document_route: respx.Route,
+    server_api_key: str,
+) -> None:
+    # Given
+    events_route = respx_mock.post("http://test_analytics/v1/events").respond()
+
+    # When
+    async with AsyncFlagsmith(
+        environment_key=server_api_key,
+        api_url=API_URL,
+        enable_local_evaluation=True,
+        enable_events=True,
+        event_processor_config=EventProcessorConfig(
+            events_api_url="http://test_analytics/"
+        ),
+    ) as flagsmith:
+        flag = await flagsmith.get_experiment_flag("some_feature", "identifier")
+
+    # Then
+    assert flag.value == "some-value"
+    [event] = json.loads(events_route.calls.last.request.content)["events"]
+    assert event["event"] == "$flag_exposure"
+    assert event["feature_name"] == "some_feature"
+    assert event["identifier"] == "identifier"
+
+
+@pytest.mark.asyncio
+async def test_analytics__flushes_on_close(
+    respx_mock: respx.MockRouter,
+    environment_document_route: respx.Route,
+    server_api_key: str,
+) -> None:
+    # Given
+    analytics_route = respx_mock.post(f"{API_URL}{ANALYTICS_ENDPOINT}").respond()
+
+    # When
+    async with AsyncFlagsmith(
+        environment_key=server_api_key,
+        api_url=API_URL,
+        enable_local_evaluation=True,
+        enable_analytics=True,
+    ) as flagsmith:
+        flags = await flagsmith.get_environment_flags()
+        flags.get_flag("some_feature")
+
+    # Then
+    assert json.loads(analytics_route.calls.last.request.content) == {"some_feature": 1}
+
+
+@pytest.mark.asyncio
+async def test_close__analytics_enabled__not_started__flushes_analytics(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+    flags_json: str,
+) -> None:
+    # Given
+    respx_mock.get(f"{API_URL}flags/").respond(text=flags_json)
+    analytics_route = respx_mock.post(f"{API_URL}{ANALYTICS_ENDPOINT}").respond()
+    flagsmith = AsyncFlagsmith(
+        environment_key=api_key, api_url=API_URL, enable_analytics=True
+    )
+    flags = await flagsmith.get_environment_flags()
+    flags.get_flag("some_feature")
+
+    # When
+    await flagsmith.close()
+
+    # Then
+    assert json.loads(analytics_route.calls.last.request.content) == {"some_feature": 1}
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_events__parses_data_events() -> None:
+    # Given
+    response = httpx.Response(
+        200,
+        content=(
+            b": keep-alive\n\n"
+            b"event: environment_updated\n"
+            b'data: {"updated_at": 1689351120}\n\n'
+        ),
+    )
+
+    # When
+    events: typing.List[typing.Any] = [
+        event async for event in _iter_sse_events(response)
+    ]
+
+    # Then
+    assert len(events) == 1
+    assert events[0].event == "environment_updated"
+    assert json.loads(events[0].data) == {"updated_at": 1689351120}
+
+
+@pytest.mark.asyncio
+async def test_get_identity_flags_batch__remote_evaluation__returns_flags_in_order(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+) -> None:
+    # Given
+    def respond(request: httpx.Request) -> httpx.Response:
+        identifier = json.loads(request.content)["identifier"]
+        return httpx.Response(
+            200,
+            json={
+                "flags": [
+                    {
+                        "enabled": True,
+                        "feature_state_value": identifier,
+                        "feature": {"id": 1, "name": "some_feature"},
+                    }
+                ]
+            },
+        )
+
+    respx_mock.post(f"{API_URL}identities/").mock(side_effect=respond)
+    identifiers = [f"identifier-{i}" for i in range(5)]
+
+    # When
+    async with AsyncFlagsmith(environment_key=api_key, api_url=API_URL) as flagsmith:
+        flags = await flagsmith.get_identity_flags_batch(
+            [(identifier, None) for identifier in identifiers], max_concurrency=2
+        )
+
+    # Then
+    assert [f.get_feature_value("some_feature") for f in flags] == identifiers
+
+
+@pytest.mark.asyncio
+async def test_get_environment_flags__environment_flags_cache__revalidates_stale_flags(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+    flags_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    monotonic = mocker.patch("flagsmith.flagsmith.time.monotonic", return_value=0.0)
+    route = respx_mock.get(f"{API_URL}flags/").respond(text=flags_json)
+
+    async with AsyncFlagsmith(
+        environment_key=api_key,
+        api_url=API_URL,
+        environment_flags_cache_config=EnvironmentFlagsCacheConfig(
+            ttl_seconds=10, stale_while_revalidate_seconds=5
+        ),
+    ) as flagsmith:
+        flags = await flagsmith.get_environment_flags()
+
+        # When
+        monotonic.return_value = 12.0
+        stale_flags = await flagsmith.get_environment_flags()
+        assert flagsmith._environment_flags_revalidation_task is not None
+        await flagsmith._environment_flags_revalidation_task
+        refreshed_flags = await flagsmith.get_environment_flags()
+
+    # Then
+    assert stale_flags is flags
+    assert refreshed_flags is not flags
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_identity_flags__remote_identity_flags_cache__returns_cached_flags(
+    respx_mock: respx.MockRouter,
+    api_key: str,
+    identities_json: str,
+) -> None:
+    # Given
+    route = respx_mock.post(f"{API_URL}identities/").respond(text=identities_json)
+    backend: LRUCache[str, bytes] = LRUCache()
+
+    async with AsyncFlagsmith(
+        environment_key=api_key,
+        api_url=API_URL,
+        remote_identity_flags_cache_config=IdentityFlagsCacheConfig(backend=backend),
+    ) as flagsmith:
+        # When
+        flags = await flagsmith.get_identity_flags("identifier")
+        cached_flags = await flagsmith.get_identity_flags("identifier")
+
+    # Then
+    assert cached_flags.all_flags() == flags.all_flags()
+    assert route.call_count == 1
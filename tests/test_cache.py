@@ -0,0 +1,75 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from flagsmith.cache import LRUCache
+
+
+def test_lru_cache__get__counts_hits_and_misses() -> None:
+    # Given
+    cache: LRUCache[str, int] = LRUCache()
+    cache.set("key", 1)
+
+    # When
+    results = [cache.get("key"), cache.get("missing"), cache.get("key")]
+
+    # Then
+    assert results == [1, None, 1]
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_lru_cache__set__evicts_least_recently_used() -> None:
+    # Given
+    cache: LRUCache[str, int] = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    # When
+    cache.set("c", 3)
+
+    # Then
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache__get__expires_entries_after_ttl(mocker: MockerFixture) -> None:
+    # Given
+    monotonic = mocker.patch("flagsmith.cache.time.monotonic", return_value=100.0)
+    cache: LRUCache[str, int] = LRUCache(ttl_seconds=10)
+    cache.set("key", 1)
+
+    # When
+    monotonic.return_value = 109.0
+    before_expiry = cache.get("key")
+    monotonic.return_value = 110.0
+    after_expiry = cache.get("key")
+
+    # Then
+    assert before_expiry == 1
+    assert after_expiry is None
+    assert len(cache) == 0
+
+
+def test_lru_cache__delete_and_clear__remove_entries() -> None:
+    # Given
+    cache: LRUCache[str, int] = LRUCache(ttl_seconds=None)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    # When
+    cache.delete("a")
+    deleted = cache.get("a")
+    cache.clear()
+
+    # Then
+    assert deleted is None
+    assert len(cache) == 0
+
+
+def test_lru_cache__invalid_max_size__raises_value_error() -> None:
+    # When
+    with pytest.raises(ValueError):
+        LRUCache(max_size=0)
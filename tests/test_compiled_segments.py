@@ -0,0 +1,206 @@
+import typing
+
+import pytest
+from flag_engine import engine
+from flag_engine.context.types import SegmentCondition, SegmentRule
+
+from flagsmith.compiled_segments import CompiledSegments
+from flagsmith.mappers import map_context_and_identity_data_to_context
+from flagsmith.types import SDKEvaluationContext, TraitMapping
+
+
+def _get_context(
+    rules: typing.List[SegmentRule],
+    traits: TraitMapping,
+    identifier: str = "identifier",
+) -> SDKEvaluationContext:
+    context: SDKEvaluationContext = {
+        "environment": {"key": "api-key", "name": "Test environment"},
+        "features": {
+            "some_feature": {
+                "key": "1",
+                "name": "some_feature",
+                "enabled": False,
+                "value": "default",
+                "metadata": {"id": 1},
+            },
+        },
+        "segments": {
+            "1": {
+                "key": "1",
+                "name": "some_segment",
+                "rules": rules,
+                "overrides": [
+                    {
+                        "key": "2",
+                        "name": "some_feature",
+                        "enabled": True,
+                        "value": "overridden",
+                        "metadata": {"id": 1},
+                    },
+                ],
+                "metadata": {"id": 1, "source": "api"},
+            },
+        },
+    }
+    return map_context_and_identity_data_to_context(context, identifier, traits)
+
+
+def _all_rule(*conditions: SegmentCondition) -> SegmentRule:
+    return {"type": "ALL", "conditions": list(conditions)}
+
+
+@pytest.mark.parametrize(
+    "condition",
+    [
+        {"property": "age", "operator": "EQUAL", "value": "21"},
+        {"property": "age", "operator": "GREATER_THAN", "value": "18"},
+        {"property": "age", "operator": "LESS_THAN_INCLUSIVE", "value": "18.5"},
+        {"property": "age", "operator": "NOT_EQUAL", "value": "not-a-number"},
+        {"property": "age", "operator": "MODULO", "value": "2|1"},
+        {"property": "age", "operator": "MODULO", "value": "invalid"},
+        {"property": "age", "operator": "IN", "value": "18,21,30"},
+        {"property": "age", "operator": "IN", "value": "[18, 21]"},
+        {"property": "email", "operator": "CONTAINS", "value": "@example"},
+        {"property": "email", "operator": "NOT_CONTAINS", "value": "@example"},
+        {"property": "email", "operator": "REGEX", "value": r".*@example\.com$"},
+        {"property": "email", "operator": "IN", "value": ["a@example.com"]},
+        {"property": "flag", "operator": "EQUAL", "value": "false"},
+        {"property": "flag", "operator": "IN", "value": "True,1"},
+        {"property": "version", "operator": "GREATER_THAN", "value": "1.2.0:semver"},
+        {"property": "version", "operator": "EQUAL", "value": "1.2.3:semver"},
+        {"property": "version", "operator": "LESS_THAN", "value": "invalid:semver"},
+        {"property": "missing", "operator": "IS_NOT_SET", "value": None},
+        {"property": "missing", "operator": "IS_SET", "value": None},
+        {"property": "missing", "operator": "EQUAL", "value": "anything"},
+        {"property": "", "operator": "PERCENTAGE_SPLIT", "value": "50"},
+        {"property": "email", "operator": "PERCENTAGE_SPLIT", "value": "50"},
+        {"property": "age", "operator": "PERCENTAGE_SPLIT", "value": "invalid"},
+        {
+            "property": "$.identity.identifier",
+            "operator": "EQUAL",
+            "value": "identifier",
+        },
+        {
+            "property": "$.environment.name",
+            "operator": "EQUAL",
+            "value": "Test environment",
+        },
+        {"property": "$.identity.traits", "operator": "IS_SET", "value": None},
+        {"property": "$.identity.traits.age", "operator": "EQUAL", "value": "21"},
+        {"property": "$.identity['identifier']", "operator": "IS_SET", "value": None},
+        {"property": "$.dotted.trait", "operator": "EQUAL", "value": "yes"},
+        {"property": "age", "operator": "UNKNOWN", "value": "21"},
+    ],
+)
+@pytest.mark.parametrize(
+    "traits",
+    [
+        {},
+        {
+            "age": 21,
+            "email": "a@example.com",
+            "flag": False,
+            "version": "1.2.3",
+            "$.dotted.trait": "yes",
+        },
+        {
+            "age": "17.5",
+            "email": "b@test.com",
+            "flag": "true",
+            "version": "not-a-version",
+        },
+    ],
+)
+def test_compiled_segments__get_evaluation_result__matches_engine(
+    condition: SegmentCondition,
+    traits: TraitMapping,
+) -> None:
+    # Given
+    context = _get_context([_all_rule(condition)], traits)
+
+    # When
+    result = CompiledSegments(context).get_evaluation_result(context)
+
+    # Then
+    assert result == engine.get_evaluation_result(context)
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        [],
+        [{"type": "ALL", "conditions": []}],
+        [{"type": "NONE", "conditions": []}],
+        [
+            {
+                "type": "ALL",
+                "rules": [
+                    _all_rule({"property": "age", "operator": "EQUAL", "value": "21"}),
+                    {
+                        "type": "NONE",
+                        "conditions": [
+                            {"property": "age", "operator": "LESS_THAN", "value": "18"}
+                        ],
+                    },
+                ],
+            }
+        ],
+        [
+            {
+                "type": "ANY",
+                "conditions": [
+                    {"property": "age", "operator": "EQUAL", "value": "1"},
+                    {"property": "age", "operator": "EQUAL", "value": "21"},
+                ],
+            }
+        ],
+    ],
+)
+def test_compiled_segments__nested_rules__matches_engine(
+    rules: typing.List[SegmentRule],
+) -> None:
+    # Given
+    context = _get_context(rules, {"age": 21})
+
+    # When
+    result = CompiledSegments(context).get_evaluation_result(context)
+
+    # Then
+    assert result == engine.get_evaluation_result(context)
+
+
+def test_compiled_segments__invalid_regex__raises_like_engine() -> None:
+    # Given
+    context = _get_context(
+        [_all_rule({"property": "email", "operator": "REGEX", "value": "["})],
+        {"email": "a@example.com"},
+    )
+
+    # When
+    compiled_segments = CompiledSegments(context)
+
+    # Then
+    with pytest.raises(Exception) as engine_error:
+        engine.get_evaluation_result(context)
+    with pytest.raises(engine_error.type):
+        compiled_segments.get_evaluation_result(context)
+
+
+def test_compiled_segments__get_evaluation_result__single_feature(
+    evaluation_context: SDKEvaluationContext,
+) -> None:
+    # Given
+    compiled_segments = CompiledSegments(evaluation_context)
+    context = map_context_and_identity_data_to_context(
+        evaluation_context, "overridden-id", {}
+    )
+
+    # When
+    result = compiled_segments.get_evaluation_result(
+        context, feature_name="some_feature"
+    )
+
+    # Then
+    assert list(result["flags"]) == ["some_feature"]
+    assert result["flags"]["some_feature"]["value"] == "some-overridden-value"
@@ -1,8 +1,13 @@
 import json
+import os
+import threading
 from concurrent.futures import Future
 from datetime import datetime
+from pathlib import Path
 from unittest import mock
 
+import pytest
+
 from flagsmith.analytics import (
     FLAG_EXPOSURE_EVENT,
     EventProcessor,
@@ -20,8 +25,8 @@ def test_track_event_buffers_event(event_processor: EventProcessor) -> None:
     )
     event_processor.track_event(event="purchase", identifier="user1")
 
-    assert len(event_processor._buffer) == 2
-    event = event_processor._buffer[0]
+    assert len(event_processor._pending_events()) == 2
+    event = event_processor._pending_events()[0]
     assert event["event"] == "purchase"
     assert event["feature_name"] is None
     assert event["identifier"] == "user1"
@@ -41,7 +46,7 @@ def test_buffer_stringifies_non_string_values(
     event_processor.track_event(event="variant", value="control")
     event_processor.track_event(event="empty")
 
-    assert [e["value"] for e in event_processor._buffer] == [
+    assert [e["value"] for e in event_processor._pending_events()] == [
         "99.5",
         "True",
         "3",
@@ -57,7 +62,7 @@ def test_track_event_defaults_timestamp_to_now(
     event_processor.track_event(event="ping")
     after = int(datetime.now().timestamp() * 1000)
 
-    assert before <= event_processor._buffer[0]["timestamp"] <= after
+    assert before <= event_processor._pending_events()[0]["timestamp"] <= after
 
 
 def test_track_exposure_event_buffers_with_flag_exposure_event_name(
@@ -71,8 +76,8 @@ def test_track_exposure_event_buffers_with_flag_exposure_event_name(
         metadata={"source": "homepage"},
     )
 
-    assert len(event_processor._buffer) == 1
-    event = event_processor._buffer[0]
+    assert len(event_processor._pending_events()) == 1
+    event = event_processor._pending_events()[0]
     assert event["event"] == FLAG_EXPOSURE_EVENT == "$flag_exposure"
     assert event["feature_name"] == "checkout_v2"
     assert event["identifier"] == "user1"
@@ -86,15 +91,15 @@ def test_auto_flush_on_buffer_full() -> None:
     config = EventProcessorConfig(events_api_url="http://test/", max_buffer_items=5)
     processor = EventProcessor(config=config, environment_key="key")
 
-    with mock.patch("flagsmith.analytics.session"):
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session"):
         for i in range(5):
             processor.track_event(event=f"event_{i}")
 
-    assert len(processor._buffer) == 0
+    assert len(processor._pending_events()) == 0
 
 
 def test_flush_sends_correct_http_request(event_processor: EventProcessor) -> None:
-    with mock.patch("flagsmith.analytics.session") as mock_session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
         event_processor.track_event(event="purchase", identifier="user1")
         event_processor.flush()
 
@@ -114,23 +119,45 @@ def test_flush_sends_correct_http_request(event_processor: EventProcessor) -> No
 
 
 def test_flush_noop_when_empty(event_processor: EventProcessor) -> None:
-    with mock.patch("flagsmith.analytics.session") as mock_session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
         event_processor.flush()
 
     mock_session.post.assert_not_called()
 
 
+def test_track_event__arguments_mutated_after_tracking__sends_tracked_values(
+    event_processor: EventProcessor,
+) -> None:
+    # Given
+    traits = {"plan": "free"}
+    metadata = {"source": "checkout"}
+    event_processor.track_event(
+        event="purchase", identifier="user1", traits=traits, metadata=metadata
+    )
+
+    # When
+    traits["plan"] = "premium"
+    metadata.clear()
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        event_processor.flush()
+
+    # Then
+    [event] = json.loads(mock_session.post.call_args[1]["data"])["events"]
+    assert event["traits"] == {"plan": "free"}
+    assert event["metadata"]["source"] == "checkout"
+
+
 def test_failed_flush_requeues_events(event_processor: EventProcessor) -> None:
     future: Future[None] = Future()
     future.set_exception(Exception("connection error"))
 
-    with mock.patch("flagsmith.analytics.session") as mock_session:
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
         mock_session.post.return_value = future
         event_processor.track_event(event="purchase")
         event_processor.flush()
 
-    assert len(event_processor._buffer) == 1
-    assert event_processor._buffer[0]["event"] == "purchase"
+    assert len(event_processor._pending_events()) == 1
+    assert event_processor._pending_events()[0]["event"] == "purchase"
 
 
 def test_start_stop_lifecycle() -> None:
@@ -140,11 +167,309 @@ def test_start_stop_lifecycle() -> None:
     processor = EventProcessor(config=config, environment_key="key")
 
     processor.start()
-    assert processor._timer is not None
-    assert processor._timer.is_alive()
+    assert processor._flush_thread is not None
+    assert processor._flush_thread.is_alive()
 
-    with mock.patch("flagsmith.analytics.session"):
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session"):
         processor.track_event(event="purchase")
         processor.stop()
 
-    assert len(processor._buffer) == 0
+    assert len(processor._pending_events()) == 0
+
+
+def test_failed_flush_spills_events_and_replays_them_in_order(tmp_path: Path) -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/",
+        flush_interval_seconds=10,
+        spill_directory=str(tmp_path),
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+    failed: Future[None] = Future()
+    failed.set_exception(Exception("connection error"))
+    succeeded: Future[mock.Mock] = Future()
+    succeeded.set_result(mock.Mock())
+
+    with (
+        mock.patch("flagsmith.analytics.time.monotonic", return_value=0) as monotonic,
+        mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session,
+    ):
+        mock_session.post.return_value = failed
+        processor.track_event(event="first")
+        processor.flush()
+        processor.track_event(event="second")
+        # Spilled events are not replayed while backing off.
+        processor.flush()
+        assert mock_session.post.call_count == 1
+
+        # When
+        monotonic.return_value = 10
+        mock_session.post.return_value = succeeded
+        processor.flush()
+
+    # Then
+    replayed = [
+        [event["event"] for event in json.loads(call.kwargs["data"])["events"]]
+        for call in mock_session.post.call_args_list[1:]
+    ]
+    assert replayed == [["first"], ["second"]]
+    assert processor._pending_events() == []
+    assert os.listdir(tmp_path) == []
+
+
+def test_track_event_from_many_threads_flushes_every_event_once() -> None:
+    # Given
+    config = EventProcessorConfig(events_api_url="http://test/", max_buffer_items=500)
+    processor = EventProcessor(config=config, environment_key="key")
+
+    def track_events(thread_index: int) -> None:
+        for i in range(1000):
+            processor.track_event(event=f"{thread_index}-{i}")
+
+    threads = [threading.Thread(target=track_events, args=(i,)) for i in range(8)]
+
+    sent_future: Future[mock.Mock] = Future()
+    sent_future.set_result(mock.Mock())
+
+    # When
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        mock_session.post.return_value = sent_future
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        processor.flush()
+
+    # Then
+    sent = [
+        event["event"]
+        for call in mock_session.post.call_args_list
+        for event in json.loads(call.kwargs["data"])["events"]
+    ]
+    assert sorted(sent) == sorted(f"{t}-{i}" for t in range(8) for i in range(1000))
+    assert processor._event_buffers == []
+
+
+def test_track_exposure_event_drops_duplicates_within_dedup_window() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/", exposure_dedup_window_seconds=60
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+
+    # When
+    for _ in range(3):
+        processor.track_exposure_event("checkout", identifier="user1", value="a")
+    processor.track_exposure_event("checkout", identifier="user1", value="b")
+    processor.track_exposure_event("checkout", identifier="user2", value="a")
+    processor.track_exposure_event("search", identifier="user1", value="a")
+    processor.track_event(event="purchase", identifier="user1")
+    processor.track_event(event="purchase", identifier="user1")
+
+    # Then
+    assert [
+        (e["event"], e["feature_name"], e["identifier"], e["value"])
+        for e in processor._pending_events()
+    ] == [
+        (FLAG_EXPOSURE_EVENT, "checkout", "user1", "a"),
+        (FLAG_EXPOSURE_EVENT, "checkout", "user1", "b"),
+        (FLAG_EXPOSURE_EVENT, "checkout", "user2", "a"),
+        (FLAG_EXPOSURE_EVENT, "search", "user1", "a"),
+        ("purchase", None, "user1", None),
+        ("purchase", None, "user1", None),
+    ]
+
+
+def test_track_exposure_event_tracks_again_after_dedup_window() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/", exposure_dedup_window_seconds=60
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+
+    # When
+    with mock.patch("flagsmith.cache.time.monotonic", return_value=0) as monotonic:
+        processor.track_exposure_event("checkout", identifier="user1", value="a")
+        monotonic.return_value = 61
+        processor.track_exposure_event("checkout", identifier="user1", value="a")
+
+    # Then
+    assert len(processor._pending_events()) == 2
+
+
+def test_track_exposure_event_samples_identities_consistently() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/", exposure_sample_rate=0.25
+    )
+    processors = [EventProcessor(config=config, environment_key="key") for _ in "ab"]
+    identifiers = [f"user{i}" for i in range(2000)]
+
+    # When
+    for processor in processors:
+        for identifier in identifiers:
+            processor.track_exposure_event("checkout", identifier=identifier)
+
+    # Then
+    sampled, other_sampled = (
+        [e["identifier"] for e in processor._pending_events()]
+        for processor in processors
+    )
+    assert sampled == other_sampled
+    assert 400 < len(sampled) < 600
+    assert all(
+        e["metadata"]["sample_rate"] == 0.25 for e in processors[0]._pending_events()
+    )
+
+
+def test_event_processor_rejects_invalid_exposure_sample_rate() -> None:
+    # When
+    with pytest.raises(ValueError):
+        EventProcessor(
+            config=EventProcessorConfig(exposure_sample_rate=1.5),
+            environment_key="key",
+        )
+
+
+def test_flush_interval_adapts_to_fill_rate() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/",
+        max_buffer_items=1000,
+        flush_interval_seconds=10,
+        min_flush_interval_seconds=1,
+        max_idle_flush_interval_seconds=60,
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+
+    # When
+    busy = processor._get_next_flush_interval(1000, elapsed=10, interval=10)
+    very_busy = processor._get_next_flush_interval(100000, elapsed=10, interval=10)
+    quiet = processor._get_next_flush_interval(1, elapsed=10, interval=10)
+    idle_intervals = [processor._get_next_flush_interval(0, 10, 10)]
+    for _ in range(4):
+        idle_intervals.append(
+            processor._get_next_flush_interval(0, 10, idle_intervals[-1])
+        )
+
+    # Then
+    assert busy == 5
+    assert very_busy == 1
+    assert quiet == 10
+    assert idle_intervals == [20, 40, 60, 60, 60]
+    assert processor._idle
+
+
+def test_flush_thread_flushes_when_buffer_fills() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/",
+        max_buffer_items=5,
+        flush_interval_seconds=100,
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+    sent = threading.Event()
+
+    def post(*args: object, **kwargs: object) -> Future[mock.Mock]:
+        sent.set()
+        future: Future[mock.Mock] = Future()
+        future.set_result(mock.Mock())
+        return future
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        mock_session.post.side_effect = post
+        processor.start()
+
+        # When
+        for i in range(5):
+            processor.track_event(event=f"event_{i}")
+
+        # Then
+        assert sent.wait(5)
+        processor.stop()
+
+    assert mock_session.post.call_count == 1
+    assert processor._flush_thread is not None
+    assert not processor._flush_thread.is_alive()
+
+
+def test_flush_waits_for_next_flush_when_too_many_in_flight() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/", max_in_flight_flushes=1
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+    in_flight: Future[mock.Mock] = Future()
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        mock_session.post.return_value = in_flight
+        processor.track_event(event="first")
+        processor.flush()
+
+        # When
+        processor.track_event(event="second")
+        processor.flush()
+
+        # Then
+        assert mock_session.post.call_count == 1
+        assert [e["event"] for e in processor._pending_events()] == ["second"]
+
+        in_flight.set_result(mock.Mock())
+        processor.flush()
+
+    assert mock_session.post.call_count == 2
+    assert processor._pending_events() == []
+
+
+def test_flush_too_many_in_flight__keeps_newest_max_buffer_items() -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/", max_in_flight_flushes=1, max_buffer_items=3
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+    in_flight: Future[mock.Mock] = Future()
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        mock_session.post.return_value = in_flight
+        processor.track_event(event="in-flight")
+        processor.flush()
+
+        # When
+        for i in range(5):
+            processor.track_event(event=f"event-{i}")
+            processor.flush()
+
+    # Then
+    assert [e["event"] for e in processor._pending_events()] == [
+        "event-2",
+        "event-3",
+        "event-4",
+    ]
+    assert processor._dropped_events == 2
+
+
+def test_flush_too_many_in_flight__spills_events(tmp_path: Path) -> None:
+    # Given
+    config = EventProcessorConfig(
+        events_api_url="http://test/",
+        max_in_flight_flushes=1,
+        spill_directory=str(tmp_path),
+    )
+    processor = EventProcessor(config=config, environment_key="key")
+    in_flight: Future[mock.Mock] = Future()
+
+    with mock.patch("flagsmith.analytics.AnalyticsTransport.session") as mock_session:
+        mock_session.post.return_value = in_flight
+        processor.track_event(event="in-flight")
+        processor.flush()
+
+        # When
+        processor.track_event(event="spilled")
+        processor.flush()
+
+    # Then
+    assert processor._pending_events() == []
+    assert processor._spill_queue is not None
+    spilled_events = processor._spill_queue.peek()
+    assert spilled_events is not None
+    assert [e["event"] for e in spilled_events] == ["spilled"]
@@ -10,12 +10,28 @@ from pytest_mock import MockerFixture
 from responses import matchers
 
 from flagsmith import Flagsmith, __version__
-from flagsmith.analytics import EventProcessorConfig
+from flagsmith import flagsmith as flagsmith_module
+from flagsmith.analytics import (
+    AnalyticsProcessorConfig,
+    AnalyticsTransportConfig,
+    EventProcessorConfig,
+)
 from flagsmith.api.types import EnvironmentModel
+from flagsmith.cache import (
+    EnvironmentFlagsCacheConfig,
+    IdentityFlagsCacheConfig,
+    LRUCache,
+)
 from flagsmith.exceptions import (
     FlagsmithAPIError,
+    FlagsmithCacheError,
     FlagsmithFeatureDoesNotExistError,
 )
+from flagsmith.json_codecs import StdlibJsonCodec
+from flagsmith.mappers import (
+    map_environment_document_to_context,
+    map_environment_document_to_digest,
+)
 from flagsmith.models import DefaultFlag, Flag, Flags
 from flagsmith.offline_handlers import OfflineHandler
 from flagsmith.types import SDKEvaluationContext
@@ -38,6 +54,38 @@ def test_flagsmith_starts_polling_manager_on_init_if_enabled(
     mock_polling_manager.start.assert_called_once()
 
 
+def test_flagsmith__positional_arguments__keep_their_original_order(
+    api_key: str,
+) -> None:
+    # Given
+    def default_flag_handler(feature_name: str) -> DefaultFlag:
+        return DefaultFlag(enabled=False, value=None)
+
+    proxies = {"https": "https://proxy.example.com"}
+
+    # When
+    flagsmith = Flagsmith(
+        api_key,  # environment_key
+        None,  # api_url
+        None,  # realtime_api_url
+        None,  # analytics_url
+        None,  # custom_headers
+        10,  # request_timeout_seconds
+        False,  # enable_local_evaluation
+        60,  # environment_refresh_interval_seconds
+        None,  # retries
+        False,  # enable_analytics
+        False,  # enable_events
+        None,  # event_processor_config
+        default_flag_handler,
+        proxies,
+    )
+
+    # Then
+    assert flagsmith.default_flag_handler is default_flag_handler
+    assert flagsmith.session.proxies == proxies
+
+
 @responses.activate()
 def test_update_environment_sets_environment(
     flagsmith: Flagsmith,
@@ -56,6 +104,183 @@ def test_update_environment_sets_environment(
     assert flagsmith._evaluation_context == evaluation_context
 
 
+@responses.activate()
+def test_update_environment__stdlib_json_codec__digests_values_it_decodes(
+    api_key: str,
+    environment_json: str,
+) -> None:
+    # Given
+    flagsmith = Flagsmith(environment_key=api_key, json_codec=StdlibJsonCodec())
+    environment = json.loads(environment_json)
+    # Integers over 64 bits, which some JSON libraries cannot encode.
+    environment["feature_states"][0]["feature_state_value"] = 2**70
+    responses.add(
+        method="GET", url=flagsmith.environment_url, body=json.dumps(environment)
+    )
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert flagsmith._evaluation_context is not None
+    assert flagsmith._mapped_environment_document == (
+        map_environment_document_to_digest(environment, StdlibJsonCodec()),
+        flagsmith._evaluation_context,
+    )
+
+
+@responses.activate()
+def test_update_environment__not_modified__skips_remap(
+    flagsmith: Flagsmith,
+    environment_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    etag = '"some-etag"'
+    last_modified = "Fri, 14 Jul 2023 16:12:00 GMT"
+    responses.add(
+        method="GET",
+        url=flagsmith.environment_url,
+        body=environment_json,
+        headers={"ETag": etag, "Last-Modified": last_modified},
+    )
+    responses.add(
+        method="GET",
+        url=flagsmith.environment_url,
+        status=304,
+        match=[
+            matchers.header_matcher(
+                {"If-None-Match": etag, "If-Modified-Since": last_modified}
+            )
+        ],
+    )
+    flagsmith.update_environment()
+    evaluation_context = flagsmith._evaluation_context
+    map_environment_document_to_context_spy = mocker.spy(
+        flagsmith_module, "map_environment_document_to_context"
+    )
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert len(responses.calls) == 2
+    map_environment_document_to_context_spy.assert_not_called()
+    assert flagsmith._evaluation_context is evaluation_context
+
+
+@responses.activate()
+def test_update_environment__same_updated_at__skips_remap(
+    flagsmith: Flagsmith,
+    environment_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    responses.add(method="GET", url=flagsmith.environment_url, body=environment_json)
+    flagsmith.update_environment()
+    evaluation_context = flagsmith._evaluation_context
+    map_environment_document_to_context_spy = mocker.spy(
+        flagsmith_module, "map_environment_document_to_context"
+    )
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert len(responses.calls) == 2
+    map_environment_document_to_context_spy.assert_not_called()
+    assert flagsmith._evaluation_context is evaluation_context
+
+
+@responses.activate()
+def test_update_environment__newer_updated_at__remaps(
+    flagsmith: Flagsmith,
+    environment: EnvironmentModel,
+) -> None:
+    # Given
+    responses.add(method="GET", url=flagsmith.environment_url, json=environment)
+    flagsmith.update_environment()
+
+    environment["updated_at"] = "2023-07-14T16:13:00.000000Z"
+    environment["feature_states"][0]["feature_state_value"] = "some-new-value"
+    responses.replace(responses.GET, flagsmith.environment_url, json=environment)
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert flagsmith._evaluation_context is not None
+    assert (
+        flagsmith._evaluation_context["features"]["some_feature"]["value"]
+        == "some-new-value"
+    )
+
+
+@responses.activate()
+def test_update_environment__changed_feature__patches_previous_context(
+    flagsmith: Flagsmith,
+    environment: EnvironmentModel,
+) -> None:
+    # Given
+    flagsmith.enable_compiled_segments = True
+    responses.add(method="GET", url=flagsmith.environment_url, json=environment)
+    flagsmith.update_environment()
+    previous_context = flagsmith._evaluation_context
+    previous_compiled_segments = flagsmith._compiled_segments
+    previous_identity_overrides_index = flagsmith._identity_overrides_index
+
+    environment["updated_at"] = "2023-07-14T16:13:00.000000Z"
+    environment["feature_states"][0]["feature_state_value"] = "some-new-value"
+    responses.replace(responses.GET, flagsmith.environment_url, json=environment)
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert previous_context is not None
+    assert previous_compiled_segments is not None
+    assert flagsmith._evaluation_context == map_environment_document_to_context(
+        environment
+    )
+    assert flagsmith._evaluation_context["segments"] == previous_context["segments"]
+    # Only a digest of the document is kept to compare the next one with.
+    assert flagsmith._mapped_environment_document == (
+        map_environment_document_to_digest(environment),
+        flagsmith._evaluation_context,
+    )
+    assert flagsmith._identity_overrides_index is previous_identity_overrides_index
+    assert flagsmith._compiled_segments is not None
+    assert [matches for _, matches in flagsmith._compiled_segments.segments] == [
+        matches for _, matches in previous_compiled_segments.segments
+    ]
+    for identifier, expected_value in [
+        ("identifier", "some-new-value"),
+        ("overridden-id", "some-overridden-value"),
+    ]:
+        flags = flagsmith._get_identity_flags_from_document(identifier, {})
+        assert flags.get_feature_value("some_feature") == expected_value
+
+
+@responses.activate()
+def test_update_environment__invalid_document__does_not_store_validators(
+    flagsmith: Flagsmith,
+) -> None:
+    # Given
+    responses.add(
+        method="GET",
+        url=flagsmith.environment_url,
+        json={"invalid": "document"},
+        headers={"ETag": '"some-etag"'},
+    )
+
+    # When
+    flagsmith.update_environment()
+
+    # Then
+    assert flagsmith._evaluation_context is None
+    assert flagsmith._environment_document_validators == {}
+
+
 @responses.activate()
 def test_get_environment_flags_calls_api_when_no_local_environment(
     api_key: str, flagsmith: Flagsmith, flags_json: str
@@ -131,6 +356,66 @@ def test_get_environment_flags_omits_segments_from_evaluation_context(
     mock_get_evaluation_result.assert_called_once_with(context=context_without_segments)
 
 
+def test_get_environment_flags__local_evaluation__evaluates_once_per_context(
+    mocker: MockerFixture,
+    local_eval_flagsmith: Flagsmith,
+    evaluation_context: SDKEvaluationContext,
+) -> None:
+    # Given
+    get_evaluation_result = mocker.spy(engine, "get_evaluation_result")
+
+    # When
+    first_flags = local_eval_flagsmith.get_environment_flags()
+    second_flags = local_eval_flagsmith.get_environment_flags()
+
+    # Then
+    get_evaluation_result.assert_called_once()
+    assert first_flags is not second_flags
+    assert second_flags.get_flag("some_feature").value == "some-value"
+
+    # When
+    local_eval_flagsmith._evaluation_context = {
+        **evaluation_context,
+        "features": {
+            "some_feature": {
+                **evaluation_context["features"]["some_feature"],
+                "value": "other-value",
+            }
+        },
+    }
+    refreshed_flags = local_eval_flagsmith.get_environment_flags()
+
+    # Then
+    assert get_evaluation_result.call_count == 2
+    assert refreshed_flags.get_flag("some_feature").value == "other-value"
+    assert first_flags.get_flag("some_feature").value == "some-value"
+
+
+def test_get_environment_flags__local_evaluation__isolates_mutations_between_calls(
+    mocker: MockerFixture,
+    local_eval_flagsmith: Flagsmith,
+) -> None:
+    # Given
+    get_evaluation_result = mocker.spy(engine, "get_evaluation_result")
+    flag_from_evaluation_result = mocker.spy(Flag, "from_evaluation_result")
+    flags = local_eval_flagsmith.get_environment_flags()
+    flags.get_flag("some_feature").enabled = False
+    flags.get_flag("some_feature").value = "mutated-value"
+
+    # When
+    environment_flags = local_eval_flagsmith.get_environment_flags()
+
+    # Then
+    get_evaluation_result.assert_called_once()
+    flag_from_evaluation_result.assert_called_once()
+    some_feature = environment_flags.get_flag("some_feature")
+    assert some_feature is not flags.get_flag("some_feature")
+    assert some_feature.enabled is True
+    assert some_feature.value == "some-value"
+    assert environment_flags.all_flags() == [some_feature]
+    assert flag_from_evaluation_result.call_count == 2
+
+
 @responses.activate()
 def test_get_identity_flags_calls_api_when_no_local_environment_no_traits(
     flagsmith: Flagsmith, identities_json: str
@@ -143,11 +428,8 @@ def test_get_identity_flags_calls_api_when_no_local_environment_no_traits(
     identity_flags = flagsmith.get_identity_flags(identifier=identifier).all_flags()
 
     # Then
-    body = responses.calls[0].request.body
-    if isinstance(body, bytes):
-        # Decode 'body' from bytes to string if it is in bytes format.
-        body = body.decode()
-    assert body == json.dumps({"identifier": identifier, "traits": []})
+    body = typing.cast(bytes, responses.calls[0].request.body)
+    assert json.loads(body) == {"identifier": identifier, "traits": []}
 
     # Taken from hard coded values in tests/data/identities.json
     assert identity_flags[0].enabled is True
@@ -168,16 +450,11 @@ def test_get_identity_flags_calls_api_when_no_local_environment_with_traits(
     identity_flags = flagsmith.get_identity_flags(identifier=identifier, traits=traits)
 
     # Then
-    body = responses.calls[0].request.body
-    if isinstance(body, bytes):
-        # Decode 'body' from bytes to string if it is in bytes format.
-        body = body.decode()
-    assert body == json.dumps(
-        {
-            "identifier": identifier,
-            "traits": [{"trait_key": k, "trait_value": v} for k, v in traits.items()],
-        }
-    )
+    body = typing.cast(bytes, responses.calls[0].request.body)
+    assert json.loads(body) == {
+        "identifier": identifier,
+        "traits": [{"trait_key": k, "trait_value": v} for k, v in traits.items()],
+    }
 
     # Taken from hard coded values in tests/data/identities.json
     assert identity_flags.all_flags()[0].enabled is True
@@ -417,6 +694,7 @@ def test_request_times_out_according_to_setting(
 ) -> None:
     # Given
     session = mocker.patch("flagsmith.flagsmith.requests.Session").return_value
+    session.get.return_value.content = b"[]"
     flagsmith = Flagsmith(
         environment_key=api_key,
         enable_local_evaluation=False,
@@ -429,7 +707,6 @@ def test_request_times_out_according_to_setting(
     # Then
     session.get.assert_called_once_with(
         "https://edge.api.flagsmith.com/api/v1/flags/",
-        json=None,
         timeout=expected_timeout,
     )
 
@@ -588,6 +865,293 @@ def test_default_flags_are_used_if_api_error_and_default_flag_handler_given(
     assert flags.get_flag("some-feature") == default_flag
 
 
+def test_get_identity_flags_batch__local_evaluation__returns_flags_in_order(
+    local_eval_flagsmith: Flagsmith,
+) -> None:
+    # When
+    flags = local_eval_flagsmith.get_identity_flags_batch(
+        [("overridden-id", None), ("identifier", {"foo": "bar"})]
+    )
+
+    # Then
+    assert [f.get_feature_value("some_feature") for f in flags] == [
+        "some-overridden-value",
+        "some-value",
+    ]
+
+
+@responses.activate()
+def test_get_identity_flags_batch__remote_evaluation__calls_api_per_identity(
+    flagsmith: Flagsmith,
+    identities_json: str,
+) -> None:
+    # Given
+    responses.add(method="POST", url=flagsmith.identities_url, body=identities_json)
+    identities = [(f"identifier-{i}", {"some_trait": i}) for i in range(5)]
+
+    # When
+    flags = flagsmith.get_identity_flags_batch(identities, transient=True)
+
+    # Then
+    assert len(flags) == 5
+    assert all(f.get_feature_value("some_feature") == "some-value" for f in flags)
+    request_bodies = [json.loads(call.request.body) for call in responses.calls]  # type: ignore[arg-type]
+    assert sorted(body["identifier"] for body in request_bodies) == [
+        identifier for identifier, _ in identities
+    ]
+    assert all(body["transient"] is True for body in request_bodies)
+
+
+def test_compiled_segments__local_evaluation__matches_interpreted(
+    requests_session_response_ok: None,
+    local_eval_flagsmith: Flagsmith,
+    server_api_key: str,
+) -> None:
+    # Given
+    flagsmith = Flagsmith(
+        environment_key=server_api_key,
+        enable_local_evaluation=True,
+        enable_compiled_segments=True,
+    )
+    identities = [("overridden-id", {}), ("identifier", {"foo": "bar"})]
+
+    # When
+    compiled_flags = [
+        flagsmith.get_identity_flags(identifier, traits).all_flags()
+        for identifier, traits in identities
+    ]
+    compiled_segments = [
+        flagsmith.get_identity_segments(identifier, traits)
+        for identifier, traits in identities
+    ]
+
+    # Then
+    assert flagsmith._compiled_segments is not None
+    assert local_eval_flagsmith._compiled_segments is None
+    assert compiled_flags == [
+        local_eval_flagsmith.get_identity_flags(identifier, traits).all_flags()
+        for identifier, traits in identities
+    ]
+    assert compiled_segments == [
+        local_eval_flagsmith.get_identity_segments(identifier, traits)
+        for identifier, traits in identities
+    ]
+    assert compiled_flags[0][0].value == "some-overridden-value"
+    assert [segment.name for segment in compiled_segments[1]] == ["Test segment"]
+
+
+@responses.activate()
+def test_get_environment_flags__environment_flags_cache__reuses_flags_within_ttl(
+    api_key: str,
+    flags_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    monotonic = mocker.patch("flagsmith.flagsmith.time.monotonic", return_value=0.0)
+    flagsmith = Flagsmith(
+        environment_key=api_key,
+        environment_flags_cache_config=EnvironmentFlagsCacheConfig(ttl_seconds=10),
+    )
+    responses.add(method="GET", url=flagsmith.environment_flags_url, body=flags_json)
+
+    # When
+    flags = flagsmith.get_environment_flags()
+    monotonic.return_value = 9.0
+    cached_flags = flagsmith.get_environment_flags()
+    monotonic.return_value = 10.0
+    new_flags = flagsmith.get_environment_flags()
+
+    # Then
+    assert cached_flags is flags
+    assert new_flags is not flags
+    assert len(responses.calls) == 2
+
+
+@responses.activate()
+def test_get_environment_flags__environment_flags_cache__revalidates_stale_flags(
+    api_key: str,
+    flags_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    monotonic = mocker.patch("flagsmith.flagsmith.time.monotonic", return_value=0.0)
+    flagsmith = Flagsmith(
+        environment_key=api_key,
+        environment_flags_cache_config=EnvironmentFlagsCacheConfig(
+            ttl_seconds=10, stale_while_revalidate_seconds=5
+        ),
+    )
+    responses.add(method="GET", url=flagsmith.environment_flags_url, body=flags_json)
+    flags = flagsmith.get_environment_flags()
+
+    # When
+    monotonic.return_value = 12.0
+    stale_flags = flagsmith.get_environment_flags()
+    # Wait for the background refresh to finish.
+    assert flagsmith._environment_flags_revalidation_lock.acquire(timeout=5)
+    flagsmith._environment_flags_revalidation_lock.release()
+    refreshed_flags = flagsmith.get_environment_flags()
+
+    # Then
+    assert stale_flags is flags
+    assert refreshed_flags is not flags
+    assert len(responses.calls) == 2
+
+
+@responses.activate()
+def test_get_environment_flags__environment_flags_cache__does_not_cache_defaults(
+    api_key: str,
+) -> None:
+    # Given
+    flagsmith = Flagsmith(
+        environment_key=api_key,
+        environment_flags_cache_config=EnvironmentFlagsCacheConfig(ttl_seconds=10),
+        default_flag_handler=lambda feature_name: DefaultFlag(
+            enabled=False, value=None
+        ),
+    )
+    responses.add(method="GET", url=flagsmith.environment_flags_url, status=500)
+
+    # When
+    flagsmith.get_environment_flags()
+    flagsmith.get_environment_flags()
+
+    # Then
+    assert flagsmith._cached_environment_flags is None
+    assert len(responses.calls) == 2
+
+
+def test_get_identity_flags__identity_flags_cache__returns_cached_flags(
+    requests_session_response_ok: None,
+    server_api_key: str,
+) -> None:
+    # Given
+    cache: LRUCache[typing.Any, Flags] = LRUCache(max_size=10)
+    flagsmith = Flagsmith(
+        environment_key=server_api_key,
+        enable_local_evaluation=True,
+        identity_flags_cache=cache,
+    )
+
+    # When
+    flags = flagsmith.get_identity_flags("identifier", {"some_trait": 1})
+    same_flags = flagsmith.get_identity_flags("identifier", {"some_trait": 1})
+    other_flags = flagsmith.get_identity_flags("identifier", {"some_trait": True})
+
+    # Then
+    assert same_flags is flags
+    assert other_flags is not flags
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_get_identity_flags__identity_flags_cache__cleared_on_environment_change(
+    requests_session_response_ok: None,
+    server_api_key: str,
+    evaluation_context: SDKEvaluationContext,
+) -> None:
+    # Given
+    cache: LRUCache[typing.Any, Flags] = LRUCache(max_size=10)
+    flagsmith = Flagsmith(
+        environment_key=server_api_key,
+        enable_local_evaluation=True,
+        identity_flags_cache=cache,
+    )
+    flags = flagsmith.get_identity_flags("identifier")
+
+    # When
+    flagsmith._evaluation_context = evaluation_context
+    new_flags = flagsmith.get_identity_flags("identifier")
+
+    # Then
+    assert new_flags is not flags
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+@responses.activate()
+def test_get_identity_flags__remote_identity_flags_cache__shares_flags_between_clients(
+    api_key: str,
+    identities_json: str,
+) -> None:
+    # Given
+    backend: LRUCache[str, bytes] = LRUCache()
+    config = IdentityFlagsCacheConfig(backend=backend, ttl_seconds=30)
+    flagsmith = Flagsmith(
+        environment_key=api_key, remote_identity_flags_cache_config=config
+    )
+    other_flagsmith = Flagsmith(
+        environment_key=api_key, remote_identity_flags_cache_config=config
+    )
+    responses.add(method="POST", url=flagsmith.identities_url, body=identities_json)
+
+    # When
+    flags = flagsmith.get_identity_flags("identifier", {"some_trait": 1})
+    cached_flags = other_flagsmith.get_identity_flags("identifier", {"some_trait": 1})
+    other_flags = flagsmith.get_identity_flags("identifier", {"some_trait": 2})
+
+    # Then
+    assert cached_flags.all_flags() == flags.all_flags()
+    assert other_flags.all_flags() == flags.all_flags()
+    assert len(responses.calls) == 2
+    assert len(backend) == 2
+
+
+@responses.activate()
+def test_get_identity_flags__remote_identity_flags_cache__unavailable__calls_api(
+    api_key: str,
+    identities_json: str,
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    backend = mocker.Mock()
+    backend.get.side_effect = backend.set.side_effect = FlagsmithCacheError()
+    flagsmith = Flagsmith(
+        environment_key=api_key,
+        remote_identity_flags_cache_config=IdentityFlagsCacheConfig(backend=backend),
+    )
+    responses.add(method="POST", url=flagsmith.identities_url, body=identities_json)
+
+    # When
+    flags = flagsmith.get_identity_flags("identifier")
+
+    # Then
+    assert flags.get_feature_value("some_feature") == "some-value"
+    backend.set.assert_called_once()
+    assert len(responses.calls) == 1
+
+
+def test_flagsmith__analytics_processor_config_without_analytics__raises(
+    api_key: str,
+) -> None:
+    # When
+    with pytest.raises(ValueError):
+        Flagsmith(
+            environment_key=api_key,
+            analytics_processor_config=AnalyticsProcessorConfig(),
+        )
+
+
+def test_flagsmith__analytics_and_events__share_client_transport(
+    api_key: str,
+) -> None:
+    # When
+    flagsmith = Flagsmith(
+        environment_key=api_key,
+        enable_analytics=True,
+        enable_events=True,
+        analytics_transport_config=AnalyticsTransportConfig(max_workers=2),
+    )
+    other_flagsmith = Flagsmith(environment_key=api_key, enable_analytics=True)
+
+    # Then
+    assert flagsmith._analytics_processor is not None
+    assert flagsmith._event_processor is not None
+    assert other_flagsmith._analytics_processor is not None
+    transport = flagsmith._analytics_processor.transport
+    assert transport is flagsmith._event_processor.transport
+    assert transport is not other_flagsmith._analytics_processor.transport
+    assert transport.config.max_workers == 2
+
+
 def test_get_identity_segments_no_traits(
     local_eval_flagsmith: Flagsmith,
 ) -> None:
@@ -852,6 +1416,41 @@ def test_flagsmith_client_get_identity_flags__local_evaluation__returns_expected
     assert flag.value == "some-overridden-value"
 
 
+@responses.activate()
+def test_flagsmith__stream_environment_document__evaluates_streamed_environment(
+    environment_json: str,
+    server_api_key: str,
+) -> None:
+    # Given
+    api_url = "https://mocked.flagsmith.com/api/v1/"
+    environment_document_url = f"{api_url}environment-document/"
+    responses.add(
+        method="GET",
+        url=environment_document_url,
+        body=environment_json,
+        headers={"ETag": '"v1"'},
+    )
+    responses.add(method="GET", url=environment_document_url, status=304)
+
+    # When
+    flagsmith = Flagsmith(
+        environment_key=server_api_key,
+        api_url=api_url,
+        enable_local_evaluation=True,
+        environment_refresh_interval_seconds=60,
+        stream_environment_document=True,
+    )
+    flagsmith.update_environment()
+
+    # Then
+    assert flagsmith._evaluation_context == map_environment_document_to_context(
+        json.loads(environment_json)
+    )
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    flag = flagsmith.get_identity_flags("overridden-id").get_flag("some_feature")
+    assert flag.value == "some-overridden-value"
+
+
 def test_custom_feature_error_raised_when_invalid_feature(
     requests_session_response_ok: None, server_api_key: str
 ) -> None:
@@ -1191,7 +1790,6 @@ def test_flagsmith_posts_analytics_to_analytics_url_when_set(
     api_key: str, flags_json: str, mocker: MockerFixture
 ) -> None:
     # Given
-    mocker.patch("flagsmith.analytics.session", requests.Session())
     flagsmith = Flagsmith(
         environment_key=api_key,
         api_url="http://edge-proxy.internal/api/v1/",
@@ -1208,6 +1806,7 @@ def test_flagsmith_posts_analytics_to_analytics_url_when_set(
     assert flags.is_feature_enabled("some_feature") is True
     assert flagsmith._analytics_processor is not None
     flagsmith._analytics_processor.flush()
+    flagsmith._analytics_transport.close()
 
     # Then
     analytics_posts = [
@@ -1234,7 +1833,6 @@ def test_flagsmith_posts_analytics_to_api_url_when_analytics_url_unset(
     api_key: str, flags_json: str, mocker: MockerFixture
 ) -> None:
     # Given
-    mocker.patch("flagsmith.analytics.session", requests.Session())
     flagsmith = Flagsmith(
         environment_key=api_key,
         api_url="http://core-api.flagsmith.com/api/v1/",
@@ -1250,6 +1848,7 @@ def test_flagsmith_posts_analytics_to_api_url_when_analytics_url_unset(
     assert flags.is_feature_enabled("some_feature") is True
     assert flagsmith._analytics_processor is not None
     flagsmith._analytics_processor.flush()
+    flagsmith._analytics_transport.close()
 
     # Then
     analytics_posts = [
@@ -0,0 +1,98 @@
+import typing
+
+import pytest
+import responses
+from pytest_mock import MockerFixture
+
+from flagsmith import Flagsmith
+from flagsmith.json_codecs import (
+    JsonCodec,
+    MsgspecJsonCodec,
+    OrjsonCodec,
+    StdlibJsonCodec,
+    get_default_json_codec,
+)
+
+
+@pytest.mark.parametrize(
+    "codec_class, module_name",
+    [
+        (StdlibJsonCodec, None),
+        (OrjsonCodec, "orjson"),
+        (MsgspecJsonCodec, "msgspec"),
+    ],
+)
+def test_json_codec__round_trips_documents(
+    codec_class: typing.Callable[[], JsonCodec],
+    module_name: typing.Optional[str],
+) -> None:
+    # Given
+    if module_name:
+        pytest.importorskip(module_name)
+    codec = codec_class()
+    document = {"name": "café", "values": [1, 2.5, True, None], "nested": {}}
+
+    # When
+    data = codec.dumps(document)
+
+    # Then
+    assert isinstance(data, bytes)
+    assert codec.loads(data) == document
+    assert codec.loads(data.decode()) == document
+
+
+def test_json_codec__invalid_json__raises_value_error() -> None:
+    # When
+    with pytest.raises(ValueError):
+        get_default_json_codec().loads(b"{")
+
+
+def test_get_default_json_codec__prefers_installed_orjson() -> None:
+    # Given
+    pytest.importorskip("orjson")
+
+    # When
+    codec = get_default_json_codec()
+
+    # Then
+    assert isinstance(codec, OrjsonCodec)
+    assert get_default_json_codec() is codec
+
+
+def test_get_default_json_codec__no_fast_library__falls_back_to_stdlib(
+    mocker: MockerFixture,
+) -> None:
+    # Given
+    mocker.patch.dict("sys.modules", {"orjson": None, "msgspec": None})
+    get_default_json_codec.cache_clear()
+
+    # When
+    try:
+        codec = get_default_json_codec()
+    finally:
+        get_default_json_codec.cache_clear()
+
+    # Then
+    assert isinstance(codec, StdlibJsonCodec)
+
+
+@responses.activate()
+def test_flagsmith__json_codec__used_for_api_requests(
+    mocker: MockerFixture,
+    api_key: str,
+    identities_json: str,
+) -> None:
+    # Given
+    codec = StdlibJsonCodec()
+    dumps = mocker.spy(codec, "dumps")
+    loads = mocker.spy(codec, "loads")
+    flagsmith = Flagsmith(environment_key=api_key, json_codec=codec)
+    responses.add(method="POST", url=flagsmith.identities_url, body=identities_json)
+
+    # When
+    flags = flagsmith.get_identity_flags("identifier", traits={"some_trait": 1})
+
+    # Then
+    dumps.assert_called_once()
+    loads.assert_called_once()
+    assert flags.get_flag("some_feature").value == "some-value"
@@ -0,0 +1,32 @@
+import json
+import typing
+
+import pytest
+
+from flagsmith.utils.json_stream import load_streamed
+
+
+def test_load_streamed__split_at_every_offset__parses_numbers() -> None:
+    # Given
+    data = b'{"a": 1.5, "b": [1e3, -2.25E-2, 10, 0.5e+1], "c": -7}'
+    expected = json.loads(data)
+
+    for offset in range(len(data) + 1):
+        streamed: typing.List[typing.Any] = []
+
+        # When
+        document = load_streamed(
+            [data[:offset], data[offset:]],
+            {("b",): streamed.append},
+        )
+
+        # Then
+        assert streamed == expected["b"], offset
+        assert document == {"a": expected["a"], "c": expected["c"]}, offset
+
+
+@pytest.mark.parametrize("data", [b'{"a": 1.}', b'{"a": 1e}', b'{"a": -}'])
+def test_load_streamed__incomplete_number__raises(data: bytes) -> None:
+    # When
+    with pytest.raises(ValueError):
+        load_streamed([data[:-1], data[-1:]], {("a",): lambda value: None})
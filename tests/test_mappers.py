@@ -1,5 +1,19 @@
+import functools
+import io
+import json
+from datetime import datetime
+
+import pytest
+from flag_engine.segments.evaluator import get_enriched_context
+
 from flagsmith.api.types import EnvironmentModel
-from flagsmith.mappers import map_environment_document_to_context
+from flagsmith.mappers import (
+    map_context_and_identity_data_to_context,
+    map_environment_document_to_context,
+    map_environment_document_to_digest,
+    map_environment_document_to_environment_updated_at,
+    map_streamed_environment_document_to_context,
+)
 
 
 def _environment_with_keyed_variant() -> EnvironmentModel:
@@ -55,3 +69,206 @@ def test_map_environment_document_to_context__null_variant_key__drops_key() -> N
     # Then - the null key is dropped, treated as no key
     variants = context["features"]["mv_feature"]["variants"]
     assert "key" not in variants[0]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_map_streamed_environment_document_to_context__matches_loaded_document(
+    environment_json: str,
+    chunk_size: int,
+) -> None:
+    # Given
+    environment: EnvironmentModel = json.loads(environment_json)
+    data = json.dumps(environment, indent=2, ensure_ascii=False).encode()
+    chunks = iter(functools.partial(io.BytesIO(data).read, chunk_size), b"")
+
+    # When
+    mapped = map_streamed_environment_document_to_context(chunks)
+
+    # Then
+    assert mapped is not None
+    context, updated_at = mapped
+    assert context == map_environment_document_to_context(environment)
+    assert updated_at == map_environment_document_to_environment_updated_at(environment)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"[]", b'{"api_key": "key"', b'{"api_key": "key",}'],
+)
+def test_map_streamed_environment_document_to_context__invalid_json__raises(
+    data: bytes,
+) -> None:
+    # When
+    with pytest.raises(ValueError):
+        map_streamed_environment_document_to_context([data])
+
+
+def test_map_streamed_environment_document_to_context__up_to_date__stops_parsing(
+    environment_json: str,
+) -> None:
+    # Given
+    environment: EnvironmentModel = json.loads(environment_json)
+    updated_at = map_environment_document_to_environment_updated_at(environment)
+    # Anything after `updated_at` is never parsed.
+    data = json.dumps({"updated_at": environment["updated_at"]})[:-1]
+    data += ', "feature_states": ['
+    seen_updated_at = []
+
+    def is_up_to_date(document_updated_at: datetime) -> bool:
+        seen_updated_at.append(document_updated_at)
+        return True
+
+    # When
+    mapped = map_streamed_environment_document_to_context(
+        [data.encode()], is_up_to_date=is_up_to_date
+    )
+
+    # Then
+    assert mapped is None
+    assert seen_updated_at == [updated_at]
+
+
+def test_map_environment_document_to_context__previous__reuses_unchanged_contexts(
+    environment_json: str,
+) -> None:
+    # Given
+    previous_environment: EnvironmentModel = json.loads(environment_json)
+    previous_context = map_environment_document_to_context(previous_environment)
+    environment: EnvironmentModel = json.loads(environment_json)
+    environment["feature_states"][0]["enabled"] = False
+    environment["feature_states"].append(
+        {**environment["feature_states"][0], "feature": {"id": 2, "name": "new"}}
+    )
+
+    # When
+    context = map_environment_document_to_context(
+        environment,
+        previous=(
+            map_environment_document_to_digest(previous_environment),
+            previous_context,
+        ),
+    )
+
+    # Then
+    assert context == map_environment_document_to_context(environment)
+    assert previous_context["segments"] and context["segments"]
+    assert context["features"]["some_feature"]["enabled"] is False
+    assert context["segments"].keys() == previous_context["segments"].keys()
+    for segment_key, segment_context in context["segments"].items():
+        assert segment_context is previous_context["segments"][segment_key]
+
+
+def test_map_environment_document_to_context__previous__remaps_changed_segments(
+    environment_json: str,
+) -> None:
+    # Given
+    previous_environment: EnvironmentModel = json.loads(environment_json)
+    previous_context = map_environment_document_to_context(previous_environment)
+    environment: EnvironmentModel = json.loads(environment_json)
+    environment["project"]["segments"][0]["name"] = "Renamed segment"
+    environment["identity_overrides"][0]["identifier"] = "other-id"
+
+    # When
+    context = map_environment_document_to_context(
+        environment,
+        previous=(
+            map_environment_document_to_digest(previous_environment),
+            previous_context,
+        ),
+    )
+
+    # Then
+    assert context == map_environment_document_to_context(environment)
+    assert previous_context["features"] and context["features"]
+    assert context["features"]["some_feature"] is (
+        previous_context["features"]["some_feature"]
+    )
+    assert previous_context["segments"] and context["segments"]
+    assert context["segments"]["1"]["name"] == "Renamed segment"
+    assert not set(map(id, context["segments"].values())) & set(
+        map(id, previous_context["segments"].values())
+    )
+
+
+def test_map_environment_document_to_context__previous__shares_unchanged_parts(
+    environment_json: str,
+) -> None:
+    # Given
+    previous_environment: EnvironmentModel = json.loads(environment_json)
+    previous_context = map_environment_document_to_context(previous_environment)
+    environment: EnvironmentModel = json.loads(environment_json)
+    environment["project"]["segments"][0]["name"] = "Renamed segment"
+    environment["identity_overrides"].append(
+        {
+            **environment["identity_overrides"][0],
+            "identifier": "other-id",
+            "identity_features": [],
+        }
+    )
+
+    # When
+    context = map_environment_document_to_context(
+        environment,
+        previous=(
+            map_environment_document_to_digest(previous_environment),
+            previous_context,
+        ),
+    )
+
+    # Then
+    assert context == map_environment_document_to_context(environment)
+    assert previous_context["segments"] and context["segments"]
+    segment_context = context["segments"]["1"]
+    previous_segment_context = previous_context["segments"]["1"]
+    assert segment_context is not previous_segment_context
+    assert segment_context["rules"][0] is previous_segment_context["rules"][0]
+    identity_override_keys = context["segments"].keys() - {"1"}
+    assert identity_override_keys
+    for segment_key in identity_override_keys:
+        assert context["segments"][segment_key] is (
+            previous_context["segments"][segment_key]
+        )
+
+
+def test_map_environment_document_to_context__interns_repeated_strings(
+    environment_json: str,
+) -> None:
+    # Given
+    environment: EnvironmentModel = json.loads(environment_json)
+    other_environment: EnvironmentModel = json.loads(environment_json)
+
+    # When
+    context = map_environment_document_to_context(environment)
+    other_context = map_environment_document_to_context(other_environment)
+
+    # Then
+    assert context["segments"] and other_context["segments"]
+    assert (rules := context["segments"]["1"]["rules"][0].get("rules"))
+    assert (other_rules := other_context["segments"]["1"]["rules"][0].get("rules"))
+    assert rules[0] is not other_rules[0]
+    assert rules[0]["type"] is other_rules[0]["type"]
+    assert (conditions := rules[0].get("conditions"))
+    assert (other_conditions := other_rules[0].get("conditions"))
+    assert conditions[0]["operator"] is other_conditions[0]["operator"]
+    assert conditions[0]["property"] is other_conditions[0]["property"]
+    assert next(iter(context["features"])) is next(iter(other_context["features"]))
+
+
+def test_map_context_and_identity_data_to_context__sets_engine_identity_key(
+    environment_json: str,
+) -> None:
+    # Given
+    context = map_environment_document_to_context(json.loads(environment_json))
+
+    # When
+    identity_context = map_context_and_identity_data_to_context(
+        context, "identifier", {"foo": {"value": "bar", "transient": True}}
+    )
+
+    # Then
+    assert get_enriched_context(identity_context) is identity_context
+    assert identity_context["identity"] == {
+        "identifier": "identifier",
+        "key": "B62qaMZNwfiqT76p38ggrQ_identifier",
+        "traits": {"foo": "bar"},
+    }
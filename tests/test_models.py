@@ -1,17 +1,34 @@
+import copy
+import dataclasses
+import json
+import tracemalloc
 import typing
 
 import pytest
+from flag_engine import engine
+from flag_engine.context.types import SegmentContext
 
+from flagsmith.api.types import EnvironmentModel
+from flagsmith.mappers import (
+    map_context_and_identity_data_to_context,
+    map_environment_document_to_context,
+)
 from flagsmith.models import (
     DefaultFlag,
     Flag,
     Flags,
+    build_identity_overrides_index,
     build_segment_overrides_index,
+    get_identity_overrides,
+    update_identity_overrides_index,
+    update_segment_overrides_index,
 )
 from flagsmith.types import (
+    FeatureMetadata,
     SDKEvaluationContext,
     SDKEvaluationResult,
     SDKFlagResult,
+    SegmentMetadata,
 )
 
 
@@ -141,6 +158,55 @@ def test_flags_from_evaluation_result(
     )
 
 
+@pytest.mark.parametrize(
+    "instance",
+    [
+        Flag(enabled=True, value="value", feature_id=1, feature_name="feature"),
+        DefaultFlag(enabled=True, value="value"),
+        Flags(),
+    ],
+)
+def test_flag_models__are_slotted(instance: object) -> None:
+    # Then
+    assert not hasattr(instance, "__dict__")
+
+
+def test_flag__allocates_less_than_unslotted_equivalent() -> None:
+    # Given
+    unslotted_flag_class = dataclasses.make_dataclass(
+        "UnslottedFlag",
+        [(field.name, field.type) for field in dataclasses.fields(Flag)],
+    )
+
+    def measure_allocation(flag_class: typing.Callable[..., object]) -> int:
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            flags = [
+                flag_class(
+                    enabled=True,
+                    value=i,
+                    feature_id=i,
+                    feature_name="feature",
+                    variant=None,
+                    is_default=False,
+                )
+                for i in range(1000)
+            ]
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert len(flags) == 1000
+        return after - before
+
+    # When
+    allocated = measure_allocation(Flag)
+    unslotted_allocated = measure_allocation(unslotted_flag_class)
+
+    # Then
+    assert allocated < unslotted_allocated
+
+
 @pytest.mark.parametrize(
     "value,expected",
     [
@@ -427,6 +493,54 @@ def test_lazy_flags__missing_feature__falls_through_to_default_handler(
     assert result.value == "default-for-does_not_exist"
 
 
+def test_lazy_flags__get_flag__identity_context__allocates_less_than_unkeyed(
+    environment_json: str,
+) -> None:
+    # Given
+    context = map_environment_document_to_context(json.loads(environment_json))
+    identity_context = map_context_and_identity_data_to_context(
+        context, "identifier", {"foo": "bar"}
+    )
+    # Without a key, the engine copies the context to derive it per flag.
+    unkeyed_context: SDKEvaluationContext = {
+        **identity_context,
+        "identity": {
+            "identifier": "identifier",
+            "traits": {"foo": "bar"},
+        },
+    }
+
+    def measure_get_flag(context: SDKEvaluationContext) -> typing.Tuple[Flag, int]:
+        def get_flags() -> Flags:
+            return Flags.from_evaluation_context(
+                context=context,
+                overrides_index=build_segment_overrides_index(context),
+                analytics_processor=None,
+                default_flag_handler=None,
+            )
+
+        # Warm up caches filled on first evaluation, e.g. compiled JSONPaths.
+        get_flags().get_flag("some_feature")
+        flags = get_flags()
+        tracemalloc.start()
+        try:
+            allocated, _ = tracemalloc.get_traced_memory()
+            flag = flags.get_flag("some_feature")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert isinstance(flag, Flag)
+        return flag, peak - allocated
+
+    # When
+    flag, peak = measure_get_flag(identity_context)
+    unkeyed_flag, unkeyed_peak = measure_get_flag(unkeyed_context)
+
+    # Then
+    assert flag == unkeyed_flag
+    assert peak < unkeyed_peak
+
+
 def test_build_segment_overrides_index__indexes_only_overriding_segments(
     lazy_context: SDKEvaluationContext,
 ) -> None:
@@ -451,3 +565,204 @@ def test_build_segment_overrides_index__indexes_only_overriding_segments(
     # Then: only segments that actually carry an override appear.
     assert set(index) == {"target"}
     assert index["target"][0]["name"] == "premium_segment"
+
+
+@pytest.fixture
+def identity_overrides_environment(environment: EnvironmentModel) -> EnvironmentModel:
+    """The test environment, with identity overrides for awkward identifiers."""
+    [identity_override] = environment["identity_overrides"]
+    for identifier, value in [
+        ("12", "numeric"),
+        ("012", "zero-padded"),
+        ("1.5", "float-like"),
+        ("True", "bool-like"),
+        ("other-id", "some-overridden-value"),
+    ]:
+        other_identity_override = copy.deepcopy(identity_override)
+        other_identity_override["identifier"] = identifier
+        other_identity_override["identity_features"][0]["feature_state_value"] = value
+        environment["identity_overrides"].append(other_identity_override)
+    return environment
+
+
+def test_build_identity_overrides_index__splits_identity_override_segments(
+    identity_overrides_environment: EnvironmentModel,
+) -> None:
+    # Given
+    context = map_environment_document_to_context(identity_overrides_environment)
+
+    # When
+    context_without_overrides, index = build_identity_overrides_index(context)
+
+    # Then
+    assert context_without_overrides["segments"] == {
+        segment_key: segment_context
+        for segment_key, segment_context in (context["segments"] or {}).items()
+        if segment_context["name"] != "identity_overrides"
+    }
+    assert set(index) == {"overridden-id", "12", "012", "1.5", "True", "other-id"}
+    # Identities sharing the same overrides share the same segment.
+    assert index["overridden-id"] is index["other-id"]
+
+
+@pytest.mark.parametrize(
+    "identifier, traits",
+    [
+        ("overridden-id", {}),
+        ("other-id", {"foo": "bar"}),
+        ("12", {}),
+        ("012", {}),
+        ("1.5", {}),
+        ("True", {}),
+        ("not-overridden", {}),
+        ("not-overridden", {"$.identity.identifier": "overridden-id"}),
+        ("overridden-id", {"$.identity.identifier": 12}),
+    ],
+)
+def test_get_identity_overrides__matches_engine(
+    identity_overrides_environment: EnvironmentModel,
+    identifier: str,
+    traits: typing.Dict[str, typing.Any],
+) -> None:
+    # Given
+    context = map_environment_document_to_context(identity_overrides_environment)
+    context_without_overrides, index = build_identity_overrides_index(context)
+    identity_context = map_context_and_identity_data_to_context(
+        context_without_overrides, identifier, traits
+    )
+
+    # When
+    flags = Flags.from_evaluation_context(
+        context=identity_context,
+        overrides_index=build_segment_overrides_index(context_without_overrides),
+        identity_overrides=get_identity_overrides(identity_context, index),
+        analytics_processor=None,
+        default_flag_handler=None,
+    )
+
+    # Then
+    expected_result = engine.get_evaluation_result(
+        map_context_and_identity_data_to_context(context, identifier, traits)
+    )
+    assert flags.get_flag("some_feature") == Flag.from_evaluation_result(
+        expected_result["flags"]["some_feature"]
+    )
+    assert (
+        flags.all_flags()
+        == Flags.from_evaluation_result(
+            expected_result, analytics_processor=None, default_flag_handler=None
+        ).all_flags()
+    )
+
+
+def _overriding_segment(
+    segment_key: str,
+    *feature_names: str,
+) -> SegmentContext[SegmentMetadata, FeatureMetadata]:
+    return {
+        "key": segment_key,
+        "name": segment_key,
+        "rules": [],
+        "overrides": [
+            {"key": "", "name": feature_name, "enabled": True, "value": segment_key}
+            for feature_name in feature_names
+        ],
+    }
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {},
+        {"b": _overriding_segment("b", "feature_2")},
+        {"b": None},
+        {"d": _overriding_segment("d", "feature_1", "feature_3")},
+        {"a": _overriding_segment("a"), "c": None},
+    ],
+)
+def test_update_segment_overrides_index__matches_rebuilt_index(
+    changes: typing.Dict[
+        str, typing.Optional[SegmentContext[SegmentMetadata, FeatureMetadata]]
+    ],
+) -> None:
+    # Given
+    previous_context: SDKEvaluationContext = {
+        "environment": {"key": "key", "name": "name"},
+        "segments": {
+            "a": _overriding_segment("a", "feature_1"),
+            "b": _overriding_segment("b", "feature_1", "feature_2"),
+            "c": _overriding_segment("c", "feature_1"),
+        },
+    }
+    previous_index = build_segment_overrides_index(previous_context)
+    segments = {**(previous_context["segments"] or {}), **changes}
+    context: SDKEvaluationContext = {
+        **previous_context,
+        "segments": {
+            segment_key: segment_context
+            for segment_key, segment_context in segments.items()
+            if segment_context is not None
+        },
+    }
+
+    # When
+    index = update_segment_overrides_index(previous_index, previous_context, context)
+
+    # Then
+    assert index == build_segment_overrides_index(context)
+    assert previous_index == build_segment_overrides_index(previous_context)
+    for feature_name, entry in index.items():
+        assert list(map(id, entry)) == list(
+            map(id, build_segment_overrides_index(context)[feature_name])
+        )
+
+
+def test_update_identity_overrides_index__unchanged_overrides__reuses_index(
+    identity_overrides_environment: EnvironmentModel,
+) -> None:
+    # Given
+    previous_context = map_environment_document_to_context(
+        identity_overrides_environment
+    )
+    previous_identity_context, previous_index = build_identity_overrides_index(
+        previous_context
+    )
+    context: SDKEvaluationContext = {
+        **previous_context,
+        "segments": {
+            **(previous_context["segments"] or {}),
+            "new": _overriding_segment("new", "some_feature"),
+        },
+    }
+
+    # When
+    identity_context, index = update_identity_overrides_index(
+        context, previous_context, previous_identity_context, previous_index
+    )
+
+    # Then
+    assert index is previous_index
+    assert (identity_context, index) == build_identity_overrides_index(context)
+
+
+def test_update_identity_overrides_index__changed_overrides__rebuilds_index(
+    identity_overrides_environment: EnvironmentModel,
+) -> None:
+    # Given
+    previous_context = map_environment_document_to_context(
+        identity_overrides_environment
+    )
+    previous_identity_context, previous_index = build_identity_overrides_index(
+        previous_context
+    )
+    identity_overrides_environment["identity_overrides"].pop()
+    context = map_environment_document_to_context(identity_overrides_environment)
+
+    # When
+    identity_context, index = update_identity_overrides_index(
+        context, previous_context, previous_identity_context, previous_index
+    )
+
+    # Then
+    assert (identity_context, index) == build_identity_overrides_index(context)
+    assert "other-id" not in index
@@ -0,0 +1,137 @@
+import socketserver
+import threading
+import typing
+
+import pytest
+
+from flagsmith.exceptions import FlagsmithCacheError
+from flagsmith.redis_cache import RedisCacheBackend
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), RESPRequestHandler)
+        self.data: typing.Dict[bytes, bytes] = {}
+        self.commands: typing.List[typing.List[bytes]] = []
+
+
+class RESPRequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handles the few commands `RedisCacheBackend` sends, as a Redis server would.
+    """
+
+    server: RESPServer
+
+    def handle(self) -> None:
+        while line := self.rfile.readline():
+            args = []
+            for _ in range(int(line[1:])):
+                length = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(length + 2)[:-2])
+            self.server.commands.append(args)
+            self.wfile.write(self._reply(*args))
+
+    def _reply(self, command: bytes, *args: bytes) -> bytes:
+        if command == b"GET":
+            if (value := self.server.data.get(args[0])) is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            self.server.data[args[0]] = args[1]
+            return b"+OK\r\n"
+        if command == b"DEL":
+            return b":%d\r\n" % (self.server.data.pop(args[0], None) is not None)
+        if command == b"AUTH" and args[0] != b"secret":
+            return b"-WRONGPASS invalid password\r\n"
+        return b"+OK\r\n"
+
+
+@pytest.fixture
+def resp_server() -> typing.Generator[RESPServer, None, None]:
+    server = RESPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(
+    resp_server: RESPServer,
+) -> typing.Generator[RedisCacheBackend, None, None]:
+    host, port = resp_server.server_address[:2]
+    backend = RedisCacheBackend(str(host), int(port))
+    yield backend
+    backend.close()
+
+
+def test_redis_cache_backend__set_get_delete(
+    backend: RedisCacheBackend,
+    resp_server: RESPServer,
+) -> None:
+    # When
+    backend.set("key", b"value\r\nwith newline", ttl_seconds=1.5)
+    value = backend.get("key")
+    backend.delete("key")
+    deleted_value = backend.get("key")
+
+    # Then
+    assert value == b"value\r\nwith newline"
+    assert deleted_value is None
+    assert resp_server.commands[0] == [
+        b"SET",
+        b"key",
+        b"value\r\nwith newline",
+        b"PX",
+        b"1500",
+    ]
+
+
+def test_redis_cache_backend__password_and_db__sent_on_connect(
+    resp_server: RESPServer,
+) -> None:
+    # Given
+    host, port = resp_server.server_address[:2]
+    backend = RedisCacheBackend(str(host), int(port), db=2, password="secret")
+
+    # When
+    backend.get("key")
+    backend.close()
+
+    # Then
+    assert resp_server.commands == [
+        [b"AUTH", b"secret"],
+        [b"SELECT", b"2"],
+        [b"GET", b"key"],
+    ]
+
+
+def test_redis_cache_backend__error_reply__raises_flagsmith_cache_error(
+    resp_server: RESPServer,
+) -> None:
+    # Given
+    host, port = resp_server.server_address[:2]
+    backend = RedisCacheBackend(str(host), int(port), password="wrong")
+
+    # When
+    with pytest.raises(FlagsmithCacheError) as e:
+        backend.get("key")
+
+    # Then
+    assert "WRONGPASS" in str(e.value)
+
+
+def test_redis_cache_backend__server_unavailable__raises_flagsmith_cache_error(
+    resp_server: RESPServer,
+) -> None:
+    # Given
+    host, port = resp_server.server_address[:2]
+    resp_server.server_close()
+    backend = RedisCacheBackend(str(host), int(port), timeout_seconds=0.5)
+
+    # When
+    with pytest.raises(FlagsmithCacheError):
+        backend.get("key")
@@ -0,0 +1,188 @@
+import json
+import os
+import typing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from flagsmith import Flagsmith
+from flagsmith.api.types import EnvironmentModel
+from flagsmith.mappers import map_environment_document_to_context
+from flagsmith.shared_environment import SharedEnvironmentSnapshot
+
+UPDATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+# Snapshots are written to `tmp_path` on disk, which the `environment`
+# fixture would hide behind pyfakefs, so the environment is read directly.
+@pytest.fixture
+def real_environment() -> EnvironmentModel:
+    data_dir = os.path.join(os.path.dirname(__file__), "data")
+    with open(os.path.join(data_dir, "environment.json")) as f:
+        environment: EnvironmentModel = json.load(f)
+    return environment
+
+
+def test_shared_environment_snapshot__read__returns_published_snapshot_once(
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+) -> None:
+    # Given
+    path = str(tmp_path / "snapshot")
+    context = map_environment_document_to_context(real_environment)
+    writer = SharedEnvironmentSnapshot(path, writer=True)
+    reader = SharedEnvironmentSnapshot(path)
+
+    # When
+    before_publish = reader.read()
+    writer.publish(context, UPDATED_AT)
+    snapshot = reader.read()
+    unchanged = reader.read()
+
+    # Then
+    assert before_publish is None
+    assert snapshot == (context, UPDATED_AT)
+    assert unchanged is None
+    assert reader.generation == writer.generation == 1
+
+
+def test_shared_environment_snapshot__publish__sets_file_mode(
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+) -> None:
+    # Given
+    path = str(tmp_path / "snapshot")
+    context = map_environment_document_to_context(real_environment)
+    writer = SharedEnvironmentSnapshot(path, writer=True)
+    group_writer = SharedEnvironmentSnapshot(path, writer=True, mode=0o640)
+
+    # When
+    writer.publish(context, UPDATED_AT)
+    mode = os.stat(path).st_mode & 0o777
+    group_writer.publish(context, UPDATED_AT)
+    group_mode = os.stat(path).st_mode & 0o777
+
+    # Then
+    assert mode == 0o644
+    assert group_mode == 0o640
+
+
+def test_shared_environment_snapshot__publish_fails__removes_temporary_file(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+) -> None:
+    # Given
+    path = str(tmp_path / "snapshot")
+    context = map_environment_document_to_context(real_environment)
+    writer = SharedEnvironmentSnapshot(path, writer=True)
+    mocker.patch("os.replace", side_effect=OSError("Disk full"))
+
+    # When
+    with pytest.raises(OSError):
+        writer.publish(context, UPDATED_AT)
+
+    # Then
+    assert os.listdir(tmp_path) == []
+    assert writer.generation == 0
+
+
+def test_shared_environment_snapshot__new_writer__continues_generation(
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+) -> None:
+    # Given
+    path = str(tmp_path / "snapshot")
+    context = map_environment_document_to_context(real_environment)
+    SharedEnvironmentSnapshot(path, writer=True).publish(context, UPDATED_AT)
+
+    # When
+    writer = SharedEnvironmentSnapshot(path, writer=True)
+    writer.publish(context, UPDATED_AT)
+
+    # Then
+    assert writer.generation == 2
+
+
+def test_shared_environment_snapshot__invalid_file__raises_value_error(
+    tmp_path: Path,
+) -> None:
+    # Given
+    path = tmp_path / "snapshot"
+    path.write_bytes(b"not a snapshot")
+
+    # When
+    with pytest.raises(ValueError):
+        SharedEnvironmentSnapshot(str(path)).read()
+
+
+def test_shared_environment_snapshot__reader__cannot_publish(
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+) -> None:
+    # Given
+    context = map_environment_document_to_context(real_environment)
+
+    # When
+    with pytest.raises(ValueError):
+        SharedEnvironmentSnapshot(str(tmp_path / "snapshot")).publish(
+            context, UPDATED_AT
+        )
+
+
+def test_flagsmith__shared_environment_snapshot__workers_read_environment_from_writer(
+    mocker: MockerFixture,
+    tmp_path: Path,
+    real_environment: EnvironmentModel,
+    server_api_key: str,
+) -> None:
+    # Given
+    sessions: typing.List[typing.Any] = []
+
+    def create_session() -> typing.Any:
+        session = mocker.MagicMock()
+        session.get.return_value.content = json.dumps(real_environment).encode()
+        session.get.return_value.headers = {}
+        sessions.append(session)
+        return session
+
+    mocker.patch("flagsmith.flagsmith.requests.Session", side_effect=create_session)
+    path = str(tmp_path / "snapshot")
+
+    def create_client(writer: bool) -> Flagsmith:
+        return Flagsmith(
+            environment_key=server_api_key,
+            enable_local_evaluation=True,
+            environment_refresh_interval_seconds=60,
+            shared_environment_snapshot=SharedEnvironmentSnapshot(path, writer=writer),
+        )
+
+    # When
+    poller = create_client(writer=True)
+    workers: typing.List[Flagsmith] = [create_client(writer=False) for _ in range(3)]
+
+    # Then
+    poller_session, *worker_sessions = sessions
+    poller_session.get.assert_called()
+    assert not any(session.get.called for session in worker_sessions)
+    for worker in workers:
+        assert worker._evaluation_context == poller._evaluation_context
+        assert worker.get_identity_flags("identifier").all_flags() == (
+            poller.get_identity_flags("identifier").all_flags()
+        )
+
+
+def test_flagsmith__shared_environment_snapshot__requires_local_evaluation(
+    tmp_path: Path,
+    api_key: str,
+) -> None:
+    # When
+    with pytest.raises(ValueError):
+        Flagsmith(
+            environment_key=api_key,
+            shared_environment_snapshot=SharedEnvironmentSnapshot(
+                str(tmp_path / "snapshot")
+            ),
+        )
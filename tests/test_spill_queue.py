@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+from flagsmith.spill_queue import DiskSpillQueue
+
+
+def test_disk_spill_queue__consumes_batches_in_order_across_segments(
+    tmp_path: Path,
+) -> None:
+    # Given
+    queue = DiskSpillQueue(str(tmp_path), max_segment_bytes=1)
+    for i in range(3):
+        queue.append([{"event": f"event_{i}"}])
+
+    # When
+    consumed = []
+    while (batch := queue.peek()) is not None:
+        consumed.append(batch)
+        queue.pop()
+
+    # Then
+    assert consumed == [[{"event": f"event_{i}"}] for i in range(3)]
+    assert not queue
+    assert os.listdir(tmp_path) == []
+
+
+def test_disk_spill_queue__new_queue__resumes_from_existing_segments(
+    tmp_path: Path,
+) -> None:
+    # Given
+    queue = DiskSpillQueue(str(tmp_path))
+    queue.append([{"event": "event_1"}])
+    queue.append([{"event": "event_2"}])
+
+    # When
+    new_queue = DiskSpillQueue(str(tmp_path))
+
+    # Then
+    assert new_queue
+    assert new_queue.peek() == [{"event": "event_1"}]
+
+
+def test_disk_spill_queue__full__drops_oldest_segments(tmp_path: Path) -> None:
+    # Given
+    queue = DiskSpillQueue(str(tmp_path), max_segment_bytes=1, max_total_bytes=50)
+
+    # When
+    for i in range(5):
+        queue.append([{"event": f"event_{i}"}])
+
+    # Then
+    assert queue.peek() == [{"event": "event_3"}]
+
+
+def test_disk_spill_queue__incomplete_batch__skipped(tmp_path: Path) -> None:
+    # Given
+    queue = DiskSpillQueue(str(tmp_path), max_segment_bytes=1)
+    queue.append([{"event": "event_1"}])
+    with open(tmp_path / "000000000000.jsonl", "ab") as f:
+        f.write(b'[{"event": "trunc')
+    queue.append([{"event": "event_2"}])
+
+    # When
+    first = queue.peek()
+    queue.pop()
+    second = queue.peek()
+
+    # Then
+    assert first == [{"event": "event_1"}]
+    assert second == [{"event": "event_2"}]